@@ -0,0 +1,62 @@
+"""
+Benchmark the subnet utilization analytics on ipv4address data for every
+address in a /16 and a /8 split into /24 networks, reporting the time to
+load the rows and to calculate the utilization, free ranges and conflicts.
+Loading is compared against building an IPv4Address object per address for
+the /16. The load times include generating the rows. NumPy is used if it
+is installed.
+
+Usage: PYTHONPATH=. python benchmarks/analytics.py [prefix ...]
+
+"""
+import random
+import sys
+import time
+
+from infoblox import analytics
+from infoblox import record
+
+PREFIXES = [16, 8]
+
+
+def rows(prefix):
+    statuses = random.Random(prefix)
+    for offset in range(2 ** (32 - prefix)):
+        address = analytics.unpack(0x0a000000 + offset)
+        used = statuses.random() < 0.6
+        yield {'ip_address': address,
+               'network': address.rsplit('.', 1)[0] + '.0/24',
+               'status': 'USED' if used else 'UNUSED',
+               'lease_state': 'ACTIVE' if used else None,
+               'is_conflict': statuses.random() < 0.001}
+
+
+def timed(label, func, *args):
+    start = time.time()
+    result = func(*args)
+    print('  %-20s %8.3fs' % (label, time.time() - start))
+    return result
+
+
+def main():
+    prefixes = [int(value) for value in sys.argv[1:]] or PREFIXES
+    print('Using %s' % ('numpy %s' % analytics.numpy.__version__
+                        if analytics.numpy else 'array'))
+    for prefix in prefixes:
+        print('/%i: %i addresses' % (prefix, 2 ** (32 - prefix)))
+        if prefix >= 16:
+            timed('IPv4Address objects',
+                  lambda: [record.IPv4Address._build(None, values)
+                           for values in rows(prefix)])
+        table = analytics.AddressTable()
+        timed('load', table.extend, rows(prefix))
+        usage = timed('utilization', table.utilization)
+        timed('free ranges', table.free_ranges, usage[0].network)
+        timed('conflicts', table.conflicted)
+        print('  %i networks, %i used, %i free' %
+              (len(usage), sum(item.used for item in usage),
+               sum(item.free for item in usage)))
+
+
+if __name__ == '__main__':
+    main()
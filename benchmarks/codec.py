@@ -0,0 +1,66 @@
+"""
+Benchmark decoding a large record:host result set with each installed JSON
+library, and building the compact Host objects from the decoded results.
+
+Usage: PYTHONPATH=. python benchmarks/codec.py [count]
+
+"""
+import json
+import sys
+import time
+
+from infoblox import codec
+from infoblox import record
+
+COUNT = 50000
+
+
+def host(offset):
+    address = '10.%i.%i.%i' % (offset >> 16 & 255, offset >> 8 & 255,
+                                offset & 255)
+    name = 'host%i.bar.net' % offset
+    return {'_ref': 'record:host/ZG5zLmhvc3Qk%i:%s/default' % (offset, name),
+            'name': name,
+            'view': 'default',
+            'comment': 'Host %i' % offset,
+            'configure_for_dns': True,
+            'extattrs': {'Site': {'value': 'NYC'}},
+            'ipv4addrs': [{'_ref': 'record:host_ipv4addr/ZG5zLmhvc3Rf%i:%s/%s/'
+                                   'default' % (offset, address, name),
+                           'configure_for_dhcp': False,
+                           'host': name,
+                           'ipv4addr': address}]}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    content = json.dumps({'result': [host(offset)
+                                     for offset in range(count)]})
+    content = content.encode('utf-8')
+    print('%i hosts, %.1f MB' % (count, len(content) / 1048576.0))
+
+    start = time.time()
+    json.loads(content.decode('utf-8'))
+    baseline = time.time() - start
+    print('%-12s decode: %6.3fs' % ('response.json', baseline))
+
+    cls = record.Host.compact()
+    for backend in codec.BACKENDS:
+        try:
+            __import__(backend)
+        except ImportError:
+            continue
+        codec.use(backend)
+        start = time.time()
+        values = codec.loads(content)
+        decoded = time.time() - start
+        start = time.time()
+        [cls._build(None, item) for item in values['result']]
+        built = time.time() - start
+        print('%-12s decode: %6.3fs (%4.1fx)  build: %6.3fs' %
+              (backend, decoded, baseline / decoded, built))
+    codec.use()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark adding, checking and removing addresses on a host with many
+addresses, against the linear list scan the Addresses container replaced.
+
+Usage: PYTHONPATH=. python benchmarks/host_addresses.py
+
+"""
+import time
+
+import infoblox
+
+
+def legacy_add(addresses, ipv4addr):
+    """The list scan add_ipv4addr used prior to the Addresses container."""
+    for addr in addresses:
+        if ((isinstance(addr, dict) and addr['ipv4addr'] == ipv4addr) or
+            (isinstance(addr, infoblox.HostIPv4) and
+             addr.ipv4addr == ipv4addr)):
+            raise ValueError('Already exists')
+    addresses.append({'ipv4addr': ipv4addr})
+
+
+def legacy_remove(addresses, ipv4addr):
+    """The list scan remove_ipv4addr used prior to the Addresses container."""
+    for addr in addresses:
+        if ((isinstance(addr, dict) and addr['ipv4addr'] == ipv4addr) or
+            (isinstance(addr, infoblox.HostIPv4) and
+             addr.ipv4addr == ipv4addr)):
+            addresses.remove(addr)
+            break
+
+
+def main():
+    session = infoblox.Session('127.0.0.1')
+    for count in [100, 1000, 3000]:
+        addresses = ['10.%i.%i.%i' % (offset >> 16 & 255, offset >> 8 & 255,
+                                      offset & 255)
+                     for offset in range(count)]
+
+        start = time.time()
+        legacy = []
+        for address in addresses:
+            legacy_add(legacy, address)
+        for address in addresses:
+            legacy_remove(legacy, address)
+        legacy_elapsed = time.time() - start
+
+        start = time.time()
+        host = infoblox.Host(session)
+        for address in addresses:
+            host.add_ipv4addr(address)
+        for address in addresses:
+            host.remove_ipv4addr(address)
+        elapsed = time.time() - start
+
+        print('%6i addresses  legacy: %8.3fs  Addresses: %6.3fs  '
+              'speedup: %7.1fx' % (count, legacy_elapsed, elapsed,
+                                   legacy_elapsed / elapsed))
+
+
+if __name__ == '__main__':
+    main()
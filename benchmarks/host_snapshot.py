@@ -0,0 +1,78 @@
+"""
+Benchmark building a HostSnapshot and looking hosts up by name, address and
+MAC address.
+
+Usage: PYTHONPATH=. python benchmarks/host_snapshot.py [count]
+
+"""
+import random
+import sys
+import time
+
+from infoblox import record
+from infoblox import snapshot
+
+COUNT = 1000000
+LOOKUPS = 200000
+
+
+def host(offset):
+    address = '10.%i.%i.%i' % (offset >> 16 & 255, offset >> 8 & 255,
+                                offset & 255)
+    name = 'host%i.bar.net' % offset
+    return {'_ref': 'record:host/ZG5zLmhvc3Qk%i:%s/default' % (offset, name),
+            'name': name,
+            'view': 'default',
+            'ipv4addrs': [{'_ref': 'record:host_ipv4addr/ZG5zLmhvc3Rf%i:%s/%s/'
+                                   'default' % (offset, address, name),
+                           'host': name,
+                           'ipv4addr': address,
+                           'mac': '00:50:56:%02x:%02x:%02x' %
+                                  (offset >> 16 & 255, offset >> 8 & 255,
+                                   offset & 255)}],
+            'ipv6addrs': [{'_ref': 'record:host_ipv6addr/ZG5zLmhvc3Rf%i:'
+                                   '2001%%3Adb8%%3A%%3A%x%%3A%x/%s/default' %
+                                   (offset, offset >> 16, offset & 65535, name),
+                           'host': name,
+                           'ipv6addr': '2001:db8::%x:%x' % (offset >> 16,
+                                                        offset & 65535)}]}
+
+
+def rate(count, elapsed):
+    return '%9.0f/s' % (count / elapsed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    cls = record.Host.compact()
+    start = time.time()
+    hosts = [cls._build(None, host(offset)) for offset in range(count)]
+    print('Built %i hosts in %.1fs' % (count, time.time() - start))
+
+    start = time.time()
+    hosts = snapshot.HostSnapshot(hosts)
+    print('Indexed %i hosts in %.1fs' % (len(hosts), time.time() - start))
+
+    offsets = [random.randrange(count) for _offset in range(LOOKUPS)]
+    for label, find, key in [
+            ('find_by_name', hosts.find_by_name,
+             lambda offset: 'host%i.bar.net' % offset),
+            ('find_by_ip (IPv4)', hosts.find_by_ip,
+             lambda offset: '10.%i.%i.%i' % (offset >> 16 & 255,
+                                             offset >> 8 & 255, offset & 255)),
+            ('find_by_ip (IPv6)', hosts.find_by_ip,
+             lambda offset: '2001:db8:0::%x:%x' % (offset >> 16,
+                                                          offset & 65535)),
+            ('find_by_mac', hosts.find_by_mac,
+             lambda offset: '00-50-56-%02X-%02X-%02X' %
+                            (offset >> 16 & 255, offset >> 8 & 255,
+                             offset & 255))]:
+        keys = [key(offset) for offset in offsets]
+        start = time.time()
+        for value in keys:
+            assert find(value)
+        print('%-18s %s' % (label, rate(LOOKUPS, time.time() - start)))
+
+
+if __name__ == '__main__':
+    main()
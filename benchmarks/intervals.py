@@ -0,0 +1,50 @@
+"""
+Benchmark finding free space in a /8 network container holding a growing
+number of randomly placed /24 and /26 networks, reporting the time to build
+the sets, subtract them and find free prefixes and the fragmentation.
+
+Usage: PYTHONPATH=. python benchmarks/intervals.py [count ...]
+
+"""
+import random
+import sys
+import time
+
+from infoblox import analytics
+from infoblox.intervals import IntervalSet
+
+COUNTS = [1000, 10000, 100000]
+
+
+def networks(count):
+    generator = random.Random(count)
+    for _offset in range(count):
+        prefix = generator.choice([24, 26])
+        number = 0x0a000000 + (generator.randrange(2 ** (prefix - 8)) <<
+                               (32 - prefix))
+        yield '%s/%i' % (analytics.unpack(number), prefix)
+
+
+def main():
+    counts = [int(value) for value in sys.argv[1:]] or COUNTS
+    container = IntervalSet.from_networks(['10.0.0.0/8'])
+    for count in counts:
+        cidrs = list(networks(count))
+        start = time.time()
+        used = IntervalSet.from_networks(cidrs)
+        built = time.time() - start
+        start = time.time()
+        free = container - used
+        subtracted = time.time() - start
+        start = time.time()
+        found = sum(1 for _network in free.free_prefixes(22))
+        fragmentation = free.fragmentation()
+        searched = time.time() - start
+        print('%7i networks: build %.3fs  difference %.3fs  '
+              'free /22s %.3fs  (%i /22s, %i intervals, ratio %.3f)' %
+              (count, built, subtracted, searched, found,
+               fragmentation.intervals, fragmentation.ratio))
+
+
+if __name__ == '__main__':
+    main()
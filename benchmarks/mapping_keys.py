@@ -0,0 +1,44 @@
+"""
+Benchmark Mapping.keys() and the methods built on top of it against the
+dir() and inspect based attribute scan it replaced.
+
+Usage: PYTHONPATH=. python benchmarks/mapping_keys.py
+
+"""
+import inspect
+import timeit
+
+import infoblox
+
+NUMBER = 2000
+
+
+def legacy_keys(obj):
+    """The reflective keys() implementation prior to the field schema."""
+    return sorted([k for k in dir(obj) if
+                   k[0:1] != '_' and k != 'keys' and not k.isupper() and
+                   not inspect.ismethod(getattr(obj, k)) and
+                   not (hasattr(obj.__class__, k) and
+                        isinstance(getattr(obj.__class__, k), property)) and
+                   not isinstance(getattr(obj, k), property)])
+
+
+def main():
+    session = infoblox.Session('127.0.0.1')
+    for obj in [infoblox.Network(session), infoblox.Host(session)]:
+        assert legacy_keys(obj) == obj.keys()
+        name = obj.__class__.__name__
+        legacy = timeit.timeit(lambda: legacy_keys(obj), number=NUMBER)
+        schema = timeit.timeit(obj.keys, number=NUMBER)
+        print('%-8s %3i fields  legacy keys(): %8.2f us  schema keys(): '
+              '%6.2f us  speedup: %6.1fx' %
+              (name, len(obj), legacy / NUMBER * 1e6, schema / NUMBER * 1e6,
+               legacy / schema))
+        for label, func in [('items()', obj.items),
+                            ('_return_fields', lambda: obj._return_fields)]:
+            elapsed = timeit.timeit(func, number=NUMBER)
+            print('%-8s %-14s %8.2f us' % ('', label, elapsed / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark the memory used by bulk-loaded record objects, comparing the
+default classes with their compact, __slots__ backed variants.
+
+Usage: PYTHONPATH=. python benchmarks/record_memory.py [count]
+
+"""
+import gc
+import sys
+
+import infoblox
+
+COUNT = 200000
+
+
+def address(offset):
+    return '10.%i.%i.%i' % (offset >> 16 & 255, offset >> 8 & 255,
+                             offset & 255)
+
+
+def host_ipv4addr(offset):
+    return {'_ref': 'record:host_ipv4addr/ZG5zLmhvc3Rf%i:%s/host%i.example' %
+                    (offset, address(offset), offset),
+            'configure_for_dhcp': False,
+            'host': 'host%i.example' % offset,
+            'ipv4addr': address(offset)}
+
+
+def ipv4address(offset):
+    return {'_ref': 'ipv4address/Li5pcHY0X2FkZHJlc3MkMTAu%i:%s' %
+                    (offset, address(offset)),
+            'ip_address': address(offset),
+            'is_conflict': False,
+            'names': ['host%i.example' % offset],
+            'network': '10.%i.0.0/16' % (offset >> 16 & 255),
+            'network_view': 'default',
+            'status': 'USED',
+            'types': ['HOST'],
+            'usage': ['DNS']}
+
+
+def load(cls, session, rows):
+    """Build objects the way they are assigned from a WAPI response, without
+    running the constructors that would fetch them.
+
+    """
+    objects = []
+    for values in rows:
+        obj = cls.__new__(cls)
+        obj._session = session
+        obj.from_dict(values)
+        objects.append(obj)
+    return objects
+
+
+def measure(cls, session, rows):
+    """Return the number of bytes used by the objects and their attribute
+    storage. The assigned values are shared with the rows and not counted.
+
+    """
+    objects = load(cls, session, rows)
+    assert objects[-1]._ref == rows[-1]['_ref']
+    used = 0
+    for obj in objects:
+        used += sys.getsizeof(obj)
+        # Reading obj.__dict__ would create it, so find it as a referent
+        for referent in gc.get_referents(obj):
+            if isinstance(referent, dict):
+                used += sys.getsizeof(referent)
+    return used
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    session = infoblox.Session('127.0.0.1')
+    for cls, row in [(infoblox.HostIPv4, host_ipv4addr),
+                     (infoblox.IPv4Address, ipv4address)]:
+        rows = [row(offset) for offset in range(count)]
+        default = measure(cls, session, rows)
+        compact = measure(cls.compact(), session, rows)
+        print('%-12s %i objects  default: %7.1f MiB  compact: %7.1f MiB  '
+              'saving: %4.1f%%' % (cls.__name__, count, default / 1048576.0,
+                                  compact / 1048576.0,
+                                  100.0 - compact * 100.0 / default))
+
+
+if __name__ == '__main__':
+    main()
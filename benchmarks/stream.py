@@ -0,0 +1,82 @@
+"""
+Benchmark parsing a large ipv4address result set incrementally as it is read
+against reading and decoding the whole body, reporting the time to the first
+object, the total time and the peak memory used. The body is read from a
+temporary file in place of the network. Peak memory requires Python 3.
+
+Usage: PYTHONPATH=. python benchmarks/stream.py [count]
+
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from infoblox import codec
+from infoblox import record
+
+COUNT = 65536
+
+
+def address(offset):
+    ip_address = '10.1.%i.%i' % (offset >> 8 & 255, offset & 255)
+    return {'_ref': 'ipv4address/Li5pcHY0X2FkZHJlc3Mk%s/default' % ip_address,
+            'ip_address': ip_address,
+            'network': '10.1.0.0/16',
+            'network_view': 'default',
+            'status': 'USED' if offset % 3 else 'UNUSED',
+            'types': ['HOST'] if offset % 3 else [],
+            'names': ['host%i.bar.net' % offset] if offset % 3 else [],
+            'usage': ['DNS'] if offset % 3 else []}
+
+
+def measure(label, func, path):
+    if tracemalloc:
+        tracemalloc.start()
+    start = time.time()
+    first = None
+    with open(path, 'rb') as handle:
+        for count, _obj in enumerate(func(handle)):
+            if first is None:
+                first = time.time() - start
+    total = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1048576.0 \
+        if tracemalloc else float('nan')
+    if tracemalloc:
+        tracemalloc.stop()
+    print('%-8s first: %7.4fs  total: %6.3fs  peak: %7.1f MB  (%i)' %
+          (label, first, total, peak, count + 1))
+
+
+def loaded(handle):
+    for values in codec.loads(handle.read()):
+        yield record.IPv4Address._build(None, values)
+
+
+def streamed(handle):
+    chunks = iter(lambda: handle.read(codec.CHUNK_SIZE), b'')
+    for values in codec.iterload(chunks):
+        yield record.IPv4Address._build(None, values)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    handle, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(handle, 'w') as output:
+            json.dump([address(offset) for offset in range(count)], output)
+        print('%i addresses, %.1f MB' % (count,
+                                         os.path.getsize(path) / 1048576.0))
+        measure('loads', loaded, path)
+        measure('iterload', streamed, path)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,3 +7,4 @@ from infoblox.record import HostIPv4
 from infoblox.record import HostIPv6
 from infoblox.record import IPv4Address
 from infoblox.network import Network
+from infoblox.network import NetworkContainer
@@ -0,0 +1,118 @@
+"""
+An asyncio interface to the Infoblox session, allowing many requests to the
+Infoblox NIOS device to overlap their network latency. Requires Python 3.5+.
+
+"""
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from infoblox import session
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncSession(session.Session):
+    """Session whose requests can be awaited from an asyncio event loop.
+    Requests are run in a thread pool bounded by the concurrency limit, so
+    no more than that many requests are in flight to the appliance at once.
+
+    The blocking get, post, put and delete methods are inherited from
+    :class:`infoblox.Session`. Their awaitable counterparts are suffixed
+    with _async, as are the fetch, save and delete methods on objects
+    created with this session::
+
+        async with AsyncSession(infoblox_host, concurrency=20) as session:
+            hosts = [infoblox.Host(session) for name in names]
+            for host, name in zip(hosts, names):
+                host.name = name
+            await asyncio.gather(*[host.fetch_async() for host in hosts])
+
+    """
+    CONCURRENCY = 10
+
+    def __init__(self, host, username=None, password=None, https=True,
+                 concurrency=None, **kwargs):
+        """Create a new instance of the AsyncSession object
+
+        :param str host: The Infoblox host to communicate with
+        :param str username: The user to authenticate with
+        :param str password: The password to authenticate with
+        :param bool https: Communicate with the Infoblox host via HTTPS
+        :param int concurrency: The maximum number of concurrent requests
+        :param dict kwargs: Connection options for :class:`infoblox.Session`
+
+        """
+        super(AsyncSession, self).__init__(host, username, password, https,
+                                           **kwargs)
+        self.concurrency = concurrency or self.CONCURRENCY
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.concurrency)
+        self.resize_pool(self.concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Wait for running requests to finish and release the thread pool
+        and connections.
+
+        """
+        self.executor.shutdown()
+        self.session.close()
+
+    def run_async(self, func, *args, **kwargs):
+        """Run the blocking function in the thread pool, returning an
+        awaitable for its result.
+
+        :param callable func: The function to run
+        :rtype: asyncio.Future
+
+        """
+        return asyncio.get_event_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs))
+
+    def delete_async(self, path):
+        """Awaitable version of :meth:`infoblox.Session.delete`
+
+        :param str path: The reference id
+        :rtype: asyncio.Future
+
+        """
+        return self.run_async(self.delete, path)
+
+    def get_async(self, path, data=None, return_fields=None):
+        """Awaitable version of :meth:`infoblox.Session.get`
+
+        :param str path: The object type or reference id
+        :param dict data: The data for the get request
+        :param dict return_fields: The query arguments
+        :rtype: asyncio.Future
+
+        """
+        return self.run_async(self.get, path, data, return_fields)
+
+    def post_async(self, path, data, return_fields=None):
+        """Awaitable version of :meth:`infoblox.Session.post`
+
+        :param str path: The object type
+        :param dict data: The data for the post
+        :param dict return_fields: The query arguments
+        :rtype: asyncio.Future
+
+        """
+        return self.run_async(self.post, path, data, return_fields)
+
+    def put_async(self, path, data, return_fields=None):
+        """Awaitable version of :meth:`infoblox.Session.put`
+
+        :param str path: The reference id
+        :param dict data: The data for the put
+        :param dict return_fields: The query arguments
+        :rtype: asyncio.Future
+
+        """
+        return self.run_async(self.put, path, data, return_fields)
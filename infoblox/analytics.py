@@ -0,0 +1,368 @@
+"""
+Subnet utilization analytics over ipv4address data, which is kept in columns
+of packed addresses and coded states instead of an IPv4Address object per
+address. The calculations are vectorized with NumPy when it is installed,
+and fall back to loops over the same columns when it is not.
+
+"""
+import array
+import collections
+import logging
+import socket
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from infoblox import record
+
+LOGGER = logging.getLogger(__name__)
+
+# The ipv4address fields to fetch
+FIELDS = ['ip_address', 'is_conflict', 'lease_state', 'network', 'status']
+
+# The coded values of the status and lease_state enums, by their index
+STATUSES = ['UNUSED', 'USED']
+LEASE_STATES = [None, 'ABANDONED', 'ACTIVE', 'BACKUP', 'DECLINED', 'EXPIRED',
+                'FREE', 'OFFERED', 'RELEASED', 'RESET', 'STATIC']
+
+USED = STATUSES.index('USED')
+
+Utilization = collections.namedtuple('Utilization', ['network', 'size',
+                                                     'used', 'free',
+                                                     'conflicts',
+                                                     'largest_free'])
+
+
+def pack(address):
+    """Return the IPv4 address as an unsigned 32 bit integer.
+
+    :param str address: The IPv4 address
+    :rtype: int
+    :raises: socket.error
+
+    """
+    return struct.unpack('!I', socket.inet_aton(address))[0]
+
+
+def unpack(value):
+    """Return the unsigned 32 bit integer as an IPv4 address.
+
+    :param int value: The packed address
+    :rtype: str
+
+    """
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def _column(typecode):
+    """Return an empty array for a column of at least 32 bit values when
+    the typecode is I, as its size varies by platform.
+
+    """
+    if typecode == 'I' and array.array('I').itemsize < 4:
+        typecode = 'L'
+    return array.array(typecode)
+
+
+def _gaps(first, last, used):
+    """Return the first and last address of each run between first and
+    last that is not in the set of used addresses.
+
+    """
+    runs, previous = [], first - 1
+    for address in sorted(used) + [last + 1]:
+        if address - previous > 1:
+            runs.append((previous + 1, address - 1))
+        previous = address
+    return runs
+
+
+class AddressTable(object):
+    """The status of IPv4 addresses in columns, with one row per address::
+
+        table = AddressTable.load(session, network_container='10.0.0.0/8')
+        for usage in table.utilization():
+            print(usage.network, usage.used, usage.free)
+
+    Addresses that are not in the table count as free, so it works from a
+    search for only the used addresses as well as from full networks.
+
+    """
+    def __init__(self):
+        self.addresses = _column('I')
+        self.conflicts = _column('B')
+        self.lease_states = _column('B')
+        self.networks = _column('I')
+        self.statuses = _column('B')
+        self._network_ids = {}
+        self._network_names = []
+        self._bounds = []
+
+    def __len__(self):
+        return len(self.addresses)
+
+    @classmethod
+    def load(cls, session, page_size=1000, **criteria):
+        """Fetch the ipv4address data that matches the search criteria a
+        page at a time, without building an IPv4Address object for each.
+
+        :param infoblox.Session session: The established session object
+        :param int page_size: The number of addresses to fetch per request
+        :param dict criteria: The search criteria
+        :rtype: AddressTable
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        table = cls()
+        for _page_id, results in record.IPv4Address.result_pages(
+                session, page_size, fields=FIELDS, **criteria):
+            table.extend(results)
+        LOGGER.debug('Loaded %i addresses in %i networks', len(table),
+                     len(table._network_names))
+        return table
+
+    def append(self, values):
+        """Add an address from its ipv4address values. Addresses without a
+        network are skipped, as their utilization can not be counted.
+
+        :param dict values: The ipv4address values
+        :raises: ValueError
+
+        """
+        if not values.get('network'):
+            LOGGER.debug('Skipping %s without a network',
+                         values.get('ip_address'))
+            return
+        self.add(values['ip_address'], values['network'],
+                 values.get('status'), values.get('lease_state'),
+                 values.get('is_conflict'))
+
+    def add(self, address, network, status='USED', lease_state=None,
+            conflict=False):
+        """Add an address to the table.
+
+        :param str address: The IPv4 address
+        :param str network: The network of the address in CIDR notation
+        :param str status: USED or UNUSED
+        :param str lease_state: The DHCP lease state
+        :param bool conflict: The address has a conflict
+        :raises: ValueError
+
+        """
+        # Code every value first so an invalid one leaves the columns as
+        # they were
+        packed, network_id = pack(address), self.network_id(network)
+        status = STATUSES.index(status or 'UNUSED')
+        lease_state = LEASE_STATES.index(lease_state or None)
+        self.addresses.append(packed)
+        self.networks.append(network_id)
+        self.statuses.append(status)
+        self.lease_states.append(lease_state)
+        self.conflicts.append(1 if conflict else 0)
+
+    def extend(self, rows):
+        """Add the addresses from a list of ipv4address values.
+
+        :param list rows: The ipv4address values
+        :raises: ValueError
+
+        """
+        for values in rows:
+            self.append(values)
+
+    def network_id(self, network):
+        """Return the id of the network in the networks column, adding it
+        if it is new.
+
+        :param str network: The network in CIDR notation
+        :rtype: int
+        :raises: ValueError
+
+        """
+        if network in self._network_ids:
+            return self._network_ids[network]
+        if not network:
+            raise ValueError('Missing network')
+        address, _slash, prefix = network.partition('/')
+        prefix = int(prefix or 32)
+        if not 0 <= prefix <= 32:
+            raise ValueError('Invalid network: %s' % network)
+        mask = (0xffffffff << (32 - prefix)) & 0xffffffff
+        first = pack(address) & mask
+        self._bounds.append((first, first | (~mask & 0xffffffff)))
+        self._network_ids[network] = len(self._network_names)
+        self._network_names.append(network)
+        return self._network_ids[network]
+
+    def conflicted(self):
+        """Return the addresses that have a conflict, in table order.
+
+        :rtype: list
+
+        """
+        if numpy is not None:
+            addresses = self._array(self.addresses)
+            values = addresses[self._array(self.conflicts) != 0]
+        else:
+            values = [address for address, conflict
+                      in zip(self.addresses, self.conflicts) if conflict]
+        return [unpack(int(value)) for value in values]
+
+    def free_ranges(self, network):
+        """Return the first and last address of each run of free addresses
+        in the network.
+
+        :param str network: The network in CIDR notation
+        :rtype: list
+        :raises: KeyError
+
+        """
+        network_id = self._network_ids[network]
+        first, last = self._bounds[network_id]
+        if numpy is not None:
+            addresses = self._array(self.addresses).astype(numpy.int64)
+            used = addresses[(self._array(self.networks) == network_id) &
+                             (self._array(self.statuses) == USED) &
+                             (addresses >= first) & (addresses <= last)]
+            addresses = numpy.concatenate(([first - 1], numpy.sort(used),
+                                           [last + 1]))
+            gaps = numpy.flatnonzero(numpy.diff(addresses) > 1)
+            runs = zip(addresses[gaps] + 1, addresses[gaps + 1] - 1)
+        else:
+            runs = _gaps(first, last, set(
+                address for run_id, address, status
+                in zip(self.networks, self.addresses, self.statuses)
+                if run_id == network_id and status == USED and
+                first <= address <= last))
+        return [(unpack(int(start)), unpack(int(end)))
+                for start, end in runs]
+
+    def lease_state_counts(self):
+        """Return the number of addresses in each lease state.
+
+        :rtype: dict
+
+        """
+        if numpy is not None:
+            counts = numpy.bincount(self._array(self.lease_states),
+                                    minlength=len(LEASE_STATES))
+        else:
+            counts = [0] * len(LEASE_STATES)
+            for state in self.lease_states:
+                counts[state] += 1
+        return dict((state, int(count))
+                    for state, count in zip(LEASE_STATES, counts) if count)
+
+    def utilization(self):
+        """Return the Utilization of each network, in the order they were
+        first added. Addresses that are outside of their network or repeated
+        are only counted once as used, free is the size of the network less
+        the used addresses and largest_free is the longest run of free
+        addresses.
+
+        :rtype: list
+
+        """
+        count = len(self._network_names)
+        network_ids, firsts, lasts = self._runs()
+        if numpy is not None:
+            networks = self._array(self.networks)
+            used = numpy.bincount(networks[self._used()], minlength=count)
+            conflicts = numpy.bincount(networks, self._array(self.conflicts),
+                                       count)
+            largest = numpy.zeros(count, numpy.int64)
+            numpy.maximum.at(largest, network_ids, lasts - firsts + 1)
+        else:
+            used = [len(addresses) for addresses in self._used_sets()]
+            conflicts, largest = [0] * count, [0] * count
+            for network_id, conflict in zip(self.networks, self.conflicts):
+                conflicts[network_id] += conflict
+            for network_id, first, last in zip(network_ids, firsts, lasts):
+                largest[network_id] = max(largest[network_id],
+                                          last - first + 1)
+        result = []
+        for network_id, network in enumerate(self._network_names):
+            first, last = self._bounds[network_id]
+            size = last - first + 1
+            result.append(Utilization(network, size, int(used[network_id]),
+                                      size - int(used[network_id]),
+                                      int(conflicts[network_id]),
+                                      int(largest[network_id])))
+        return result
+
+    @staticmethod
+    def _array(column):
+        """Return a NumPy view of the column without copying it."""
+        dtype = 'u%i' % column.itemsize
+        if not column:
+            return numpy.zeros(0, dtype)
+        return numpy.frombuffer(column, dtype)
+
+    def _used(self):
+        """Return a mask of the used rows that are in their network,
+        leaving out repeats of the same address in the same network.
+
+        """
+        networks = self._array(self.networks)
+        addresses = self._array(self.addresses).astype(numpy.int64)
+        bounds = numpy.array(self._bounds, numpy.int64).reshape(-1, 2)
+        used = numpy.flatnonzero(
+            (self._array(self.statuses) == USED) &
+            (addresses >= bounds[networks, 0]) &
+            (addresses <= bounds[networks, 1]))
+        keys = (networks[used].astype(numpy.int64) << 32) | addresses[used]
+        _values, first = numpy.unique(keys, return_index=True)
+        mask = numpy.zeros(len(self), bool)
+        mask[used[first]] = True
+        return mask
+
+    def _used_sets(self):
+        """Return the set of used addresses in each network."""
+        used = [set() for _network in self._network_names]
+        for network_id, address, status in zip(self.networks, self.addresses,
+                                               self.statuses):
+            first, last = self._bounds[network_id]
+            if status == USED and first <= address <= last:
+                used[network_id].add(address)
+        return used
+
+    def _runs(self):
+        """Return the network ids, first and last addresses of the runs of
+        free addresses in every network.
+
+        """
+        if numpy is not None:
+            return self._numpy_runs()
+        network_ids, firsts, lasts = [], [], []
+        for network_id, used in enumerate(self._used_sets()):
+            for first, last in _gaps(self._bounds[network_id][0],
+                                     self._bounds[network_id][1], used):
+                network_ids.append(network_id)
+                firsts.append(first)
+                lasts.append(last)
+        return network_ids, firsts, lasts
+
+    def _numpy_runs(self):
+        """Find the runs of free addresses by sorting the used addresses of
+        all networks together with a sentinel before and after each network
+        and finding the gaps between neighbours in the same network.
+
+        """
+        count = len(self._network_names)
+        bounds = numpy.array(self._bounds, numpy.int64).reshape(-1, 2)
+        used = self._used()
+        network_ids = numpy.concatenate((
+            self._array(self.networks)[used].astype(numpy.int64),
+            numpy.arange(count), numpy.arange(count)))
+        addresses = numpy.concatenate((
+            self._array(self.addresses)[used].astype(numpy.int64),
+            bounds[:, 0] - 1, bounds[:, 1] + 1))
+        order = numpy.lexsort((addresses, network_ids))
+        network_ids, addresses = network_ids[order], addresses[order]
+        gaps = numpy.flatnonzero((numpy.diff(addresses) > 1) &
+                                 (network_ids[1:] == network_ids[:-1]))
+        return (network_ids[gaps], addresses[gaps] + 1,
+                addresses[gaps + 1] - 1)
@@ -0,0 +1,136 @@
+"""
+Unit of work object that queues MappingDb save and delete calls and sends
+them to the Infoblox device in chunks through the WAPI request object.
+
+"""
+import copy
+import logging
+
+from infoblox import codec
+from infoblox import exceptions
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _assigned(value):
+    """Return True if the value contains a function call, such as to
+    allocate the next available address, that the device replaces with the
+    value it assigns.
+
+    """
+    if isinstance(value, dict):
+        return any(_assigned(item) for item in value.values())
+    if isinstance(value, list):
+        return any(_assigned(item) for item in value)
+    return hasattr(value, 'startswith') and value.startswith('func:')
+
+
+class Batch(object):
+    """Queue save and delete calls made on MappingDb objects that share the
+    session, sending them as multi-object requests when the batch exits or
+    is flushed. Only the calls made in the thread that entered the batch
+    are queued. Created with :meth:`infoblox.Session.batch`::
+
+        with session.batch() as batch:
+            for name in names:
+                host = infoblox.Host(session)
+                host.name = name
+                host.add_ipv4addr(network='10.0.0.0/24')
+                host.save()
+
+    Saved objects are assigned the reference id returned for them, but are
+    not fetched again, and changes made to them after the save was queued
+    are still reported by ``changes()``. Fields that were saved with a
+    function call, such as the next available address, are fetched again
+    when they are next used. Any errors are collected in
+    :attr:`errors` as a list of object and ProtocolError tuples.
+
+    :param infoblox.Session session: The session to send the requests with
+    :param int size: The maximum number of operations per request
+
+    """
+    PATH = 'request'
+
+    def __init__(self, session, size=1000):
+        self.errors = []
+        self.session = session
+        self.size = size
+        self._queue = []
+
+    def __enter__(self):
+        self.session.queue = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.session.queue = None
+        if exc_type is None:
+            self.flush()
+            if self.errors:
+                raise exceptions.ProtocolError('%i of the batched operations '
+                                               'failed' % len(self.errors))
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, obj, method, data=None):
+        """Queue an operation for the object, sending the queue if it has
+        reached the batch size.
+
+        :param infoblox.mappingDb.MappingDb obj: The object to operate on
+        :param str method: The HTTP method for the operation
+        :param dict data: The values to send for the object
+
+        """
+        operation = {'method': method, 'object': obj._path}
+        if data:
+            operation['data'] = data
+        # The values the object will have once the operation is sent
+        snapshot = None if method == 'DELETE' else \
+            copy.deepcopy(obj._save_values())
+        self._queue.append((obj, operation, snapshot))
+        if len(self._queue) >= self.size:
+            self.flush()
+
+    def flush(self):
+        """Send all of the queued operations, mapping the returned reference
+        ids or errors back on to the objects.
+
+        :rtype: bool
+
+        """
+        while self._queue:
+            chunk, self._queue = (self._queue[:self.size],
+                                  self._queue[self.size:])
+            self._send(chunk)
+        return not self.errors
+
+    def _send(self, chunk):
+        """Send a chunk of queued operations as a single request.
+
+        :param list chunk: The object, operation and snapshot tuples to
+            send
+
+        """
+        LOGGER.debug('Sending %i batched operations', len(chunk))
+        response = self.session.post(self.PATH, [item[1] for item in chunk])
+        if response.status_code not in (200, 201):
+            try:
+                error = exceptions.ProtocolError(
+                    codec.loads(response.content)['text'])
+            except ValueError:
+                error = exceptions.ProtocolError(response.content)
+            self.errors.extend([(item[0], error) for item in chunk])
+            return
+        results = codec.loads(response.content)
+        for (obj, operation, snapshot), result in zip(chunk, results):
+            obj._invalidate()
+            if operation['method'] == 'DELETE':
+                obj._ref = None
+                obj.clear()
+            else:
+                obj._ref = result
+                obj._snapshot = snapshot
+                obj._defer(obj._unloaded.union(
+                    key for key, value in operation.get('data', {}).items()
+                    if _assigned(value)))
+            obj._dirty = False
@@ -0,0 +1,125 @@
+"""
+Run MappingDb operations for many objects across a pool of worker threads
+that share the session and its connection pool.
+
+"""
+import logging
+import threading
+from multiprocessing import pool
+
+from infoblox import exceptions
+from infoblox import throttle
+
+LOGGER = logging.getLogger(__name__)
+
+WORKERS = 8
+
+# Rate limiters shared by all bulk runs against the same appliance
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+class RateLimiter(throttle.TokenBucket):
+    """Space calls made from any number of threads so no more than rate
+    calls per second are started, as a token bucket without bursts. Use
+    :class:`infoblox.throttle.Limits` to limit every request sent with the
+    session instead.
+
+    :param float rate: The maximum number of calls per second
+
+    """
+    def __init__(self, rate):
+        super(RateLimiter, self).__init__(rate, 1)
+        self.interval = 1.0 / rate
+
+    def wait(self):
+        """Block until the next call is allowed to start."""
+        self.acquire()
+
+
+def limiter(host, rate):
+    """Return the shared rate limiter for the appliance, creating it or
+    replacing it if the rate has changed.
+
+    :param str host: The Infoblox host
+    :param float rate: The maximum number of calls per second
+    :rtype: RateLimiter
+
+    """
+    with _LIMITERS_LOCK:
+        if host not in _LIMITERS or _LIMITERS[host].interval != 1.0 / rate:
+            _LIMITERS[host] = RateLimiter(rate)
+        return _LIMITERS[host]
+
+
+def run(session, func, objects, workers=WORKERS, rate=None):
+    """Call func for each object in a pool of worker threads, returning the
+    results in the same order as the objects. A ProtocolError raised for an
+    object is returned in place of its result rather than raised::
+
+        hosts = [infoblox.Host(session, name=name) for name in names]
+        results = infoblox.bulk.run(session, 'save', hosts, workers=16)
+
+    :param infoblox.Session session: The session the objects were created with
+    :param func: A callable taking the object, or a method name to call on it
+    :type func: callable or str
+    :param list objects: The objects to run func for
+    :param int workers: The number of worker threads
+    :param float rate: The maximum number of calls per second to the appliance
+    :rtype: list
+
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+    workers = min(workers, len(objects))
+    session.resize_pool(workers)
+    rate_limiter = limiter(session.host, rate) if rate else None
+
+    def call(obj):
+        if rate_limiter:
+            rate_limiter.wait()
+        try:
+            if callable(func):
+                return func(obj)
+            return getattr(obj, func)()
+        except exceptions.ProtocolError as error:
+            LOGGER.debug('Error calling %r for %r: %r', func, obj, error)
+            return error
+
+    workers_pool = pool.ThreadPool(workers)
+    try:
+        return workers_pool.map(call, objects, chunksize=1)
+    finally:
+        workers_pool.close()
+        workers_pool.join()
+
+
+def delete(session, objects, workers=WORKERS, rate=None):
+    """Remove the objects from the Infoblox device in a pool of worker
+    threads. See :func:`run` for the parameters.
+
+    :rtype: list
+
+    """
+    return run(session, 'delete', objects, workers, rate)
+
+
+def fetch(session, objects, workers=WORKERS, rate=None):
+    """Fetch the objects from the Infoblox device in a pool of worker threads.
+    See :func:`run` for the parameters.
+
+    :rtype: list
+
+    """
+    return run(session, 'fetch', objects, workers, rate)
+
+
+def save(session, objects, workers=WORKERS, rate=None):
+    """Save the objects to the Infoblox device in a pool of worker threads.
+    See :func:`run` for the parameters.
+
+    :rtype: list
+
+    """
+    return run(session, 'save', objects, workers, rate)
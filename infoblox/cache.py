@@ -0,0 +1,141 @@
+"""
+Read-through cache for objects fetched from the Infoblox device, with a time
+to live and least recently used eviction.
+
+"""
+import collections
+import logging
+import threading
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+LOGGER = logging.getLogger(__name__)
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class Cache(object):
+    """Thread-safe cache of fetch results, set on a session to avoid fetching
+    the same objects from the Infoblox device again within the time to live::
+
+        session = infoblox.Session(infoblox_host, cache=Cache(ttl=30))
+
+    Entries are keyed by the path (the object type or reference id), search
+    criteria and return fields of the fetch. Saving or deleting an object
+    invalidates the entries that contain it, and every search entry for its
+    type, since the write may change which objects a search matches.
+
+    Any object with the same get, set, invalidate and stats methods can be
+    used in its place.
+
+    :param float ttl: Seconds an entry remains valid
+    :param int maxsize: The maximum number of entries
+
+    """
+    def __init__(self, ttl=60, maxsize=1024):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0,
+                       'invalidations': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+    def get(self, key):
+        """Return the cached value for the key, or None if it is not cached
+        or has expired.
+
+        :param tuple key: The cache key
+        :rtype: mixed
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if entry[0] < _clock():
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries[key] = self._entries.pop(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def invalidate(self, wapi_type, ref=None):
+        """Remove the entries that contain the object and every search entry
+        for the object type.
+
+        :param str wapi_type: The object type
+        :param str ref: The object reference id
+
+        """
+        with self._lock:
+            keys = self._keys.get(wapi_type, set()) | self._keys.get(ref, set())
+            for key in keys:
+                self._remove(key)
+            self._stats['invalidations'] += len(keys)
+
+    def set(self, key, value, wapi_type, refs=()):
+        """Cache the value, evicting the least recently used entry if the
+        cache is full.
+
+        :param tuple key: The cache key, starting with the path
+        :param mixed value: The value to cache
+        :param str wapi_type: The object type of the value
+        :param list refs: The reference ids of the objects in the value
+
+        """
+        # Entries are indexed by the type for searches and by the reference
+        # ids of the objects they contain
+        index = list(refs)
+        if key[0] == wapi_type:
+            index.append(wapi_type)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (_clock() + self.ttl, value, index)
+            for name in index:
+                self._keys[name].add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        """Remove the entry and its index references, if it exists.
+
+        :param tuple key: The cache key
+
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for name in entry[2]:
+            self._keys[name].discard(key)
+            if not self._keys[name]:
+                del self._keys[name]
+
+    def stats(self):
+        """Return the hit, miss, eviction, expiry and invalidation counters
+        and the current number of entries.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            return stats
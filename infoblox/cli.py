@@ -3,18 +3,30 @@ API and command line app for working with Infoblox NIOS
 
 """
 import argparse
+import csv
+import gzip
+import itertools
+import json
 import logging
 import sys
 
-from infoblox import Host, Session
+from infoblox import codec
+from infoblox import exceptions
+from infoblox import Host, HostIPv4, Network, Session
 
 LOGGER = logging.getLogger(__name__)
 
-__cli_description__ = 'Add or remove a host from the Infoblox appliance'
+__cli_description__ = ('Add, remove, import or export hosts on the Infoblox '
+                       'appliance')
 __version__ = '1.0.0'
 
 USERNAME = 'admin'
 PASSWORD = 'infoblox'
+BATCH_SIZE = 100
+PAGE_SIZE = 1000
+WORKERS = 8
+
+EXPORT_TYPES = [Host, Network, HostIPv4]
 COMMENT = ('Added by the Python infoblox library at '
            'https://crate.io/packages/infoblox')
 
@@ -56,13 +68,167 @@ class InfobloxHost(object):
         :param str ipv4addr: IP Address to add/set
         :param str comment: The comment for the record
 
+        """
+        return self._new_host(hostname, ipv4addr, comment).save()
+
+    def import_hosts(self, rows, report, workers=WORKERS,
+                     batch_size=BATCH_SIZE, progress=None):
+        """Add or remove the hosts in rows, a dict per host with the action,
+        name, ipv4addr and comment keys. The hosts in each batch of rows are
+        fetched by a pool of worker threads, then their changes are sent in
+        a single batched request. A JSON result is written to report for
+        each row, returning the number of rows that failed.
+
+        :param iter rows: The rows to import
+        :param file report: The file to write the results to
+        :param int workers: The number of worker threads
+        :param int batch_size: The number of rows per batched request
+        :param file progress: The file to write progress to
+        :rtype: int
+
+        """
+        rows = iter(rows)
+        count, failed = 0, 0
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk:
+                break
+            prepared = self.session.map(self._prepare_row, chunk, workers)
+            errors = self._apply([value for value in prepared
+                                  if not isinstance(value, Exception)],
+                                 batch_size)
+            for row, value in zip(chunk, prepared):
+                count += 1
+                error = value if isinstance(value, Exception) \
+                    else errors.get(id(value[0]))
+                result = {'row': count,
+                          'action': row.get('action') or 'add',
+                          'name': row.get('name'),
+                          'status': 'error' if error else 'ok'}
+                if error:
+                    failed += 1
+                    result['error'] = str(error)
+                report.write(json.dumps(result) + '\n')
+            report.flush()
+            if progress:
+                progress.write('Processed %i rows, %i failed\n' %
+                               (count, failed))
+        return failed
+
+    def export(self, output, types=EXPORT_TYPES, page_size=PAGE_SIZE,
+               page_id=None, progress=None, page_type=None):
+        """Write each object of the types to output as a JSON object per
+        line, fetching them a page at a time so only one page is held in
+        memory. The type and id of the next page are written to progress
+        after each page, and can be passed back in as page_type and page_id
+        to resume the export, skipping the types before page_type. Returns
+        the number of objects written.
+
+        :param file output: The binary file to write to
+        :param list types: The MappingDb classes of the objects to export
+        :param int page_size: The number of objects to fetch per request
+        :param str page_id: The page of page_type to resume from
+        :param file progress: The file to write progress to
+        :param str page_type: The type of page_id, defaults to the first type
+        :rtype: int
+        :raises: ValueError
+
+        """
+        wapi_types = [obj_class._wapi_type for obj_class in types]
+        if page_type is not None:
+            if page_type not in wapi_types:
+                raise ValueError('Not an exported type: %s' % page_type)
+            types = types[wapi_types.index(page_type):]
+        count = 0
+        for obj_class in types:
+            for next_page, results in obj_class.result_pages(self.session,
+                                                             page_size,
+                                                             page_id):
+                for values in results:
+                    output.write(codec.encode(values) + b'\n')
+                count += len(results)
+                if progress:
+                    progress.write('Exported %i objects, %s next page: %s\n'
+                                   % (count, obj_class._wapi_type, next_page))
+            page_id = None
+            output.flush()
+        return count
+
+    def _apply(self, prepared, batch_size):
+        """Save or delete the prepared hosts in a batch, returning the errors
+        keyed by the id of the host they are for.
+
+        :param list prepared: The host and method name tuples
+        :param int batch_size: The number of operations per request
+        :rtype: dict
+
+        """
+        batch = self.session.batch(batch_size)
+        try:
+            with batch:
+                for host, action in prepared:
+                    getattr(host, action)()
+        except exceptions.ProtocolError as error:
+            LOGGER.debug('Batch failed: %s', error)
+        return dict((id(host), error) for host, error in batch.errors)
+
+    def _new_host(self, hostname, ipv4addr, comment=None):
+        """Return the host with the IP address and comment set, replacing any
+        IP addresses it already has.
+
+        :param str hostname: Hostname to add/set
+        :param str ipv4addr: IP Address to add/set
+        :param str comment: The comment for the record
+        :rtype: infoblox.Host
+
         """
         host = Host(self.session, name=hostname)
         if host.ipv4addrs:
             host.ipv4addrs = []
         host.add_ipv4addr(ipv4addr)
         host.comment = comment
-        return host.save()
+        return host
+
+    def _prepare_row(self, row):
+        """Return the host for an import row and the method to call on it,
+        or the error when the row is invalid.
+
+        :param dict row: The row to prepare
+        :rtype: tuple|Exception
+
+        """
+        action = row.get('action') or 'add'
+        if not row.get('name'):
+            return ValueError('Missing name')
+        if action == 'add':
+            if not row.get('ipv4addr'):
+                return ValueError('Missing ipv4addr')
+            return (self._new_host(row['name'], row['ipv4addr'],
+                                   row.get('comment') or None), 'save')
+        elif action == 'remove':
+            host = Host(self.session, name=row['name'])
+            if not host._ref:
+                return ValueError('Host not found')
+            return host, 'delete'
+        return ValueError('Invalid action: %s' % action)
+
+
+def read_rows(handle, input_format):
+    """Iterate over the rows of a CSV file with a header line, or of a file
+    with a JSON object per line, as dicts.
+
+    :param file handle: The file to read
+    :param str input_format: csv or jsonl
+    :rtype: iter
+
+    """
+    if input_format == 'csv':
+        for row in csv.DictReader(handle):
+            yield row
+    else:
+        for line in handle:
+            if line.strip():
+                yield codec.loads(line)
 
 
 def main():
@@ -87,22 +253,84 @@ def main():
                         action='store',
                         help='The password to authenticate with. '
                              'Default: %s' % PASSWORD)
-    parser.add_argument('action',
-                        choices=['add', 'remove'],
-                        help='Specify if you are adding or removing a host')
-    parser.add_argument('host',
-                        metavar='<FQDN>',
-                        action='store',
-                        help='The FQDN for the host')
-    parser.add_argument('address',
-                        metavar='[IPv4 Address]',
-                        action='store',
-                        help='The IPv4 address for the host')
-    parser.add_argument('comment',
-                        metavar='[COMMENT]',
-                        default='',
-                        action='store',
-                        help='A comment set on the host when adding.')
+    actions = parser.add_subparsers(dest='action', metavar='<action>')
+    actions.required = True
+    for action, description in [('add', 'Add a host'),
+                                ('remove', 'Remove a host')]:
+        subparser = actions.add_parser(action, help=description)
+        subparser.add_argument('host',
+                               metavar='<FQDN>',
+                               action='store',
+                               help='The FQDN for the host')
+        subparser.add_argument('address',
+                               metavar='[IPv4 Address]',
+                               nargs='?' if action == 'remove' else None,
+                               action='store',
+                               help='The IPv4 address for the host')
+        subparser.add_argument('comment',
+                               metavar='[COMMENT]',
+                               nargs='?',
+                               default='',
+                               action='store',
+                               help='A comment set on the host when adding.')
+    importer = actions.add_parser('import',
+                                  help='Add or remove the hosts listed in a '
+                                       'CSV or JSON lines file')
+    importer.add_argument('path',
+                          metavar='[FILE]',
+                          nargs='?',
+                          default='-',
+                          help='The file to import, with the action, name, '
+                               'ipv4addr and comment of each host. '
+                               'Default: stdin')
+    importer.add_argument('-f', '--format',
+                          choices=['csv', 'jsonl'],
+                          help='The file format. Default: jsonl for .json '
+                               'and .jsonl files, otherwise csv')
+    importer.add_argument('-r', '--report',
+                          default='-',
+                          help='The file to write the JSON result for each '
+                               'row to. Default: stdout')
+    importer.add_argument('-w', '--workers',
+                          type=int,
+                          default=WORKERS,
+                          help='The number of hosts to fetch concurrently. '
+                               'Default: %i' % WORKERS)
+    importer.add_argument('-b', '--batch-size',
+                          type=int,
+                          default=BATCH_SIZE,
+                          help='The number of changes per request. '
+                               'Default: %i' % BATCH_SIZE)
+    exporter = actions.add_parser('export',
+                                  help='Write the hosts, host addresses and '
+                                       'networks as JSON lines')
+    exporter.add_argument('types',
+                          metavar='[TYPE]',
+                          nargs='*',
+                          help='The object types to export, from %s. '
+                               'Default: all of them' %
+                               ', '.join(obj_class._wapi_type
+                                         for obj_class in EXPORT_TYPES))
+    exporter.add_argument('-o', '--output',
+                          default='-',
+                          help='The file to write to, gzip compressed if it '
+                               'ends with .gz. Default: stdout')
+    exporter.add_argument('-z', '--gzip',
+                          action='store_true',
+                          help='Compress the output with gzip')
+    exporter.add_argument('-s', '--page-size',
+                          type=int,
+                          default=PAGE_SIZE,
+                          help='The number of objects per request. '
+                               'Default: %i' % PAGE_SIZE)
+    exporter.add_argument('--page-id',
+                          help='Resume the export from the next page id '
+                               'written to stderr, appending to the output '
+                               'file')
+    exporter.add_argument('--page-type',
+                          help='The type written to stderr with the page id, '
+                               'skipping the types before it. Default: the '
+                               'first type')
     args = vars(parser.parse_args())
     if args['debug']:
         logging.basicConfig(level=logging.DEBUG)
@@ -120,7 +348,49 @@ def main():
             sys.stdout.write('Host removed\n')
         else:  # Exit with an error status
             sys.exit(1)
-
+    elif args['action'] == 'import':
+        input_format = args['format'] or \
+            ('jsonl' if args['path'].endswith(('.json', '.jsonl')) else 'csv')
+        handle = sys.stdin if args['path'] == '-' else open(args['path'])
+        report = sys.stdout if args['report'] == '-' \
+            else open(args['report'], 'w')
+        try:
+            failed = infoblox.import_hosts(read_rows(handle, input_format),
+                                           report, args['workers'],
+                                           args['batch_size'], sys.stderr)
+        finally:
+            for stream in (handle, report):
+                if stream not in (sys.stdin, sys.stdout):
+                    stream.close()
+        if failed:  # Exit with an error status
+            sys.exit(1)
+    elif args['action'] == 'export':
+        types = dict((obj_class._wapi_type, obj_class)
+                     for obj_class in EXPORT_TYPES)
+        for wapi_type in args['types']:
+            if wapi_type not in types:
+                parser.error('invalid type: %s' % wapi_type)
+        export_types = [types[wapi_type] for wapi_type in args['types']] \
+            or EXPORT_TYPES
+        if args['page_type'] and args['page_type'] not in \
+                [obj_class._wapi_type for obj_class in export_types]:
+            parser.error('invalid page type: %s' % args['page_type'])
+        mode = 'ab' if args['page_id'] or args['page_type'] else 'wb'
+        if args['output'] == '-':
+            handle = getattr(sys.stdout, 'buffer', sys.stdout)
+        else:
+            handle = open(args['output'], mode)
+        output = handle
+        if args['gzip'] or args['output'].endswith('.gz'):
+            output = gzip.GzipFile(fileobj=handle, mode=mode)
+        try:
+            infoblox.export(output, export_types, args['page_size'],
+                            args['page_id'], sys.stderr, args['page_type'])
+        finally:
+            if output is not handle:
+                output.close()
+            if args['output'] != '-':
+                handle.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,248 @@
+"""
+JSON encoding and decoding for the WAPI request and response bodies, using
+the fastest of orjson, ujson and simplejson that is installed and falling
+back to the standard library json module. Large response bodies can also be
+parsed incrementally as they are received.
+
+"""
+import codecs
+import json
+import logging
+import numbers
+import sys
+
+LOGGER = logging.getLogger(__name__)
+
+# The number of bytes to read at a time when parsing incrementally
+CHUNK_SIZE = 65536
+
+# The characters that may continue a number split across chunks
+_NUMBER_CHARS = '0123456789+-.eE'
+
+# The type of decoded text, without a u'' literal that Python 3.2 rejects
+_text_type = str if sys.version_info[0] > 2 else unicode
+
+# The supported libraries, in order of preference
+BACKENDS = ['orjson', 'ujson', 'simplejson', 'json']
+
+# The name of the library in use
+name = 'json'
+
+_module = json
+_options = {'ensure_ascii': False}
+
+
+def use(backend=None):
+    """Switch to the JSON library, or the first installed library in
+    :data:`BACKENDS` if it is None, returning its name.
+
+    :param str backend: The library to use
+    :rtype: str
+    :raises: ImportError
+    :raises: ValueError
+
+    """
+    global name, _module, _options
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError('Unsupported JSON library: %s' % backend)
+    for candidate in [backend] if backend else BACKENDS:
+        try:
+            __import__(candidate)
+        except ImportError:
+            if backend:
+                raise
+            continue
+        name, _module = candidate, sys.modules[candidate]
+        _options = {} if name == 'orjson' else {'ensure_ascii': False}
+        if name == 'ujson':
+            _options['escape_forward_slashes'] = False
+        LOGGER.debug('Using %s for JSON', name)
+        return name
+
+
+def dumps(value):
+    """Serialize the value as a JSON document, leaving non-ASCII characters
+    as they are.
+
+    :param mixed value: The value to serialize
+    :rtype: str|unicode
+
+    """
+    if name == 'orjson':
+        return _module.dumps(value).decode('utf-8')
+    return _module.dumps(value, **_options)
+
+
+def encode(value):
+    """Serialize the value as a UTF-8 encoded JSON document, for use as a
+    request body.
+
+    :param mixed value: The value to serialize
+    :rtype: bytes
+
+    """
+    value = _module.dumps(value, **_options)
+    return value if isinstance(value, bytes) else value.encode('utf-8')
+
+
+def loads(value):
+    """Deserialize the JSON document, passed as text or UTF-8 encoded bytes.
+    Invalid documents raise ValueError with every library.
+
+    :param bytes|str|unicode value: The JSON document
+    :rtype: mixed
+    :raises: ValueError
+
+    """
+    if name == 'json' and isinstance(value, bytes) and bytes is not str:
+        value = value.decode('utf-8')
+    return _module.loads(value)
+
+
+def iterload(chunks, meta=None):
+    """Incrementally parse a JSON array, or an object with the array in its
+    result key as returned for WAPI paging, from an iterable of UTF-8
+    encoded chunks. Each item of the array is yielded as soon as it has
+    been received, so only one item and the unparsed part of the last chunk
+    are held in memory. The other keys of an object, such as next_page_id,
+    are stored in the meta dict once they have been parsed::
+
+        response = session.get('ipv4address', criteria, stream=True)
+        for values in codec.iterload(response.iter_content(CHUNK_SIZE)):
+            print(values['ip_address'])
+
+    :param iter chunks: The chunks of the JSON document
+    :param dict meta: The dict to store the other keys of an object in
+    :rtype: iterator
+    :raises: ValueError
+
+    """
+    parser = _Parser(chunks)
+    char = parser.skip()
+    if char == '{':
+        parser.position += 1
+        while parser.skip() != '}':
+            key = parser.value()
+            parser.expect(':')
+            if key == 'result' and parser.skip() == '[':
+                for item in parser.array():
+                    yield item
+            else:
+                value = parser.value()
+                if meta is not None:
+                    meta[key] = value
+            if parser.skip() == ',':
+                parser.position += 1
+    elif char == '[':
+        for item in parser.array():
+            yield item
+    else:
+        raise ValueError('Expected a JSON array or object')
+
+
+class _Parser(object):
+    """Parse JSON values from a buffer that is filled from the chunks as
+    more of the document is needed.
+
+    """
+    def __init__(self, chunks):
+        self.buffer = _text_type()
+        self.position = 0
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder('utf-8')().decode
+        self._decoder = json.JSONDecoder()
+        self._eof = False
+
+    def array(self):
+        """Yield the values of the array starting at the current position.
+
+        :rtype: iterator
+        :raises: ValueError
+
+        """
+        self.expect('[')
+        if self.skip() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.value()
+            char = self.skip()
+            self.position += 1
+            if char == ']':
+                return
+            elif char != ',':
+                raise ValueError('Expected , or ] at %i' % self.position)
+
+    def expect(self, char):
+        """Move past the character, raising ValueError if it is not next.
+
+        :param str char: The expected character
+        :raises: ValueError
+
+        """
+        if self.skip() != char:
+            raise ValueError('Expected %s at %i' % (char, self.position))
+        self.position += 1
+
+    def fill(self):
+        """Add the next chunk to the buffer, dropping the parsed part of it,
+        returning False once all of the chunks have been read.
+
+        :rtype: bool
+
+        """
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            chunk = b''
+        self.buffer = self.buffer[self.position:] + \
+            self._decode(chunk, self._eof)
+        self.position = 0
+        return True
+
+    def skip(self):
+        """Move past any whitespace, returning the next character or an
+        empty string at the end of the document.
+
+        :rtype: str
+
+        """
+        while True:
+            while self.position < len(self.buffer) and \
+                    self.buffer[self.position] in ' \t\n\r':
+                self.position += 1
+            if self.position < len(self.buffer) or not self.fill():
+                return self.buffer[self.position:self.position + 1]
+
+    def value(self):
+        """Parse the value at the current position, reading more chunks
+        until it is complete.
+
+        :rtype: mixed
+        :raises: ValueError
+
+        """
+        self.skip()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer,
+                                                      self.position)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk,
+            # including after what was parsed of it such as 1. or 1e
+            partial = end == len(self.buffer) or (
+                isinstance(value, numbers.Number) and
+                not isinstance(value, bool) and
+                not self.buffer[end:].strip(_NUMBER_CHARS))
+            if not partial or not self.fill():
+                self.position = end
+                return value
+
+
+use()
@@ -3,4 +3,10 @@
 class ProtocolError(Exception):
 
     def __repr__(self):
-        return '<%s %s>' % (self.__class__.__name__, self.args[1])
+        return '<%s %s>' % (self.__class__.__name__,
+                            ' '.join([str(arg) for arg in self.args]))
+
+
+class CircuitOpenError(ProtocolError):
+    """Raised instead of sending a request while the circuit breaker of the
+    session is open."""
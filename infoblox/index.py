@@ -0,0 +1,262 @@
+"""
+Local in-memory index of Infoblox networks, answering which network contains
+an address by longest-prefix match in a binary prefix tree without a request
+to the Infoblox device.
+
+"""
+import logging
+import socket
+import struct
+
+from infoblox.network import Network
+
+LOGGER = logging.getLogger(__name__)
+
+FIELDS = ['network', 'network_view', 'comment']
+
+# Node slots in the prefix tree: the zero and one children and the network
+_ZERO, _ONE, _VALUE = 0, 1, 2
+
+
+def parse(value):
+    """Parse an address or CIDR network into a tuple of the address family,
+    the address as an integer and the prefix length.
+
+    :param str value: The address or network, e.g. 10.0.0.0/24
+    :rtype: tuple
+    :raises: ValueError
+
+    """
+    address, _sep, prefix = str(value).partition('/')
+    family = socket.AF_INET6 if ':' in address else socket.AF_INET
+    width = 128 if family == socket.AF_INET6 else 32
+    try:
+        packed = socket.inet_pton(family, address)
+    except socket.error:
+        raise ValueError('Invalid address: %s' % value)
+    if family == socket.AF_INET:
+        number = struct.unpack('!I', packed)[0]
+    else:
+        high, low = struct.unpack('!QQ', packed)
+        number = high << 64 | low
+    prefix_length = int(prefix) if prefix else width
+    if not 0 <= prefix_length <= width:
+        raise ValueError('Invalid prefix length: %s' % value)
+    return family, number, prefix_length
+
+
+class NetworkIndex(object):
+    """Prefix tree of the networks in a network view, answering longest
+    prefix match and containment queries in O(prefix length)::
+
+        index = NetworkIndex.load(session, network_view='default')
+        network = index.lookup('10.1.2.3')
+
+    Networks can be any objects with a network attribute holding the CIDR,
+    such as :class:`infoblox.Network` objects.
+
+    :param list networks: The networks to index
+
+    """
+    def __init__(self, networks=()):
+        self.fields = FIELDS
+        self.network_view = None
+        self.session = None
+        self._count = 0
+        self._roots = {socket.AF_INET: [None, None, None],
+                       socket.AF_INET6: [None, None, None]}
+        for network in networks:
+            self.add(network)
+
+    def __contains__(self, cidr):
+        node = self._node(cidr)
+        return node is not None and node[_VALUE] is not None
+
+    def __iter__(self):
+        for root in self._roots.values():
+            for network in self._walk(root):
+                yield network
+
+    def __len__(self):
+        return self._count
+
+    @classmethod
+    def load(cls, session, network_view='default', fields=None,
+             page_size=1000):
+        """Create an index of all the networks in the network view, fetched
+        from the Infoblox device with paged searches.
+
+        :param infoblox.Session session: The established session object
+        :param str network_view: The network view to index
+        :param list fields: The network fields to fetch, loading the others
+            on access
+        :param int page_size: The number of networks to fetch per request
+        :rtype: NetworkIndex
+
+        """
+        index = cls()
+        index.fields = list(fields or FIELDS)
+        index.network_view = network_view
+        index.session = session
+        for network in Network.search(session, page_size, fields=index.fields,
+                                      network_view=network_view):
+            index.add(network)
+        LOGGER.debug('Indexed %i networks in %s', len(index), network_view)
+        return index
+
+    def add(self, network):
+        """Add the network to the index, replacing a network with the same
+        CIDR.
+
+        :param infoblox.Network network: The network to add
+
+        """
+        family, number, prefix_length = parse(network.network)
+        width = 128 if family == socket.AF_INET6 else 32
+        node = self._roots[family]
+        for bit in range(width - 1, width - 1 - prefix_length, -1):
+            branch = number >> bit & 1
+            if node[branch] is None:
+                node[branch] = [None, None, None]
+            node = node[branch]
+        if node[_VALUE] is None:
+            self._count += 1
+        node[_VALUE] = network
+
+    def containing(self, value):
+        """Return the networks that contain the address or network, from the
+        shortest prefix to the longest.
+
+        :param str value: The address or CIDR network
+        :rtype: list
+
+        """
+        family, number, prefix_length = parse(value)
+        width = 128 if family == socket.AF_INET6 else 32
+        node = self._roots[family]
+        networks = []
+        for bit in range(width - 1, width - 1 - prefix_length, -1):
+            if node[_VALUE] is not None:
+                networks.append(node[_VALUE])
+            node = node[number >> bit & 1]
+            if node is None:
+                return networks
+        if node[_VALUE] is not None:
+            networks.append(node[_VALUE])
+        return networks
+
+    def contained(self, cidr):
+        """Return the networks within the CIDR network, including a network
+        with the same CIDR, in address order.
+
+        :param str cidr: The CIDR network
+        :rtype: list
+
+        """
+        node = self._node(cidr)
+        return list(self._walk(node)) if node else []
+
+    def lookup(self, value):
+        """Return the most specific network containing the address or
+        network, or None if no network contains it.
+
+        :param str value: The address or CIDR network
+        :rtype: infoblox.Network
+
+        """
+        networks = self.containing(value)
+        return networks[-1] if networks else None
+
+    def refresh(self, page_size=1000):
+        """Fetch the networks in the network view again and apply the
+        differences to the index in place, returning the number of networks
+        added, changed and removed.
+
+        :param int page_size: The number of networks to fetch per request
+        :rtype: tuple
+        :raises: ValueError
+
+        """
+        if not self.session:
+            raise ValueError('Index was not loaded from a session')
+        current = dict((network.network, network) for network in self)
+        added, changed = 0, 0
+        for network in Network.search(self.session, page_size,
+                                      fields=self.fields,
+                                      network_view=self.network_view):
+            existing = current.pop(network.network, None)
+            if existing is None:
+                added += 1
+            elif existing._ref == network._ref and \
+                    all([getattr(existing, key) == getattr(network, key)
+                         for key in self.fields]):
+                continue
+            else:
+                changed += 1
+            self.add(network)
+        for cidr in current:
+            self.remove(cidr)
+        return added, changed, len(current)
+
+    def remove(self, cidr):
+        """Remove the network with the CIDR from the index, returning it.
+
+        :param str cidr: The CIDR network
+        :rtype: infoblox.Network
+        :raises: KeyError
+
+        """
+        family, number, prefix_length = parse(cidr)
+        width = 128 if family == socket.AF_INET6 else 32
+        path = [self._roots[family]]
+        for bit in range(width - 1, width - 1 - prefix_length, -1):
+            node = path[-1][number >> bit & 1]
+            if node is None:
+                raise KeyError(cidr)
+            path.append(node)
+        network = path[-1][_VALUE]
+        if network is None:
+            raise KeyError(cidr)
+        path[-1][_VALUE] = None
+        self._count -= 1
+        # Prune the nodes that no longer lead to a network
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node[_ZERO] or node[_ONE] or node[_VALUE] is not None:
+                break
+            bit = width - depth
+            path[depth - 1][number >> bit & 1] = None
+        return network
+
+    def _node(self, cidr):
+        """Return the tree node for the CIDR network, if it exists.
+
+        :param str cidr: The CIDR network
+        :rtype: list
+
+        """
+        family, number, prefix_length = parse(cidr)
+        width = 128 if family == socket.AF_INET6 else 32
+        node = self._roots[family]
+        for bit in range(width - 1, width - 1 - prefix_length, -1):
+            node = node[number >> bit & 1]
+            if node is None:
+                return None
+        return node
+
+    @staticmethod
+    def _walk(node):
+        """Iterate through the networks below the node in address order.
+
+        :param list node: The tree node to start from
+        :rtype: iterator
+
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node[_VALUE] is not None:
+                yield node[_VALUE]
+            for branch in (_ONE, _ZERO):
+                if node[branch] is not None:
+                    stack.append(node[branch])
@@ -0,0 +1,276 @@
+"""
+Sets of address ranges for planning address space locally, such as finding
+where a new subnet fits in a network container from one search for the
+networks already in it instead of a request per network.
+
+"""
+import bisect
+import collections
+import logging
+import socket
+import struct
+
+from infoblox.index import parse
+from infoblox.network import Network
+from infoblox.network import NetworkContainer
+
+LOGGER = logging.getLogger(__name__)
+
+Fragmentation = collections.namedtuple('Fragmentation',
+                                       ['intervals', 'size', 'largest',
+                                        'largest_prefix', 'ratio'])
+
+
+def _bounds(width, number, prefix_length):
+    """Return the first and last address of the network."""
+    host_mask = (1 << (width - prefix_length)) - 1
+    return number & ~host_mask, number | host_mask
+
+
+def _format(family, number, prefix_length):
+    """Return the address as a CIDR network string."""
+    if family == socket.AF_INET:
+        address = socket.inet_ntoa(struct.pack('!I', number))
+    else:
+        address = socket.inet_ntop(family, struct.pack(
+            '!QQ', number >> 64, number & 0xffffffffffffffff))
+    return '%s/%i' % (address, prefix_length)
+
+
+class IntervalSet(object):
+    """The addresses of one address family as sorted, non-overlapping
+    intervals of the first and last address as integers::
+
+        used = IntervalSet.from_networks(['10.0.0.0/24', '10.0.2.0/23'])
+        free = IntervalSet.from_networks(['10.0.0.0/16']) - used
+        subnet = next(free.free_prefixes(24))
+
+    Building a set sorts the intervals once, and union and difference walk
+    both sets in order, so all of the operations are O(n log n) or better.
+
+    :param list intervals: The first and last address tuples
+    :param int family: socket.AF_INET or socket.AF_INET6
+
+    """
+    def __init__(self, intervals=(), family=socket.AF_INET):
+        self.family = family
+        self.width = 128 if family == socket.AF_INET6 else 32
+        self._intervals = self._merge(sorted(intervals))
+
+    def __contains__(self, value):
+        family, number, prefix_length = parse(value)
+        if family != self.family:
+            return False
+        first, last = _bounds(self.width, number, prefix_length)
+        index = bisect.bisect_right(self._intervals,
+                                    (first, 1 << self.width)) - 1
+        return index >= 0 and self._intervals[index][1] >= last
+
+    def __eq__(self, other):
+        return isinstance(other, IntervalSet) and \
+            self.family == other.family and \
+            self._intervals == other._intervals
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __repr__(self):
+        return '<IntervalSet %s>' % ' '.join(self.cidrs())
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    @classmethod
+    def from_networks(cls, networks, family=None):
+        """Create a set of the addresses in the networks, passed as CIDR
+        strings or objects with a network attribute such as
+        :class:`infoblox.Network` objects.
+
+        :param list networks: The networks
+        :param int family: The address family if networks may be empty
+        :rtype: IntervalSet
+        :raises: ValueError
+
+        """
+        intervals = []
+        for network in networks:
+            network_family, number, prefix_length = \
+                parse(getattr(network, 'network', network))
+            if family is None:
+                family = network_family
+            elif network_family != family:
+                raise ValueError('Mixed address families: %s' % network)
+            intervals.append(_bounds(128 if family == socket.AF_INET6 else 32,
+                                     number, prefix_length))
+        return cls(intervals, family or socket.AF_INET)
+
+    @property
+    def size(self):
+        """The number of addresses in the set.
+
+        :rtype: int
+
+        """
+        return sum(last - first + 1 for first, last in self._intervals)
+
+    def cidrs(self):
+        """Return the set as the fewest CIDR networks, in address order.
+
+        :rtype: list
+
+        """
+        return [_format(self.family, first, prefix_length)
+                for first, prefix_length in self._blocks()]
+
+    def difference(self, other):
+        """Return a set of the addresses that are not in the other set.
+
+        :param IntervalSet other: The addresses to remove
+        :rtype: IntervalSet
+        :raises: ValueError
+
+        """
+        self._check(other)
+        result, others, offset = [], other._intervals, 0
+        for first, last in self._intervals:
+            while offset < len(others) and others[offset][1] < first:
+                offset += 1
+            start, index = first, offset
+            while index < len(others) and others[index][0] <= last:
+                if others[index][0] > start:
+                    result.append((start, others[index][0] - 1))
+                start = max(start, others[index][1] + 1)
+                index += 1
+            if start <= last:
+                result.append((start, last))
+        return self._new(result)
+
+    def fragmentation(self):
+        """Return how fragmented the set is, with the number of intervals,
+        the number of addresses, the size of the largest interval, the
+        shortest prefix length that fits in the set and the ratio of the
+        addresses outside of the largest interval, which is 0 for a single
+        interval and approaches 1 as the set is split into more pieces.
+
+        :rtype: Fragmentation
+
+        """
+        size = self.size
+        largest = max([last - first + 1 for first, last in self._intervals]
+                      or [0])
+        largest_prefix = min([prefix_length for _first, prefix_length
+                              in self._blocks()] or [None])
+        return Fragmentation(len(self._intervals), size, largest,
+                             largest_prefix,
+                             1 - float(largest) / size if size else 0.0)
+
+    def free_prefixes(self, prefix_length):
+        """Iterate through the aligned CIDR networks with the prefix length
+        that fit in the set, in address order.
+
+        :param int prefix_length: The prefix length of the networks
+        :rtype: iterator
+        :raises: ValueError
+
+        """
+        if not 0 <= prefix_length <= self.width:
+            raise ValueError('Invalid prefix length: %s' % prefix_length)
+        block = 1 << (self.width - prefix_length)
+        for first, last in self._intervals:
+            start = (first + block - 1) // block * block
+            while start + block - 1 <= last:
+                yield _format(self.family, start, prefix_length)
+                start += block
+
+    def union(self, other):
+        """Return a set of the addresses in either set.
+
+        :param IntervalSet other: The addresses to add
+        :rtype: IntervalSet
+        :raises: ValueError
+
+        """
+        self._check(other)
+        merged, left, right = [], self._intervals, other._intervals
+        i = j = 0
+        while i < len(left) or j < len(right):
+            if j == len(right) or (i < len(left) and left[i] < right[j]):
+                merged.append(left[i])
+                i += 1
+            else:
+                merged.append(right[j])
+                j += 1
+        return self._new(self._merge(merged))
+
+    def _blocks(self):
+        """Iterate through the first address and prefix length of the
+        largest aligned blocks that make up the intervals.
+
+        """
+        for first, last in self._intervals:
+            while first <= last:
+                block = first & -first if first else 1 << self.width
+                while block > last - first + 1:
+                    block >>= 1
+                # The block is a power of two, its binary form is 0b1 and
+                # then one zero per host bit
+                yield first, self.width - (len(bin(block)) - 3)
+                first += block
+
+    def _check(self, other):
+        """Raise ValueError if the other set is of another family."""
+        if other.family != self.family:
+            raise ValueError('Mixed address families')
+
+    @staticmethod
+    def _merge(intervals):
+        """Merge sorted intervals that overlap or are adjacent."""
+        merged = []
+        for first, last in intervals:
+            if merged and first <= merged[-1][1] + 1:
+                if last > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], last)
+            else:
+                merged.append((first, last))
+        return merged
+
+    def _new(self, intervals):
+        """Return a set of the family with already merged intervals."""
+        value = IntervalSet(family=self.family)
+        value._intervals = intervals
+        return value
+
+
+def free_space(session, network_container, network_view='default',
+               page_size=1000):
+    """Return the addresses in the network container that are not in one
+    of the networks or network containers directly within it, fetched with
+    a paged search for each.
+
+    :param infoblox.Session session: The established session object
+    :param str network_container: The network container in CIDR notation
+    :param str network_view: The network view
+    :param int page_size: The number of networks to fetch per request
+    :rtype: IntervalSet
+    :raises: infoblox.exceptions.ProtocolError
+
+    """
+    container = IntervalSet.from_networks([network_container])
+    used = IntervalSet(family=container.family)
+    for obj_class in (Network, NetworkContainer):
+        used |= IntervalSet.from_networks(
+            obj_class.search(session, page_size, compact=True,
+                             fields=['network'],
+                             network_container=network_container,
+                             network_view=network_view), container.family)
+    LOGGER.debug('%s has %i used ranges', network_container, len(used))
+    return container - used
@@ -3,12 +3,46 @@ A generic mapping object that allows access to attributes and via getters and
 setters.
 
 """
-import collections
+import abc
 import inspect
-import json
 
+try:
+    from collections.abc import Mapping as _Mapping
+except ImportError:
+    from collections import Mapping as _Mapping
 
-class Mapping(collections.Mapping):
+from infoblox import codec
+
+
+class _Schema(abc.ABCMeta):
+    """Metaclass that builds the field schema for a mapping class once, when
+    the class is created, so that attribute names do not need to be
+    discovered by reflection each time keys() is called.
+
+    """
+    def __init__(cls, name, bases, namespace):
+        super(_Schema, cls).__init__(name, bases, namespace)
+        cls._fields = tuple(sorted(key for key in dir(cls)
+                                   if cls._is_field(key)))
+        cls._field_set = frozenset(cls._fields)
+
+    def _is_field(cls, key):
+        """Return True if the class attribute name is a mapping field.
+
+        :param str key: The attribute name
+        :rtype: bool
+
+        """
+        if key[0:1] == '_' or key == 'keys' or key.isupper():
+            return False
+        value = getattr(cls, key)
+        return not (inspect.isroutine(value) or isinstance(value, property))
+
+
+_MappingBase = _Schema('_MappingBase', (_Mapping,), {})
+
+
+class Mapping(_MappingBase):
     """A generic data object that provides access to attributes via getters
     and setters, built in serialization via JSON, iterator methods
     and other Mapping methods.
@@ -17,6 +51,12 @@ class Mapping(collections.Mapping):
     # Flag indicating the mapping has changed attributes
     _dirty = False
 
+    # Attribute names set on the instance that are not class level fields
+    _extra = frozenset()
+
+    # Private attributes assigned per instance, stored in slots when compact
+    _instance_attrs = ('_dirty', '_extra')
+
     def __init__(self, **kwargs):
         """Assign all kwargs passed in as attributes of the object."""
         self.from_dict(kwargs)
@@ -27,7 +67,7 @@ class Mapping(collections.Mapping):
         :param str item: The attribute name
 
         """
-        return item in self.keys()
+        return item in self._field_set or item in self._extra
 
     def __eq__(self, other):
         """Test another mapping for equality against this one
@@ -48,10 +88,35 @@ class Mapping(collections.Mapping):
         :raises: KeyError
 
         """
-        if key not in self.keys():
+        if key not in self:
             raise KeyError(key)
         delattr(self, key)
 
+    def __delattr__(self, key):
+        """Delete the attribute from the object, removing it from the extra
+        keys if it is not a class level field.
+
+        :param str key: The attribute name
+
+        """
+        super(Mapping, self).__delattr__(key)
+        if key in self._extra:
+            self._extra = self._extra - frozenset([key])
+
+    def __getattr__(self, key):
+        """Return the class level default for a field that has not been
+        assigned on a compact instance.
+
+        :param str key: The attribute name
+        :rtype: mixed
+        :raises: AttributeError
+
+        """
+        defaults = getattr(type(self), '_defaults', None)
+        if defaults is None or key not in defaults:
+            raise AttributeError(key)
+        return defaults[key]
+
     def __getitem__(self, item):
         """Get an item from the mapping.
 
@@ -60,7 +125,7 @@ class Mapping(collections.Mapping):
         :raises: KeyError
 
         """
-        if item not in self.keys():
+        if item not in self:
             raise KeyError(item)
         return getattr(self, item)
 
@@ -86,7 +151,7 @@ class Mapping(collections.Mapping):
         :rtype: int
 
         """
-        return len(self.keys())
+        return len(self._fields) + len(self._extra)
 
     def __ne__(self, other):
         """Test two mappings for inequality.
@@ -113,8 +178,11 @@ class Mapping(collections.Mapping):
         :param mixed value: The value to set
 
         """
-        if key[0] != '_' and not self._dirty:
-            self._dirty = True
+        if key[0] != '_':
+            if not self._dirty:
+                self._dirty = True
+            if key not in self._field_set and key not in self._extra:
+                self._extra = self._extra | frozenset([key])
         super(Mapping, self).__setattr__(key, value)
 
     def __setitem__(self, key, value):
@@ -145,11 +213,38 @@ class Mapping(collections.Mapping):
             setattr(self, k, values[k])
 
     def clear(self):
-        """Clear all set attributes in the mapping.
+        """Clear all set attributes in the mapping, restoring class level
+        fields to their default values.
 
         """
         for key in self.keys():
-            delattr(self, key)
+            try:
+                delattr(self, key)
+            except AttributeError:
+                pass
+
+    @classmethod
+    def compact(cls):
+        """Return a variant of this class that stores its fields and instance
+        state in __slots__ instead of a per-instance __dict__, for use when
+        loading large numbers of objects. Unassigned fields fall back to the
+        class level defaults. The class is created once and cached.
+
+        :rtype: type
+
+        """
+        if '_compact' not in cls.__dict__:
+            slots = cls._fields + tuple(key for key in cls._instance_attrs
+                                        if key not in cls._field_set)
+            namespace = {'__slots__': slots,
+                         '__module__': cls.__module__,
+                         '__doc__': cls.__doc__,
+                         '_defaults': dict((key, getattr(cls, key))
+                                           for key in slots
+                                           if hasattr(cls, key))}
+            cls._compact = type(cls)(cls.__name__, (cls,), namespace)
+            cls._compact._compact = cls._compact
+        return cls._compact
 
     @property
     def dirty(self):
@@ -166,7 +261,7 @@ class Mapping(collections.Mapping):
         :rtype: str|unicode
 
         """
-        return json.dumps(self.as_dict(), encoding='utf-8', ensure_ascii=False)
+        return codec.dumps(self.as_dict())
 
     def loads(self, value):
         """Load in a serialized value, overwriting any previous values.
@@ -174,7 +269,7 @@ class Mapping(collections.Mapping):
         :param str|unicode value: The serialized value
 
         """
-        self.from_dict(json.loads(value, encoding='utf-8'))
+        self.from_dict(codec.loads(value))
 
     def keys(self):
         """Return a list of attribute names for the mapping.
@@ -182,13 +277,9 @@ class Mapping(collections.Mapping):
         :rtype: list
 
         """
-        return sorted([k for k in dir(self) if
-                       k[0:1] != '_' and k != 'keys' and not k.isupper() and
-                       not inspect.ismethod(getattr(self, k)) and
-                       not (hasattr(self.__class__, k) and
-                            isinstance(getattr(self.__class__, k),
-                                       property)) and
-                       not isinstance(getattr(self, k), property)])
+        if not self._extra:
+            return list(self._fields)
+        return sorted(self._fields + tuple(self._extra))
 
     def get(self, key, default=None):
         """Get the value of key, passing in a default value if it is not set.
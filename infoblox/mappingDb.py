@@ -2,29 +2,77 @@
 A generic mapping object that allows getters and setters and ties classes
 back to Infoblox objects.
 """
+import copy
+import json
 import logging
-from mapping import Mapping
+
+from infoblox import codec
+from infoblox import exceptions
+from infoblox.mapping import Mapping
 
 LOGGER = logging.getLogger(__name__)
 
+
+def _lazy_getattribute(self, key):
+    """Attribute access for objects with unloaded fields, loading the object
+    from the Infoblox device when one of them is accessed.
+
+    """
+    while key in object.__getattribute__(self, '_unloaded'):
+        object.__getattribute__(self, 'load')()
+    return object.__getattribute__(self, key)
+
+
+def _lazy_setattr(self, key, value):
+    """Attribute assignment for objects with unloaded fields, loading the
+    object first so the loaded value does not replace the assigned one.
+
+    """
+    if key in self._unloaded:
+        self.load()
+        return setattr(self, key, value)
+    super(type(self), self).__setattr__(key, value)
+
+
 class MappingDb(Mapping):
     """A generic data object that utilised the Mapping object for JSON related stuff.
     This is used to keep state of the object and sinc with the Infoblox Database
 
     """
+    _instance_attrs = Mapping._instance_attrs + ('_ref', '_search_values',
+                                                 '_projection', '_session',
+                                                 '_snapshot', '_unloaded')
+
+    # Fields to request when fetching, or None for all of them. Subclasses
+    # can set it to narrow what is fetched by default.
+    _projection = None
+
+    # The save values as last loaded from or saved to the Infoblox device
+    _snapshot = None
 
-    def __init__(self, session, reference_id=None, **kwargs):
-        """Create a new instance of the MappingDB object.
+    # Fields that will be loaded from the Infoblox device on first access
+    _unloaded = frozenset()
+
+    def __init__(self, session, reference_id=None, lazy=False, fields=None,
+                 **kwargs):
+        """Create a new instance of the MappingDB object. If lazy is True the
+        object is not fetched until a field that was not passed in is
+        accessed or load() is called. If fields is passed, only those fields
+        are fetched and the rest are loaded when first accessed.
 
         """
         super(MappingDb, self).__init__(**kwargs)
         self._session = session
         self._ref = reference_id
+        if fields is not None:
+            self._projection = list(fields)
         self._search_values = self._build_search_values(kwargs)
         if self._ref or self._search_values:
-            self.fetch()
-
-
+            if lazy:
+                self._defer(self._field_set.difference(kwargs,
+                                                       self._search_values))
+            else:
+                self._fetch_projection()
 
     def _assign(self, values):
         """Assign the values passed as either a dict or list to the object if
@@ -33,6 +81,7 @@ class MappingDb(Mapping):
         :param dict values: The values to assign
 
         """
+        from infoblox.record import get_class
         LOGGER.debug('Assigning values: %r', values)
         if not values:
             return
@@ -40,27 +89,116 @@ class MappingDb(Mapping):
         if not self._ref:
             keys.append('_ref')
         if isinstance(values, dict):
+            session = self._session
             for key in keys:
-                if values.get(key):
-                    if isinstance(values.get(key), list):
-                        items = list()
-                        for item in values[key]:
-                            if isinstance(item, dict):
-                                if '_ref' in item:
-                                    obj_class = get_class(item['_ref'])
-                                    if obj_class:
-                                        items.append(obj_class(self._session,
-                                                               **item))
-                            else:
-                                items.append(item)
-                        setattr(self, key, items)
-                    else:
-                        setattr(self, key, values[key])
+                value = values.get(key)
+                if not value:
+                    continue
+                if isinstance(value, list):
+                    items = list()
+                    for item in value:
+                        obj_class = None
+                        if isinstance(item, dict) and '_ref' in item:
+                            obj_class = get_class(item['_ref'])
+                        if obj_class:
+                            items.append(obj_class._proxy(session, item))
+                        else:
+                            items.append(item)
+                    value = items
+                setattr(self, key, value)
+            self._take_snapshot()
         elif isinstance(values, list):
             self._assign(values[0])
         else:
             LOGGER.critical('Unhandled return type: %r', values)
 
+    @classmethod
+    def _build(cls, session, values, unloaded=None):
+        """Create an instance of the class from the values returned by the
+        Infoblox device, without running the constructor and fetching it.
+        Fields in unloaded are left out of the snapshot and loaded on first
+        access.
+
+        :param infoblox.Session session: The established session object
+        :param dict values: The values to assign
+        :param frozenset unloaded: The fields that were not returned
+        :rtype: MappingDb
+
+        """
+        obj = cls.__new__(cls)
+        obj._session = session
+        obj._ref = values.get('_ref')
+        obj._search_values = {}
+        # Skip the unloaded fields when taking the snapshot, without paying
+        # for the lazy attribute access while assigning
+        obj._unloaded = frozenset(unloaded or ())
+        obj._assign(values)
+        obj._unloaded = frozenset()
+        obj._defer(unloaded)
+        obj._dirty = False
+        return obj
+
+    @classmethod
+    def _proxy(cls, session, values):
+        """Create an instance of the class from the partial values of a
+        nested object, that is only fetched when one of the other fields is
+        accessed.
+
+        :param infoblox.Session session: The established session object
+        :param dict values: The values to assign
+        :rtype: MappingDb
+
+        """
+        return cls._build(session, values, cls._field_set.difference(values))
+
+    @classmethod
+    def _lazy_class(cls):
+        """Return the variant of this class that loads unloaded fields on
+        access. Instances only use it while they have unloaded fields, so
+        loaded objects do not pay for the extra attribute lookup.
+
+        :rtype: type
+
+        """
+        if '_lazy' not in cls.__dict__:
+            namespace = {'__slots__': (),
+                         '__module__': cls.__module__,
+                         '__doc__': cls.__doc__,
+                         '__getattribute__': _lazy_getattribute,
+                         '__setattr__': _lazy_setattr,
+                         '_loaded_class': cls}
+            cls._lazy = type(cls)(cls.__name__, (cls,), namespace)
+            cls._lazy._lazy = cls._lazy
+        return cls._lazy
+
+    def _defer(self, fields):
+        """Mark the fields as unloaded, to be fetched on first access.
+
+        :param frozenset fields: The field names
+
+        """
+        if fields and (self._ref or self._search_values):
+            self._unloaded = frozenset(fields)
+            self.__class__ = self._lazy_class()
+            if self._snapshot:
+                self._snapshot = dict((key, value) for key, value
+                                      in self._snapshot.items()
+                                      if key not in self._unloaded)
+
+    def _fetch_projection(self):
+        """Fetch the object, marking the fields outside of the projection as
+        unloaded if it has one.
+
+        :rtype: bool
+
+        """
+        projection = self._projection
+        result = self.fetch()
+        if projection is not None:
+            self._projection = None
+            self._defer(self._field_set.difference(projection))
+        return result
+
     def _build_search_values(self, kwargs):
         """Build the search criteria dictionary. It will first try and build
         the values from already set attributes on the object, falling back
@@ -78,17 +216,238 @@ class MappingDb(Mapping):
                 criteria[key] = kwargs.get(key)
         return criteria
 
+    def _function(self, name, data=None):
+        """Call the WAPI function on the object, loading a lazy object first
+        to get its reference id, and return the decoded response.
+
+        :param str name: The function name
+        :param dict data: The function arguments
+        :rtype: dict
+        :raises: ValueError
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        if not self._ref:
+            self.load()
+        if not self._ref:
+            raise ValueError('Object has no reference id for %s' % name)
+        response = self._session.post(self._ref, data, {'_function': name})
+        if response.status_code != 200:
+            try:
+                error = codec.loads(response.content)
+            except ValueError:
+                raise exceptions.ProtocolError(response.content)
+            raise exceptions.ProtocolError(error['text'])
+        return codec.loads(response.content)
+
+    def _invalidate(self):
+        """Remove the cached values for this object after it was changed."""
+        if self._session.cache is not None:
+            self._session.cache.invalidate(self._wapi_type, self._ref)
+
+    def _take_snapshot(self):
+        """Keep a copy of the current save values to detect changes against.
+
+        """
+        self._snapshot = dict((key, copy.deepcopy(value)
+                               if isinstance(value, (dict, list)) else value)
+                              for key, value in self._save_values().items())
+
     @property
     def _path(self):
         return self._ref if self._ref else self._wapi_type
 
     @property
     def _return_fields(self):
+        if self._projection is not None:
+            return ','.join(self._projection)
         return ','.join([key for key in self.keys()
                          if key not in self._return_ignore])
 
+    @classmethod
+    def pages(cls, session, page_size=1000, page_id=None, compact=False,
+              fields=None, **criteria):
+        """Page through all of the objects of this type that match the search
+        criteria using WAPI paging, yielding a tuple of the id of the page
+        that follows and the list of objects on the current page. The page
+        id is None for the last page and can be passed back in as page_id to
+        resume from that point.
+
+        :param infoblox.Session session: The established session object
+        :param int page_size: The maximum number of objects per page
+        :param str page_id: The page to resume from
+        :param bool compact: Build objects from the compact class variant
+        :param list fields: Only fetch these fields, loading the others on
+            first access
+        :param dict criteria: The search criteria
+        :rtype: iterator
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        obj_class = cls.compact() if compact else cls
+        if fields is None:
+            fields = cls._projection
+        unloaded = None if fields is None else \
+            cls._field_set.difference(fields)
+        for page_id, results in cls.result_pages(session, page_size, page_id,
+                                                 fields, **criteria):
+            yield page_id, [obj_class._build(session, item, unloaded)
+                            for item in results]
+
+    @classmethod
+    def result_pages(cls, session, page_size=1000, page_id=None, fields=None,
+                     **criteria):
+        """Page through the search results like :meth:`pages`, yielding the
+        values returned by the Infoblox device for each object as dicts
+        instead of building objects from them.
+
+        :param infoblox.Session session: The established session object
+        :param int page_size: The maximum number of objects per page
+        :param str page_id: The page to resume from
+        :param list fields: The fields to return, or all of them if None
+        :param dict criteria: The search criteria
+        :rtype: iterator
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        if fields is None:
+            fields = [key for key in cls._fields
+                      if key not in cls._return_ignore]
+        query = {'_paging': 1,
+                 '_max_results': page_size,
+                 '_return_as_object': 1,
+                 '_return_fields': ','.join(fields)}
+        while True:
+            if page_id:
+                query['_page_id'] = page_id
+                response = session.get(cls._wapi_type, None, query)
+            else:
+                response = session.get(cls._wapi_type, criteria, query)
+            if response.status_code != 200:
+                try:
+                    error = codec.loads(response.content)
+                except ValueError:
+                    raise exceptions.ProtocolError(response.content)
+                raise exceptions.ProtocolError(error['text'])
+            values = codec.loads(response.content)
+            page_id = values.get('next_page_id')
+            yield page_id, values.get('result', [])
+            if not page_id:
+                break
+
+    @classmethod
+    def stream(cls, session, page_size=None, compact=False, fields=None,
+               max_results=None, chunk_size=codec.CHUNK_SIZE, **criteria):
+        """Iterate through the objects of this type that match the search
+        criteria, parsing each response as it is received instead of once
+        the whole body has arrived. Only the object being built and one
+        chunk of the body are held in memory, so the first object is
+        returned sooner and memory use stays flat for large results::
+
+            for address in infoblox.IPv4Address.stream(
+                    session, network='10.1.0.0/16', max_results=65536):
+                print(address.ip_address)
+
+        Without a page_size the results are fetched with a single request.
+
+        :param infoblox.Session session: The established session object
+        :param int page_size: The maximum number of objects per page
+        :param bool compact: Build objects from the compact class variant
+        :param list fields: Only fetch these fields, loading the others on
+            first access
+        :param int max_results: The maximum number of objects to return
+            without paging
+        :param int chunk_size: The number of bytes to read at a time
+        :param dict criteria: The search criteria
+        :rtype: iterator
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        obj_class = cls.compact() if compact else cls
+        if fields is None:
+            fields = cls._projection
+        unloaded = None if fields is None else \
+            cls._field_set.difference(fields)
+        if fields is None:
+            fields = [key for key in cls._fields
+                      if key not in cls._return_ignore]
+        query = {'_return_fields': ','.join(fields)}
+        if page_size:
+            query.update({'_paging': 1,
+                          '_max_results': page_size,
+                          '_return_as_object': 1})
+        elif max_results:
+            query['_max_results'] = max_results
+        data = criteria
+        while True:
+            response = session.get(cls._wapi_type, data, query, stream=True)
+            meta = {}
+            try:
+                if response.status_code != 200:
+                    try:
+                        error = codec.loads(response.content)
+                    except ValueError:
+                        raise exceptions.ProtocolError(response.content)
+                    raise exceptions.ProtocolError(error['text'])
+                for values in codec.iterload(
+                        response.iter_content(chunk_size), meta):
+                    yield obj_class._build(session, values, unloaded)
+            finally:
+                response.close()
+            if not meta.get('next_page_id'):
+                break
+            query['_page_id'] = meta['next_page_id']
+            data = None
+
+    @classmethod
+    def search(cls, session, page_size=1000, page_id=None, compact=False,
+               fields=None, **criteria):
+        """Lazily iterate through all of the objects of this type that match
+        the search criteria, fetching them from the Infoblox device one page
+        at a time::
+
+            for host in infoblox.Host.search(session, zone='bar.net'):
+                print(host.name)
+
+        :param infoblox.Session session: The established session object
+        :param int page_size: The maximum number of objects per request
+        :param str page_id: The page to resume from
+        :param bool compact: Build objects from the compact class variant
+        :param list fields: Only fetch these fields, loading the others on
+            first access
+        :param dict criteria: The search criteria
+        :rtype: iterator
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        for _next_page_id, objects in cls.pages(session, page_size, page_id,
+                                                compact, fields, **criteria):
+            for obj in objects:
+                yield obj
+
+    def changes(self):
+        """Return the save values that have changed since the object was
+        loaded from or saved to the Infoblox device. Fields that have been
+        cleared are returned with their current value. If the object has not
+        been loaded, all of the save values are returned.
+
+        :rtype: dict
+
+        """
+        values = self._save_values()
+        if self._snapshot is None:
+            return values
+        changes = dict((key, value) for key, value in values.items()
+                       if key not in self._snapshot or
+                       self._snapshot[key] != value)
+        for key in self._snapshot:
+            if key not in values:
+                changes[key] = getattr(self, key)
+        return changes
+
     def delete(self):
-        """Remove the item from the infoblox server.
+        """Remove the item from the infoblox server. When the session has an
+        active batch, the delete is queued and sent when the batch exits.
 
         :rtype: bool
         :raises: AssertionError
@@ -100,102 +459,221 @@ class MappingDb(Mapping):
             raise ValueError('Object has no reference id for deletion')
         if 'save' not in self._supports:
             raise AssertionError('Can not save this object type')
+        if self._session.queue is not None:
+            self._session.queue.add(self, 'DELETE')
+            return True
         response = self._session.delete(self._path)
         if response.status_code == 200:
+            self._invalidate()
             self._ref = None
             self.clear()
             return True
         try:
-            error = response.json()
+            error = codec.loads(response.content)
             raise exceptions.ProtocolError(error['text'])
         except ValueError:
             raise exceptions.ProtocolError(response.content)
 
-        
+    def delete_async(self):
+        """Return an awaitable that removes the item from the infoblox server.
+        The object must have been created with an
+        :class:`infoblox.aio.AsyncSession`.
+
+        :rtype: asyncio.Future
+
+        """
+        return self._session.run_async(self.delete)
+
     def fetch(self):
         """Attempt to fetch the object from the Infoblox device. If successful
-        the object will be updated and the method will return True.
+        the object will be updated and the method will return True. When the
+        session has a cache, cached values are used while they are valid.
 
         :rtype: bool
         :raises: infoblox.exceptions.ProtocolError
 
         """
-        from pudb import set_trace; set_trace()
-        
         self._search_values = self._build_search_values({})
-        
+        return_fields = self._return_fields
+        cache = self._session.cache
+        if cache is not None:
+            key = (self._path, json.dumps(self._search_values, sort_keys=True),
+                   return_fields)
+            content = cache.get(key)
+            if content is not None:
+                LOGGER.debug('Cache hit for %s, %s', self._path,
+                             self._search_values)
+                values = codec.loads(content)
+                self._assign(values)
+                return bool(values)
         LOGGER.debug('Fetching %s, %s', self._path, self._search_values)
         response = self._session.get(self._path, self._search_values,
-                                     {'_return_fields': self._return_fields})
+                                     {'_return_fields': return_fields})
         if response.status_code == 200:
-            values = response.json()
+            values = codec.loads(response.content)
+            if cache is not None:
+                refs = [item.get('_ref') for item in
+                        (values if isinstance(values, list) else [values])]
+                cache.set(key, response.content, self._wapi_type, refs)
             self._assign(values)
             return bool(values)
         elif response.status_code >= 400:
             try:
-                error = response.json()
+                error = codec.loads(response.content)
                 raise exceptions.ProtocolError(error['text'])
             except ValueError:
                 raise exceptions.ProtocolError(response.content)
         return False
 
+    @property
+    def dirty(self):
+        """Indicate if the object has changes that have not been saved to the
+        Infoblox device.
+
+        :rtype: bool
+
+        """
+        if self._snapshot is None:
+            return self._dirty
+        return bool(self.changes())
+
+    def fetch_async(self):
+        """Return an awaitable that fetches the object from the Infoblox
+        device. The object must have been created with an
+        :class:`infoblox.aio.AsyncSession`.
+
+        :rtype: asyncio.Future
+
+        """
+        return self._session.run_async(self.fetch)
+
+    def load(self):
+        """Fetch the object from the Infoblox device if it has fields that
+        have not been loaded yet, returning True if it was fetched.
+
+        :rtype: bool
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        unloaded = self._unloaded
+        if not unloaded:
+            return False
+        # Keep the changes made to the loaded fields, the fetch only fills
+        # in the unloaded ones
+        edits = dict((key, getattr(self, key)) for key in self.changes())
+        self._unloaded = frozenset()
+        self.__class__ = self._loaded_class
+        if not unloaded.intersection(self._projection or ()):
+            self._projection = None
+        dirty = self._dirty
+        try:
+            self._fetch_projection()
+        except Exception:
+            self._defer(unloaded)
+            raise
+        for key, value in edits.items():
+            setattr(self, key, value)
+        self._dirty = dirty or bool(edits)
+        return True
+
     def reference_id(self):
         """Return a read-only handle for the reference_id of this object.
 
         """
         return str(self._ref)
-    
-    def save(self):
-        """Update the infoblox with new values for the specified object, or add
-        the values if it's a new object all together.
 
-        :raises: AssertionError
-        :raises: infoblox.exceptions.ProtocolError
+    def _save_values(self):
+        """Return the values to send to the Infoblox device when saving.
 
-        """
-        from pudb import set_trace; set_trace()
-        
-        
-        if 'save' not in self._supports:
-            raise AssertionError('Can not save this object type')
+        :rtype: dict
 
+        """
         values = {}
-        for key in [key for key in self.keys() if key not in self._save_ignore]:
-            if not getattr(self, key) and getattr(self, key) != False:
+        save_ignore, unloaded = self._save_ignore, self._unloaded
+        for key in [key for key in self.keys() if key not in save_ignore
+                    and key not in unloaded]:
+            current = getattr(self, key, None)
+            if not current:
                 continue
 
-            if isinstance(getattr(self, key, None), list):
+            if isinstance(current, list):
                 value = list()
-                for item in getattr(self, key):
+                for item in current:
                     if isinstance(item, dict):
                         value.append(item)
                     elif hasattr(item, '_save_as'):
                         value.append(item._save_as())
                     elif hasattr(item, '_ref') and getattr(item, '_ref'):
                         value.append(getattr(item, '_ref'))
+                    elif not isinstance(item, Mapping):
+                        value.append(item)
                     else:
                         LOGGER.warning('Cant assign %r', item)
                 values[key] = value
-            elif getattr(self, key, None):
-                values[key] = getattr(self, key)
+            elif hasattr(current, '_save_as'):
+                values[key] = current._save_as()
+            else:
+                values[key] = current
+        return values
+
+    def save(self, return_fields=False):
+        """Update the infoblox with new values for the specified object, or add
+        the values if it's a new object all together. Only the fields that
+        have changed since the object was loaded are sent for an existing
+        object, and nothing is sent if none have. When the session has an
+        active batch, the save is queued and sent when the batch exits.
+
+        The object is fetched again after saving, unless return_fields is
+        True, in which case the Infoblox device is asked to return the saved
+        object in the response instead.
+
+        :param bool return_fields: Load the object from the save response
+        :raises: AssertionError
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        if 'save' not in self._supports:
+            raise AssertionError('Can not save this object type')
+
+        if self._ref:
+            values = self.changes()
+            if not values:
+                LOGGER.debug('No changes to save for %s', self._ref)
+                return True
+        else:
+            values = self._save_values()
+        if self._session.queue is not None:
+            self._session.queue.add(self, 'PUT' if self._ref else 'POST',
+                                    values)
+            return True
+        query = {'_return_fields': self._return_fields} if return_fields \
+            else None
         if not self._ref:
-            response = self._session.post(self._path, values)
+            response = self._session.post(self._path, values, query)
         else:
             values['_ref'] = self._ref
-            response = self._session.put(self._path, values)
+            response = self._session.put(self._path, values, query)
         LOGGER.debug('Response: %r, %r', response.status_code, response.content)
         if 200 <= response.status_code <= 201:
-            self.fetch()
+            self._invalidate()
+            if return_fields:
+                self._assign(codec.loads(response.content))
+            else:
+                self.fetch()
             return True
         else:
             try:
-                error = response.json()
+                error = codec.loads(response.content)
                 raise exceptions.ProtocolError(error['text'])
             except ValueError:
                 raise exceptions.ProtocolError(response.content)
 
+    def save_async(self):
+        """Return an awaitable that saves the object to the Infoblox device.
+        The object must have been created with an
+        :class:`infoblox.aio.AsyncSession`.
 
+        :rtype: asyncio.Future
 
-
- 
-
+        """
+        return self._session.run_async(self.save)
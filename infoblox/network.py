@@ -2,7 +2,9 @@
 Base Network Object
 
 """
+import collections
 import logging
+import threading
 
 from infoblox import exceptions
 from infoblox import mapping
@@ -106,7 +108,119 @@ class Network(MappingDb):
         """
 
         super(Network, self).__init__(session, reference_id, **kwargs)
- 
-#        if self._ref or self._search_values:
-#            self.fetch()
-#
+
+    def next_available_ip(self, num=1, exclude=None):
+        """Return up to num of the next available addresses in the network
+        with a single call to the Infoblox device. The addresses are not
+        reserved until they are assigned to an object.
+
+        :param int num: The number of addresses to return
+        :param list exclude: Addresses to skip
+        :rtype: list
+        :raises: ValueError
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        data = {'num': num}
+        if exclude:
+            data['exclude'] = list(exclude)
+        return self._function('next_available_ip', data)['ips']
+
+
+class NetworkContainer(MappingDb):
+    """This object implements the network container object, which holds
+    networks and other network containers.
+
+    Example::
+
+        container = infoblox.NetworkContainer(session, network='10.0.0.0/8')
+
+    """
+    comment = None
+    extattrs = None
+    network = None
+    network_container = None
+    network_view = None
+
+    _return_ignore = ['view']
+    _search_by = ['comment', 'network', 'network_container', 'network_view']
+    _supports = ['fetch', 'put', 'save']
+    _save_ignore = []
+    _wapi_type = 'networkcontainer'
+
+    def __init__(self, session, reference_id=None, **kwargs):
+        """Create a new instance of a NetworkContainer object. If a
+        reference_id or valid search criteria are passed in, the object will
+        attempt to load the values for the network container from the
+        Infoblox device.
+
+        Valid search criteria: comment, network, network_container,
+        network_view
+
+        :param infobox.Session session: The established session object
+        :param str reference_id: The Infoblox reference id for the container
+        :param dict kwargs: Optional keyword arguments
+
+        """
+        super(NetworkContainer, self).__init__(session, reference_id,
+                                               **kwargs)
+
+
+class AddressPool(object):
+    """Hand out the next available addresses of a network, fetching them
+    from the Infoblox device size at a time instead of once per address.
+    A pool is safe to share between the workers of a process, and every
+    address it hands out is excluded from later fetches until it is
+    released, so two workers are never given the same address::
+
+        pool = AddressPool(infoblox.Network(session, network='10.0.0.0/16'))
+        host.add_ipv4addr(pool.get())
+        host.save()
+        pool.release(host.ipv4addrs[0].ipv4addr)
+
+    The Infoblox device does not reserve the fetched addresses, so another
+    client can still assign one first, which the device rejects when the
+    object is saved. Use ``Host.add_ipv4addr(network=...)`` where the
+    address must be allocated atomically.
+
+    :param infoblox.Network network: The network to allocate from
+    :param int size: The number of addresses to fetch at a time
+
+    """
+    def __init__(self, network, size=16):
+        self.network = network
+        self.size = size
+        self._available = collections.deque()
+        self._issued = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._available)
+
+    def get(self):
+        """Return the next address, fetching more if the pool is empty.
+
+        :rtype: str
+        :raises: infoblox.exceptions.ProtocolError
+
+        """
+        with self._lock:
+            if not self._available:
+                self._available.extend(self.network.next_available_ip(
+                    self.size, sorted(self._issued)))
+                if not self._available:
+                    raise exceptions.ProtocolError('No available addresses in '
+                                                   '%s' % self.network.network)
+            address = self._available.popleft()
+            self._issued.add(address)
+            return address
+
+    def release(self, address):
+        """Stop excluding an address that has been saved to the Infoblox
+        device or was not used after all.
+
+        :param str address: The address handed out by :meth:`get`
+
+        """
+        with self._lock:
+            self._issued.discard(address)
@@ -0,0 +1,188 @@
+"""
+Reconcile a declared set of hosts or networks with the Infoblox device,
+comparing them against a single bulk fetch of the current objects and
+sending the changes in batched requests.
+
+"""
+import logging
+
+from infoblox import exceptions
+from infoblox.record import Record
+from infoblox.record import address_key
+
+LOGGER = logging.getLogger(__name__)
+
+# The fields identifying an object of each WAPI type and their defaults
+KEYS = {'network': (('network', None), ('network_view', 'default')),
+        'record:host': (('name', None), ('view', 'default'))}
+
+ADDRESS_FIELDS = {'ipv4addrs': 'ipv4addr', 'ipv6addrs': 'ipv6addr'}
+
+
+def key(wapi_type, values):
+    """Return the tuple of values identifying the object, from a dict or a
+    MappingDb object.
+
+    :param str wapi_type: The WAPI object type
+    :param dict|infoblox.mappingDb.MappingDb values: The object values
+    :rtype: tuple
+
+    """
+    return tuple(values.get(field) or default
+                 for field, default in KEYS[wapi_type])
+
+
+def _address(item, field):
+    """Return the normalized address of a str, dict or nested address."""
+    if isinstance(item, dict):
+        item = item.get(field)
+    elif isinstance(item, Record):
+        item = getattr(item, field)
+    try:
+        return address_key(item)
+    except (TypeError, ValueError):
+        return item
+
+
+def _compare(field, value):
+    """Return the value in a form that compares equal for equivalent
+    values, ignoring the order and spelling of host addresses.
+
+    """
+    if field in ADDRESS_FIELDS:
+        return frozenset(_address(item, ADDRESS_FIELDS[field])
+                         for item in value or [])
+    return value
+
+
+class Plan(object):
+    """The changes needed to make the current objects match the desired
+    ones. :attr:`add` holds the values of each object to create,
+    :attr:`modify` the current object and the values to change on it and
+    :attr:`delete` the current objects that are not desired.
+
+    :param type obj_class: The MappingDb class of the objects
+
+    """
+    def __init__(self, obj_class):
+        self.obj_class = obj_class
+        self.add = []
+        self.modify = []
+        self.delete = []
+
+    def __len__(self):
+        return len(self.add) + len(self.modify) + len(self.delete)
+
+    def __repr__(self):
+        return '<Plan %s add=%i modify=%i delete=%i>' % (
+            self.obj_class._wapi_type, len(self.add), len(self.modify),
+            len(self.delete))
+
+    def apply(self, session, batch_size=1000):
+        """Send the changes to the Infoblox device in batched requests,
+        returning the object and ProtocolError tuples for the changes that
+        failed.
+
+        :param infoblox.Session session: The established session object
+        :param int batch_size: The maximum number of changes per request
+        :rtype: list
+
+        """
+        batch = session.batch(batch_size)
+        try:
+            with batch:
+                for values in self.add:
+                    obj = self.obj_class(session)
+                    self._assign(obj, values)
+                    obj.save()
+                for obj, values in self.modify:
+                    self._assign(obj, values)
+                    obj.save()
+                for obj in self.delete:
+                    obj.delete()
+        except exceptions.ProtocolError as error:
+            LOGGER.warning('Reconcile of %s failed: %s',
+                           self.obj_class._wapi_type, error)
+        return batch.errors
+
+    @staticmethod
+    def _assign(obj, values):
+        """Assign the values to the object. Host addresses that are already
+        assigned are kept as they are, so their other settings are not
+        lost.
+
+        """
+        for field, value in values.items():
+            if field in ADDRESS_FIELDS and obj.get(field):
+                current = dict((_address(item, ADDRESS_FIELDS[field]), item)
+                               for item in getattr(obj, field))
+                value = [current.get(_address(item, ADDRESS_FIELDS[field]),
+                                     item) for item in value]
+            setattr(obj, field, value)
+
+
+def plan(obj_class, desired, current):
+    """Compare the desired objects against the current ones, returning the
+    Plan to reconcile them. Objects are matched on the fields in
+    :data:`KEYS` and only the fields set on each desired object are
+    compared, so other fields are left as they are.
+
+    :param type obj_class: The MappingDb class of the objects
+    :param list desired: The desired objects as dicts
+    :param list current: The current objects
+    :rtype: Plan
+
+    """
+    wapi_type = obj_class._wapi_type
+    current = dict((key(wapi_type, obj), obj) for obj in current)
+    result = Plan(obj_class)
+    seen = set()
+    for values in desired:
+        value_key = key(wapi_type, values)
+        seen.add(value_key)
+        obj = current.get(value_key)
+        if obj is None:
+            result.add.append(values)
+            continue
+        changes = dict((field, value) for field, value in values.items()
+                       if _compare(field, value) !=
+                       _compare(field, obj.get(field)))
+        if changes:
+            result.modify.append((obj, changes))
+    result.delete = [obj for value_key, obj in current.items()
+                     if value_key not in seen]
+    return result
+
+
+def reconcile(session, obj_class, desired, page_size=1000, batch_size=1000,
+              **criteria):
+    """Make the objects of the class that match the search criteria match
+    the desired objects. The current objects are fetched with paged
+    searches, and any of them that are not desired are deleted, so the
+    criteria should select only the objects being managed::
+
+        reconcile(session, infoblox.Host,
+                  [{'name': 'foo.bar.net', 'ipv4addrs': ['10.0.0.1']}],
+                  zone='bar.net')
+
+    Returns the applied Plan and the object and ProtocolError tuples for
+    the changes that failed.
+
+    :param infoblox.Session session: The established session object
+    :param type obj_class: The MappingDb class of the objects
+    :param list desired: The desired objects as dicts
+    :param int page_size: The number of objects to fetch per request
+    :param int batch_size: The maximum number of changes per request
+    :param dict criteria: The search criteria for the current objects
+    :rtype: tuple
+
+    """
+    desired = list(desired)
+    fields = set(field for field, _default in KEYS[obj_class._wapi_type])
+    for values in desired:
+        fields.update(values)
+    current = obj_class.search(session, page_size, compact=True,
+                               fields=sorted(fields), **criteria)
+    result = plan(obj_class, desired, current)
+    LOGGER.debug('Reconciling %r', result)
+    return result, result.apply(session, batch_size)
@@ -2,7 +2,14 @@
 Base Record Object
 
 """
+import itertools
 import logging
+import socket
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
 
 from infoblox import exceptions
 from infoblox import mapping
@@ -11,6 +18,167 @@ from infoblox.mappingDb import MappingDb
 LOGGER = logging.getLogger(__name__)
 
 
+def address_key(value):
+    """Return the packed form of the IPv4 or IPv6 address, so that different
+    spellings of the same address match.
+
+    :param str value: The address
+    :rtype: bytes
+    :raises: ValueError
+
+    """
+    family = socket.AF_INET6 if ':' in value else socket.AF_INET
+    try:
+        return socket.inet_pton(family, value)
+    except socket.error:
+        raise ValueError('Invalid address: %s' % value)
+
+
+def _next_available(network):
+    """Return the nextavailableip function argument for a network, passed
+    as a CIDR string or a Network object.
+
+    :param str|infoblox.Network network: The network
+    :rtype: str
+
+    """
+    if not hasattr(network, 'network'):
+        return network
+    if network.network_view:
+        return '%s,%s' % (network.network, network.network_view)
+    return network.network
+
+
+class Addresses(object):
+    """The IPv4 or IPv6 addresses of a host, keyed by the normalized address
+    so that membership tests, adding and removing addresses do not scan the
+    collection. Items are the nested address objects returned by the
+    Infoblox device or dicts for addresses added locally, kept in the order
+    they were added.
+
+    :param str field: The address field of the items, ipv4addr or ipv6addr
+    :param list items: The initial items
+
+    """
+    def __init__(self, field, items=()):
+        self._calls = itertools.count()
+        self._field = field
+        self._items = OrderedDict()
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, address):
+        return self._find(address) is not None
+
+    def __eq__(self, other):
+        if not isinstance(other, (Addresses, list)):
+            return False
+        return list(self) == list(other)
+
+    def __getitem__(self, index):
+        return list(self._items.values())[index]
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def add(self, item):
+        """Add the address, passed as a str, dict or nested address object.
+
+        :param str|dict|infoblox.Record item: The address to add
+        :raises: ValueError
+
+        """
+        if not isinstance(item, (dict, Record)):
+            item = {self._field: item}
+        key = self._key(item)
+        if isinstance(key, tuple):
+            # Each function call allocates another address, so the same call
+            # can be added more than once
+            key += (next(self._calls),)
+        elif key in self._items:
+            raise ValueError('Already exists')
+        self._items[key] = item
+
+    # Kept for callers that treat the addresses as a list
+    append = add
+
+    def as_list(self):
+        """Return the addresses as a list of dicts, such as for serializing
+        the host they belong to. Only the loaded fields of nested address
+        objects are included, so they are not each fetched to serialize it.
+
+        :rtype: list
+
+        """
+        return [item if isinstance(item, dict) else
+                dict((key, getattr(item, key)) for key in item.keys()
+                     if key not in item._unloaded)
+                for item in self]
+
+    def discard(self, address):
+        """Remove the address if it is present.
+
+        :param str|dict|infoblox.Record address: The address to remove
+
+        """
+        key = self._find(address)
+        if key is not None:
+            del self._items[key]
+
+    def remove(self, address):
+        """Remove the address.
+
+        :param str|dict|infoblox.Record address: The address to remove
+        :raises: ValueError
+
+        """
+        key = self._find(address)
+        if key is None:
+            raise ValueError('Not found')
+        del self._items[key]
+
+    def _find(self, address):
+        """Return the key of the item for an address or item, or None if it
+        is not present. Only function calls are looked up by a scan.
+
+        """
+        key = self._key(address)
+        if not isinstance(key, tuple):
+            return key if key in self._items else None
+        for item_key in self._items:
+            if isinstance(item_key, tuple) and item_key[:1] == key:
+                return item_key
+        return None
+
+    def _key(self, address):
+        """Return the normalized address for an address or item. Values that
+        are not addresses, such as function calls to allocate one, are
+        returned in a tuple.
+
+        """
+        if isinstance(address, dict):
+            address = address.get(self._field)
+        elif isinstance(address, Record):
+            address = getattr(address, self._field)
+        try:
+            return address_key(address)
+        except (TypeError, ValueError):
+            return (address,)
+
+    def _save_as(self):
+        return [item if isinstance(item, dict) else item._save_as()
+                for item in self]
+
+
 class Record(MappingDb):
     """This object is extended by specific Infoblox record types and implements
     the core API behavior of a record class. Attributes that map to other
@@ -38,7 +206,7 @@ class Record(MappingDb):
         session object and the reference id for the record.
 
         """
-        super(Record, self).__init__(**kwargs)
+        super(Record, self).__init__(session, reference_id, **kwargs)
 
     def __repr__(self):
         return '<%s %s>' % (self.__class__.__name__,
@@ -71,6 +239,7 @@ class Host(Record):
     use_ttl = False
     zone = None
 
+    _address_fields = {'ipv4addrs': 'ipv4addr', 'ipv6addrs': 'ipv6addr'}
     _repr_keys = ['name', 'ipv4addrs', 'ipv6addrs']
     _save_ignore = ['dns_name', 'host', 'zone']
     _search_by = ['name', 'ipv4addr', 'ipv6addr', 'mac']
@@ -98,18 +267,44 @@ class Host(Record):
         self.name = name
         super(Host, self).__init__(session, reference_id, **kwargs)
 
-    def add_ipv4addr(self, ipv4addr):
-        """Add an IPv4 address to the host.
+    def __setattr__(self, key, value):
+        """Keep each host's addresses in its own Addresses container.
+
+        :param str key: The attribute name
+        :param mixed value: The value to set
+
+        """
+        if key in self._address_fields and not isinstance(value, Addresses):
+            value = Addresses(self._address_fields[key], value or [])
+        super(Host, self).__setattr__(key, value)
+
+    def add_ipv4addr(self, ipv4addr=None, network=None):
+        """Add an IPv4 address to the host. If a network is passed instead,
+        the Infoblox device assigns the next available address in it when
+        the host is saved::
+
+            host.add_ipv4addr(network='10.0.0.0/24')
 
         :param str ipv4addr: The IP address to add.
+        :param str|infoblox.Network network: The network to allocate from
         :raises: ValueError
 
         """
-        for addr in self.ipv4addrs:
-            if ((isinstance(addr, dict) and addr['ipv4addr'] == ipv4addr) or
-                (isinstance(addr, HostIPv4) and addr.ipv4addr == ipv4addr)):
-                raise ValueError('Already exists')
-        self.ipv4addrs.append({'ipv4addr': ipv4addr})
+        if (ipv4addr is None) == (network is None):
+            raise ValueError('Pass either ipv4addr or network')
+        if network is not None:
+            ipv4addr = 'func:nextavailableip:%s' % _next_available(network)
+        self._addresses('ipv4addrs').add({'ipv4addr': ipv4addr})
+
+    def items(self):
+        """Return a list of attribute name and value tuples for the host,
+        with the addresses as lists of dicts.
+
+        :rtype: list
+
+        """
+        return [(key, value.as_list() if isinstance(value, Addresses)
+                 else value) for key, value in super(Host, self).items()]
 
     def remove_ipv4addr(self, ipv4addr):
         """Remove an IPv4 address from the host.
@@ -117,11 +312,7 @@ class Host(Record):
         :param str ipv4addr: The IP address to remove
 
         """
-        for addr in self.ipv4addrs:
-            if ((isinstance(addr, dict) and addr['ipv4addr'] == ipv4addr) or
-                (isinstance(addr, HostIPv4) and addr.ipv4addr == ipv4addr)):
-                self.ipv4addrs.remove(addr)
-                break
+        self._addresses('ipv4addrs').discard(ipv4addr)
 
     def add_ipv6addr(self, ipv6addr):
         """Add an IPv6 address to the host.
@@ -130,11 +321,7 @@ class Host(Record):
         :raises: ValueError
 
         """
-        for addr in self.ipv6addrs:
-            if ((isinstance(addr, dict) and addr['ipv6addr'] == ipv6addr) or
-                (isinstance(addr, HostIPv4) and addr.ipv6addr == ipv6addr)):
-                raise ValueError('Already exists')
-        self.ipv6addrs.append({'ipv6addr': ipv6addr})
+        self._addresses('ipv6addrs').add({'ipv6addr': ipv6addr})
 
     def remove_ipv6addr(self, ipv6addr):
         """Remove an IPv6 address from the host.
@@ -142,11 +329,21 @@ class Host(Record):
         :param str ipv6addr: The IP address to remove
 
         """
-        for addr in self.ipv6addrs:
-            if ((isinstance(addr, dict) and addr['ipv6addr'] == ipv6addr) or
-                (isinstance(addr, HostIPv4) and addr.ipv6addr == ipv6addr)):
-                self.ipv6addrs.remove(addr)
-                break
+        self._addresses('ipv6addrs').discard(ipv6addr)
+
+    def _addresses(self, key):
+        """Return the Addresses container for the key, replacing the shared
+        class level default with one for this host.
+
+        :param str key: ipv4addrs or ipv6addrs
+        :rtype: Addresses
+
+        """
+        addresses = getattr(self, key)
+        if not isinstance(addresses, Addresses):
+            setattr(self, key, addresses)
+            addresses = getattr(self, key)
+        return addresses
 
 
 class HostIPv4(Record):
@@ -199,7 +396,12 @@ class HostIPv4(Record):
         super(HostIPv4, self).__init__(session, reference_id, **kwargs)
 
     def _save_as(self):
-        return {'ipv4addr': self.ipv4addr}
+        # Replacing the addresses of a host resets the settings that are not
+        # sent, so keep the ones that are loaded without fetching the rest
+        return dict((key, getattr(self, key))
+                    for key in ('ipv4addr', 'mac', 'configure_for_dhcp')
+                    if key not in self._unloaded and
+                    getattr(self, key) is not None)
 
 
 class HostIPv6(Record):
@@ -253,9 +455,11 @@ class HostIPv6(Record):
         super(HostIPv6, self).__init__(session, reference_id, **kwargs)
 
     def _save_as(self):
-        return {'ipv6addr': self.ipv6addr,
-                'ipv6bits': self.ipv6bits,
-                'ipv6prefix_bits': self.ipv6prefix_bits}
+        # Nested addresses only carry ipv6addr until loaded, so do not fetch
+        # each of them just to serialize the host they belong to
+        return dict((key, getattr(self, key))
+                    for key in ('ipv6addr', 'ipv6bits', 'ipv6prefix_bits')
+                    if key not in self._unloaded)
 
 
 class IPv4Address(Record):
@@ -283,27 +487,28 @@ class IPv4Address(Record):
     _repr_keys = ['ip_address']
     _search_by = ['ip_address']
     _supports = ['fetch', 'put']
-    _wapi_type = 'record:host_ipv4addr'
+    _wapi_type = 'ipv4address'
 
-    def __init__(self, session, reference_id=None, ipv4addr=None, **kwargs):
-        """Create a new instance of a HostIPv4 object. If a reference_id or
-        valid search criteria are passed in, the object will attempt to load
-        the values for the host_ipv4addr from the Infoblox device.
+    def __init__(self, session, reference_id=None, ip_address=None,
+                 **kwargs):
+        """Create a new instance of an IPv4Address object. If a reference_id
+        or valid search criteria are passed in, the object will attempt to
+        load the values for the ipv4address from the Infoblox device.
 
-        Valid search criteria: ipv4addr
+        Valid search criteria: ip_address
 
         :param infobox.Session session: The established session object
-        :param str reference_id: The Infoblox reference id for the host
-        :param str ipv4addr: The ipv4 address
+        :param str reference_id: The Infoblox reference id for the address
+        :param str ip_address: The ipv4 address
         :param dict kwargs: Optional keyword arguments
 
         """
-        self.ipv4addr = str(ipv4addr)
+        self.ip_address = ip_address
         super(IPv4Address, self).__init__(session, reference_id, **kwargs)
 
 
 def get_class(reference):
-    class_name = reference.split('/')[0].split(':')[1]
+    class_name = reference.split('/')[0].split(':')[-1]
     LOGGER.debug('Class: %s', class_name)
     return CLASS_MAP.get(class_name)
 
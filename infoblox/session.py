@@ -2,15 +2,27 @@
 with the Infoblox NIOS device.
 
 """
-import json
+import email.utils
 import logging
+import random
+import threading
+import time
+
 import requests
-import urllib
+from requests.packages.urllib3.util import retry
+
+from infoblox import batch
+from infoblox import bulk
+from infoblox import codec
+from infoblox import exceptions
+from infoblox import throttle
 
 try:
     import urlparse
+    from urllib import urlencode
 except ImportError:
     import urllib.parse as urlparse
+    from urllib.parse import urlencode
 
 
 LOGGER = logging.getLogger(__name__)
@@ -18,33 +30,450 @@ LOGGER = logging.getLogger(__name__)
 USERNAME = 'admin'
 PASSWORD = 'infoblox'
 
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class CircuitBreaker(object):
+    """Stop sending requests to an unhealthy Infoblox appliance. After
+    failure_threshold consecutive failed requests the circuit opens and
+    requests are rejected without being sent. Once reset_timeout seconds
+    have passed a single trial request is let through, closing the circuit
+    if it succeeds and opening it again if it fails::
+
+        session = infoblox.Session(infoblox_host, max_retries=3,
+                                   backoff_factor=0.5,
+                                   breaker=CircuitBreaker())
+
+    :param int failure_threshold: Consecutive failures to open the circuit
+    :param float reset_timeout: Seconds to wait before a trial request
+
+    """
+    CLOSED = 'closed'
+    HALF_OPEN = 'half-open'
+    OPEN = 'open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._opened_at = 0.0
+        self._stats = {'opened': 0, 'rejected': 0}
+        self._trial = False
+
+    def allow(self):
+        """Return True if a request can be sent, counting it as rejected if
+        not.
+
+        :rtype: bool
+
+        """
+        with self._lock:
+            if self.state == self.OPEN and \
+                    _clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def record(self, success):
+        """Record the outcome of a request that was allowed.
+
+        :param bool success: The request succeeded
+
+        """
+        with self._lock:
+            if success:
+                self._failures = 0
+                self.state = self.CLOSED
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or \
+                    self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._stats['opened'] += 1
+                    LOGGER.warning('Opening circuit after %i failures',
+                                   self._failures)
+                self.state = self.OPEN
+                self._opened_at = _clock()
+
+    def stats(self):
+        """Return the state of the circuit, the number of consecutive
+        failures, the number of times it has opened and the number of
+        requests rejected while it was open.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            return {'state': self.state,
+                    'failures': self._failures,
+                    'opened': self._stats['opened'],
+                    'rejected': self._stats['rejected']}
+
+
+def _retry_after(response):
+    """Return the seconds to wait from the Retry-After header of the
+    response, given as seconds or a date, or None if it has none.
+
+    :param requests.Response response: The response
+    :rtype: float
+
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
 
 class Session(object):
     """Central object for managing HTTP requests to the Infoblox appliance."""
     BASE_PATH = '/wapi/v1.2'
     HEADERS = {'Content-type': 'application/json'}
+    AUTH_COOKIE = 'ibapauth'
+    BACKOFF_FACTOR = 0.5
+    IDEMPOTENT_METHODS = ('DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT')
+    MAX_BACKOFF = 30.0
+    POOL_SIZE = 10
+    RETRY_STATUSES = (429, 502, 503, 504)
 
-    def __init__(self, host, username=None, password=None, https=True):
+    def __init__(self, host, username=None, password=None, https=True,
+                 pool_size=None, max_retries=0, backoff_factor=None,
+                 timeout=None, verify=False, ca_bundle=None, cache=None,
+                 max_backoff=None, breaker=None, limits=None):
         """Create a new instance of the Infoblox Session object
 
         :param str host: The Infoblox host to communicate with
         :param str username: The user to authenticate with
         :param str password: The password to authenticate with
+        :param bool https: Communicate with the Infoblox host via HTTPS
+        :param int pool_size: The number of connections to keep alive
+        :param int max_retries: Retries for failed connections and for 429,
+            502, 503 and 504 responses to idempotent requests
+        :param float backoff_factor: The first wait between retries, which
+            doubles after each one, defaults to :attr:`BACKOFF_FACTOR`
+        :param float timeout: Seconds to wait to connect and for a response
+        :param bool verify: Verify the TLS certificate of the Infoblox host
+        :param str ca_bundle: Path to the CA bundle to verify against,
+            implies verify
+        :param infoblox.cache.Cache cache: Cache for fetched objects
+        :param float max_backoff: The longest wait between retries
+        :param CircuitBreaker breaker: Circuit breaker for the appliance
+        :param infoblox.throttle.Limits limits: Rate and concurrency limits
+            for the requests to the appliance
 
         """
         self.auth = (username or USERNAME, password or PASSWORD)
         self.host = host
+        self.limits = limits or throttle.Limits()
         self.scheme = 'https' if https else 'http'
         self.session = requests.session()
+        self.session.verify = ca_bundle or verify
+        self._batches = threading.local()
+        self.cache = cache
+        self.backoff_factor = self.BACKOFF_FACTOR if backoff_factor is None \
+            else backoff_factor
+        self.breaker = breaker
+        self.max_backoff = self.MAX_BACKOFF if max_backoff is None \
+            else max_backoff
+        self.max_retries = max_retries
+        self.pool_size = pool_size or self.POOL_SIZE
+        self.timeout = timeout
+        self._auth_stats = {'credentials': 0, 'cookie': 0, 'expired': 0}
+        self._lock = threading.Lock()
+        self._replaced_stats = {'requests': 0, 'connections': 0}
+        self._retry_stats = {'retries': 0, 'retry_after': 0, 'exhausted': 0,
+                             'rejected': 0}
+        self._mount()
+
+    def _mount(self):
+        """Mount a connection adapter for the Infoblox host with the pool size
+        and retry settings of the session. The adapter only retries failed
+        connections, as responses are retried by :meth:`_request`.
+
+        """
+        max_retries = retry.Retry(total=self.max_retries,
+                                  backoff_factor=self.backoff_factor,
+                                  status=0,
+                                  raise_on_status=False,
+                                  respect_retry_after_header=False)
+        self.session.mount('%s://' % self.scheme,
+                           requests.adapters.HTTPAdapter(
+                               pool_connections=1,
+                               pool_maxsize=self.pool_size,
+                               max_retries=max_retries))
+
+    @staticmethod
+    def _pool_counts(adapter):
+        """Return the number of requests sent and connections opened through
+        the connection pools of the adapter.
+
+        :param requests.adapters.HTTPAdapter adapter: The adapter
+        :rtype: tuple
+
+        """
+        requests_sent, connections = 0, 0
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            requests_sent += pools[key].num_requests
+            connections += pools[key].num_connections
+        return requests_sent, connections
+
+    def _request(self, method, path, query=None, **kwargs):
+        """Send the request to the Infoblox device. Responses with a status
+        in :attr:`RETRY_STATUSES` are retried for idempotent methods, and a
+        429 response for any method as the request was not processed. The
+        wait between retries doubles from backoff_factor up to max_backoff,
+        with random jitter so clients do not retry in step, unless the
+        response has a Retry-After header. When the session has a circuit
+        breaker, requests are rejected with CircuitOpenError while it is
+        open. Each attempt waits to be admitted by the read or write budget
+        of the session limits, which is held until the response headers
+        have been received.
+
+        :param str method: The HTTP method
+        :param str path: The object type or reference id
+        :param dict query: The query arguments
+        :rtype: requests.Response
+        :raises: infoblox.exceptions.CircuitOpenError
+
+        """
+        url = self._request_url(path, query)
+        attempt = 0
+        while True:
+            if self.breaker is not None and not self.breaker.allow():
+                self._count('rejected', self._retry_stats)
+                raise exceptions.CircuitOpenError('Circuit open for %s' %
+                                                  self.host)
+            try:
+                with self.limits.budget(method):
+                    response = self._send(method, url, **kwargs)
+            except Exception:
+                if self.breaker is not None:
+                    self.breaker.record(False)
+                raise
+            failed = response.status_code in self.RETRY_STATUSES
+            if self.breaker is not None:
+                self.breaker.record(not failed)
+            delay = self._retry_delay(method, response, attempt) \
+                if failed else None
+            if delay is None:
+                return response
+            LOGGER.debug('Retrying %s %s after %s in %.2fs', method, path,
+                         response.status_code, delay)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, method, response, attempt):
+        """Return the seconds to wait before retrying the failed response,
+        or None if it should not be retried.
+
+        :param str method: The HTTP method
+        :param requests.Response response: The failed response
+        :param int attempt: The number of retries made so far
+        :rtype: float
+
+        """
+        if method not in self.IDEMPOTENT_METHODS and \
+                response.status_code != 429:
+            return None
+        if attempt >= self.max_retries:
+            if self.max_retries:
+                self._count('exhausted', self._retry_stats)
+            return None
+        delay = random.uniform(0, min(self.max_backoff,
+                                      self.backoff_factor * 2 ** attempt))
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            if retry_after > self.max_backoff:
+                self._count('exhausted', self._retry_stats)
+                return None
+            self._count('retry_after', self._retry_stats)
+            delay = max(delay, retry_after)
+        self._count('retries', self._retry_stats)
+        return delay
+
+    def _send(self, method, url, **kwargs):
+        """Send the request once. Once the device has issued an ibapauth
+        session cookie, it is sent instead of the credentials. If the cookie
+        has expired the request is sent again with the credentials.
+
+        :param str method: The HTTP method
+        :param str url: The request URL
+        :rtype: requests.Response
+
+        """
+        if self.AUTH_COOKIE in self.session.cookies:
+            response = self.session.request(method, url, timeout=self.timeout,
+                                            **kwargs)
+            if response.status_code != 401:
+                self._count('cookie')
+                return response
+            LOGGER.debug('Session cookie expired, authenticating')
+            response.close()
+            self._count('expired')
+            self.session.cookies.clear()
+        self._count('credentials')
+        return self.session.request(method, url, auth=self.auth,
+                                    timeout=self.timeout, **kwargs)
+
+    def _count(self, counter, stats=None):
+        """Increment the authentication counter, or the counter in stats.
+
+        :param str counter: The counter name
+        :param dict stats: The counters, if not the authentication counters
+
+        """
+        with self._lock:
+            (self._auth_stats if stats is None else stats)[counter] += 1
 
     def _request_url(self, path, query=None):
         return urlparse.urlunparse((self.scheme,
                                     self.host,
                                     '/'.join([self.BASE_PATH, path]),
                                     None,
-                                    urllib.urlencode(query) if query else None,
+                                    urlencode(query) if query else None,
                                     None))
 
+    @property
+    def queue(self):
+        """The active batch of the calling thread, or None.
+
+        :rtype: infoblox.batch.Batch
+
+        """
+        return getattr(self._batches, 'batch', None)
+
+    @queue.setter
+    def queue(self, value):
+        self._batches.batch = value
+
+    def batch(self, size=1000):
+        """Return a unit of work that queues the save and delete calls made
+        on objects using this session while it is active in the calling
+        thread, sending them in chunks of size operations through the WAPI
+        request object::
+
+            with session.batch():
+                for host in hosts:
+                    host.save()
+
+        :param int size: The maximum number of operations per request
+        :rtype: infoblox.batch.Batch
+
+        """
+        return batch.Batch(self, size)
+
+    def auth_stats(self):
+        """Return counters for how requests were authenticated: the number
+        sent with credentials, the number authenticated by the session cookie
+        (the credential validations saved on the appliance) and the number of
+        times the session cookie had expired.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            return dict(self._auth_stats)
+
+    def connection_stats(self):
+        """Return counters for the connections to the Infoblox host: the
+        number of requests sent, the number of connections opened (and TLS
+        handshakes made for HTTPS) and the number of requests that reused an
+        open connection.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            requests_sent, connections = self._pool_counts(
+                self.session.get_adapter('%s://' % self.scheme))
+            requests_sent += self._replaced_stats['requests']
+            connections += self._replaced_stats['connections']
+        return {'requests': requests_sent,
+                'connections': connections,
+                'reused': requests_sent - connections}
+
+    def retry_stats(self):
+        """Return counters for retried requests: the number of retries, the
+        number that waited for a Retry-After header, the number of failed
+        responses returned because the retries were exhausted or the
+        Retry-After wait was too long and the number of requests rejected by
+        the circuit breaker. With a circuit breaker, its state is included as
+        circuit.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            stats = dict(self._retry_stats)
+        if self.breaker is not None:
+            stats['circuit'] = self.breaker.stats()
+        return stats
+
+    def logout(self):
+        """End the session on the Infoblox device and discard the session
+        cookie. Nothing is sent if no session has been established.
+
+        :rtype: requests.Response or None
+
+        """
+        if self.AUTH_COOKIE not in self.session.cookies:
+            return None
+        response = self._request('POST', 'logout')
+        self.session.cookies.clear()
+        return response
+
+    def map(self, func, objects, workers=bulk.WORKERS, rate=None):
+        """Call func for each object in a pool of worker threads sharing this
+        session, returning the results or ProtocolErrors in order. See
+        :func:`infoblox.bulk.run`.
+
+        :param func: A callable taking the object, or a method name to call
+        :type func: callable or str
+        :param list objects: The objects to run func for
+        :param int workers: The number of worker threads
+        :param float rate: The maximum number of calls per second
+        :rtype: list
+
+        """
+        return bulk.run(self, func, objects, workers, rate)
+
+    def resize_pool(self, size):
+        """Make sure the connection pool can hold at least size connections to
+        the appliance, so that each worker thread can keep its connection.
+        The replaced pool is closed, which only closes its idle connections
+        so requests already sent on it by other threads still complete, and
+        its counters are kept in :meth:`connection_stats`.
+
+        :param int size: The number of connections
+
+        """
+        with self._lock:
+            if self.pool_size >= size:
+                return
+            adapter = self.session.get_adapter('%s://' % self.scheme)
+            requests_sent, connections = self._pool_counts(adapter)
+            self._replaced_stats['requests'] += requests_sent
+            self._replaced_stats['connections'] += connections
+            self.pool_size = size
+            self._mount()
+        adapter.close()
+
     def delete(self, path):
         """Call the Infoblox device to delete the ref
 
@@ -52,45 +481,48 @@ class Session(object):
         :rtype: requests.Response
 
         """
-        return self.session.delete(self._request_url(path),
-                                   auth=self.auth, verify=False)
+        return self._request('DELETE', path)
 
-    def get(self, path, data=None, return_fields=None):
-        """Call the Infoblox device to get the obj for the data passed in
+    def get(self, path, data=None, return_fields=None, stream=False):
+        """Call the Infoblox device to get the obj for the data passed in.
+        With stream the body is not read until it is accessed, so it can be
+        parsed with :func:`infoblox.codec.iterload` as it arrives, and the
+        response must be closed once done with.
 
         :param str obj_reference: The object reference data
         :param dict data: The data for the get request
+        :param dict return_fields: The query arguments
+        :param bool stream: Do not read the body of the response
         :rtype: requests.Response
 
         """
-        return self.session.get(self._request_url(path, return_fields),
-                                data=json.dumps(data),
-                                auth=self.auth, verify=False)
+        return self._request('GET', path, return_fields,
+                             data=codec.encode(data), stream=stream)
 
-    def post(self, path, data):
+    def post(self, path, data, return_fields=None):
         """Call the Infoblox device to post the obj for the data passed in
 
         :param str obj: The object type
         :param dict data: The data for the post
+        :param dict return_fields: The query arguments
         :rtype: requests.Response
 
         """
         LOGGER.debug('Posting data: %r', data)
-        return self.session.post(self._request_url(path),
-                                 data=json.dumps(data or {}),
-                                 headers=self.HEADERS, auth=self.auth,
-                                 verify=False)
+        return self._request('POST', path, return_fields,
+                             data=codec.encode(data or {}),
+                             headers=self.HEADERS)
 
-    def put(self, path, data):
+    def put(self, path, data, return_fields=None):
         """Call the Infoblox device to post the obj for the data passed in
 
         :param str obj: The object type
         :param dict data: The data for the post
+        :param dict return_fields: The query arguments
         :rtype: requests.Response
 
         """
         LOGGER.debug('Putting data: %r', data)
-        return self.session.put(self._request_url(path),
-                                data=json.dumps(data or {}),
-                                headers=self.HEADERS, auth=self.auth,
-                                verify=False)
+        return self._request('PUT', path, return_fields,
+                             data=codec.encode(data or {}),
+                             headers=self.HEADERS)
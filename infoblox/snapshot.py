@@ -0,0 +1,149 @@
+"""
+Point in time snapshot of the host records on the Infoblox device, indexed
+for lookups by name, address and MAC address without network access.
+
+"""
+import logging
+
+from infoblox.record import Host
+from infoblox.record import address_key
+
+LOGGER = logging.getLogger(__name__)
+
+FIELDS = ['name', 'ipv4addrs', 'ipv6addrs', 'view', 'comment']
+
+
+def mac_key(value):
+    """Return the MAC address as lower case hex digits without separators.
+
+    :param str value: The MAC address
+    :rtype: str
+
+    """
+    return value.lower().replace(':', '').replace('-', '').replace('.', '')
+
+
+def _value(item, key):
+    """Return the value of the key from a nested address dict or object,
+    without loading the object if the value was not returned.
+
+    """
+    if isinstance(item, dict):
+        return item.get(key)
+    if key in item._unloaded:
+        return None
+    return getattr(item, key, None)
+
+
+class HostSnapshot(object):
+    """Hash indexes over a bulk export of host records, by name, by each IPv4
+    and IPv6 address and by the MAC address of each IPv4 address::
+
+        snapshot = HostSnapshot.load(session, zone='bar.net')
+        hosts = snapshot.find_by_ip('10.0.0.1')
+
+    Each find method returns the list of matching Host objects.
+
+    :param list hosts: The hosts to index
+
+    """
+    def __init__(self, hosts=()):
+        self._count = 0
+        self._by_address = {}
+        self._by_mac = {}
+        self._by_name = {}
+        for host in hosts:
+            self.add(host)
+
+    def __iter__(self):
+        for hosts in self._by_name.values():
+            for host in self._values(hosts):
+                yield host
+
+    def __len__(self):
+        return self._count
+
+    @classmethod
+    def load(cls, session, page_size=1000, fields=None, **criteria):
+        """Create a snapshot of the hosts matching the search criteria,
+        fetched from the Infoblox device with paged searches into compact
+        host objects.
+
+        :param infoblox.Session session: The established session object
+        :param int page_size: The number of hosts to fetch per request
+        :param list fields: The host fields to fetch, loading the others on
+            access
+        :param dict criteria: The search criteria
+        :rtype: HostSnapshot
+
+        """
+        snapshot = cls(Host.search(session, page_size, compact=True,
+                                   fields=fields or FIELDS, **criteria))
+        LOGGER.debug('Snapshot of %i hosts', len(snapshot))
+        return snapshot
+
+    def add(self, host):
+        """Add the host to the indexes.
+
+        :param infoblox.Host host: The host to add
+
+        """
+        self._count += 1
+        self._insert(self._by_name, host.name, host)
+        for item in host.ipv4addrs or []:
+            self._insert(self._by_address,
+                         address_key(_value(item, 'ipv4addr')), host)
+            mac = _value(item, 'mac')
+            if mac:
+                self._insert(self._by_mac, mac_key(mac), host)
+        for item in host.ipv6addrs or []:
+            self._insert(self._by_address,
+                         address_key(_value(item, 'ipv6addr')), host)
+
+    def find_by_ip(self, address):
+        """Return the hosts with the IPv4 or IPv6 address.
+
+        :param str address: The address
+        :rtype: list
+
+        """
+        return self._values(self._by_address.get(address_key(address)))
+
+    def find_by_mac(self, mac):
+        """Return the hosts with an IPv4 address assigned to the MAC address.
+
+        :param str mac: The MAC address
+        :rtype: list
+
+        """
+        return self._values(self._by_mac.get(mac_key(mac)))
+
+    def find_by_name(self, name):
+        """Return the hosts with the name, one per DNS view.
+
+        :param str name: The host FQDN
+        :rtype: list
+
+        """
+        return self._values(self._by_name.get(name))
+
+    @staticmethod
+    def _insert(index, key, host):
+        """Add the host to the index under the key. Most keys belong to a
+        single host, so a list is only used once a key is shared.
+
+        """
+        existing = index.get(key)
+        if existing is None:
+            index[key] = host
+        elif isinstance(existing, list):
+            if not any([item is host for item in existing]):
+                existing.append(host)
+        elif existing is not host:
+            index[key] = [existing, host]
+
+    @staticmethod
+    def _values(value):
+        if value is None:
+            return []
+        return list(value) if isinstance(value, list) else [value]
@@ -0,0 +1,266 @@
+"""
+Admission control for the requests sent to an Infoblox appliance, limiting
+the request rate with token buckets and the number of requests in flight
+with semaphores, with separate budgets for reads and writes. The state can
+be kept in local files so that the limits are shared by every process on
+the host, and not only by the threads using a session.
+
+"""
+import errno
+import logging
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+
+# Methods counted against the read budget, all others are writes
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_clock = getattr(time, 'monotonic', time.time)
+
+# The file state of a bucket: the tokens and when they were last updated
+_STATE = struct.Struct('!dd')
+
+
+class TokenBucket(object):
+    """Allow rate calls per second from any number of threads, with bursts
+    of up to burst calls after an idle period. Each call reserves a token
+    and waits until it is due, so callers are admitted in order.
+
+    :param float rate: The number of calls per second
+    :param float burst: The most calls allowed at once, defaults to rate
+
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = self._now()
+
+    def acquire(self):
+        """Block until a call is allowed, returning the seconds waited.
+
+        :rtype: float
+
+        """
+        with self._lock:
+            delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    @staticmethod
+    def _now():
+        return _clock()
+
+    def _reserve(self):
+        """Take a token, returning the seconds until it is available."""
+        now = self._now()
+        self._tokens = min(self.capacity, self._tokens +
+                           (now - self._updated) * self.rate) - 1
+        self._updated = now
+        return max(0.0, -self._tokens / self.rate)
+
+
+class FileTokenBucket(TokenBucket):
+    """A :class:`TokenBucket` with its state kept in a file locked with
+    fcntl, so the rate is shared by every process that uses the same path.
+
+    :param str path: The state file, created if it does not exist
+    :param float rate: The number of calls per second
+    :param float burst: The most calls allowed at once, defaults to rate
+    :raises: RuntimeError
+
+    """
+    def __init__(self, path, rate, burst=None):
+        if fcntl is None:
+            raise RuntimeError('File based limits require fcntl')
+        super(FileTokenBucket, self).__init__(rate, burst)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def close(self):
+        """Close the state file."""
+        os.close(self._fd)
+
+    @staticmethod
+    def _now():
+        return time.time()
+
+    def _reserve(self):
+        """Take a token from the state in the file while holding its lock."""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            data = os.read(self._fd, _STATE.size)
+            if len(data) == _STATE.size:
+                self._tokens, self._updated = _STATE.unpack(data)
+            else:
+                self._tokens, self._updated = self.capacity, self._now()
+            delay = super(FileTokenBucket, self)._reserve()
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            os.write(self._fd, _STATE.pack(self._tokens, self._updated))
+            return delay
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class FileSemaphore(object):
+    """Allow up to value holders across every process that uses the same
+    path, with one locked slot file per holder. A slot is released if the
+    process holding it exits.
+
+    :param str path: The prefix of the slot files
+    :param int value: The number of slots
+    :param float poll: Seconds to wait between attempts when all are held
+    :raises: RuntimeError
+
+    """
+    def __init__(self, path, value, poll=0.01):
+        if fcntl is None:
+            raise RuntimeError('File based limits require fcntl')
+        self.path = path
+        self.poll = poll
+        self._free = list(range(value))
+        self._held = threading.local()
+        self._lock = threading.Lock()
+        self._slots = [os.open('%s.%i' % (path, slot),
+                               os.O_RDWR | os.O_CREAT, 0o600)
+                       for slot in range(value)]
+
+    def acquire(self):
+        """Block until a slot is held by the calling thread."""
+        while True:
+            with self._lock:
+                for slot in list(self._free):
+                    try:
+                        fcntl.flock(self._slots[slot],
+                                    fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except (IOError, OSError) as error:
+                        if error.errno not in (errno.EACCES, errno.EAGAIN):
+                            raise
+                        continue
+                    self._free.remove(slot)
+                    self._held.slot = slot
+                    return True
+            time.sleep(self.poll)
+
+    def close(self):
+        """Close the slot files."""
+        for fd in self._slots:
+            os.close(fd)
+
+    def release(self):
+        """Release the slot held by the calling thread."""
+        slot = self._held.slot
+        with self._lock:
+            fcntl.flock(self._slots[slot], fcntl.LOCK_UN)
+            self._free.append(slot)
+
+
+class Budget(object):
+    """The rate and concurrency limits for one kind of request. With a path
+    the limits are kept in files starting with it and shared by every
+    process using the same path, otherwise by the threads of this process.
+
+    :param float rate: The number of requests per second, or None
+    :param float burst: The most requests allowed at once after an idle
+        period, defaults to rate
+    :param int max_in_flight: The number of concurrent requests, or None
+    :param str path: The prefix of the state files to share the limits
+    :raises: RuntimeError
+
+    """
+    def __init__(self, rate=None, burst=None, max_in_flight=None, path=None):
+        self.bucket = None
+        self.semaphore = None
+        if rate:
+            self.bucket = FileTokenBucket('%s.bucket' % path, rate, burst) \
+                if path else TokenBucket(rate, burst)
+        if max_in_flight:
+            self.semaphore = FileSemaphore('%s.slot' % path, max_in_flight) \
+                if path else threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'delayed': 0, 'waited': 0.0,
+                       'in_flight': 0, 'peak_in_flight': 0}
+
+    def __enter__(self):
+        start = _clock()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        waited = _clock() - start
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['in_flight'] += 1
+            self._stats['peak_in_flight'] = max(
+                self._stats['peak_in_flight'], self._stats['in_flight'])
+            if waited > 0.001:
+                self._stats['delayed'] += 1
+                self._stats['waited'] += waited
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+    def stats(self):
+        """Return the number of requests admitted, the number that had to
+        wait, the total seconds waited and the current and peak number of
+        requests in flight from this process.
+
+        :rtype: dict
+
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+class Limits(object):
+    """Separate read and write budgets for the requests to an appliance,
+    passed to :class:`infoblox.Session` to admit each request sent. Use the
+    same Limits for every session to the same appliance::
+
+        limits = Limits(read=Budget(rate=50, max_in_flight=8),
+                        write=Budget(rate=10, max_in_flight=2,
+                                     path='/var/run/infoblox/grid-master'))
+        session = infoblox.Session(infoblox_host, limits=limits)
+
+    GET, HEAD and OPTIONS requests are reads and all others are writes.
+
+    :param Budget read: The budget for reads, or None for no limit
+    :param Budget write: The budget for writes, or None for no limit
+
+    """
+    def __init__(self, read=None, write=None):
+        self.read = read or Budget()
+        self.write = write or Budget()
+
+    def budget(self, method):
+        """Return the budget for a request with the HTTP method, to hold
+        while the request is sent.
+
+        :param str method: The HTTP method
+        :rtype: Budget
+
+        """
+        return self.read if method in READ_METHODS else self.write
+
+    def stats(self):
+        """Return the read and write budget counters.
+
+        :rtype: dict
+
+        """
+        return {'read': self.read.stats(), 'write': self.write.stats()}
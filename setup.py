@@ -7,6 +7,10 @@ try:
 except ImportError:
     requirements.append('argparse')
     tests_require.append('unittest2')
+try:
+    from collections import OrderedDict
+except ImportError:
+    requirements.append('ordereddict')
 
 classifiers = ['Intended Audience :: Developers',
                'Intended Audience :: System Administrators',
@@ -0,0 +1,108 @@
+"""
+AsyncSession Tests, run against a local stub WAPI server
+
+"""
+import json
+import threading
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    import asyncio
+    from http import server
+    from infoblox import aio
+except (ImportError, SyntaxError):
+    aio = None
+
+from infoblox import record
+
+
+@unittest.skipUnless(aio, 'asyncio is not available')
+class AsyncSessionTests(unittest.TestCase):
+
+    CONCURRENCY = 4
+    DELAY = 0.05
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.paths = []
+        self.server = server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                 self.handler())
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.session = aio.AsyncSession('127.0.0.1:%i' %
+                                        self.server.server_address[1],
+                                        https=False,
+                                        concurrency=self.CONCURRENCY)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def handler(self):
+        test = self
+
+        class Handler(server.BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with test.lock:
+                    test.in_flight += 1
+                    test.max_in_flight = max(test.max_in_flight,
+                                             test.in_flight)
+                    test.paths.append(self.path)
+                time.sleep(test.DELAY)
+                name = self.path.split('/')[-1].split('?')[0].split(':')[-1]
+                body = json.dumps([{'_ref': 'record:host/%s:%s/default' %
+                                            (name, name),
+                                    'name': name}]).encode('utf-8')
+                with test.lock:
+                    test.in_flight -= 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def gather(self, awaitables):
+        return self.loop.run_until_complete(asyncio.gather(*awaitables))
+
+    def test_get_async(self):
+        response = self.gather([self.session.get_async('record:host')])[0]
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('host', response.json()[0]['name'])
+
+    def test_requests_overlap_within_limit(self):
+        start = time.time()
+        self.gather([self.session.get_async('record:host/%i:%i' % (i, i))
+                     for i in range(self.CONCURRENCY * 3)])
+        self.assertLess(time.time() - start, self.DELAY * 3 * 2)
+        self.assertEqual(self.CONCURRENCY * 3, len(self.paths))
+        self.assertLessEqual(self.max_in_flight, self.CONCURRENCY)
+        self.assertGreater(self.max_in_flight, 1)
+
+    def test_fetch_async(self):
+        hosts = []
+        for offset in range(8):
+            host = record.Host(self.session)
+            host._ref = 'record:host/%i:h%i' % (offset, offset)
+            hosts.append(host)
+        results = self.gather([host.fetch_async() for host in hosts])
+        self.assertEqual([True] * 8, results)
+        self.assertEqual(['h%i' % offset for offset in range(8)],
+                         [host.name for host in hosts])
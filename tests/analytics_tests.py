@@ -0,0 +1,148 @@
+"""
+Analytics Tests
+
+"""
+import json
+
+import httmock
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
+
+from infoblox import analytics
+from infoblox import record
+from infoblox import session
+
+ROWS = [{'ip_address': '10.0.0.0', 'network': '10.0.0.0/29',
+         'status': 'USED'},
+        {'ip_address': '10.0.0.1', 'network': '10.0.0.0/29',
+         'status': 'USED', 'lease_state': 'ACTIVE'},
+        {'ip_address': '10.0.0.2', 'network': '10.0.0.0/29',
+         'status': 'UNUSED', 'lease_state': 'FREE'},
+        {'ip_address': '10.0.0.4', 'network': '10.0.0.0/29',
+         'status': 'USED', 'is_conflict': True},
+        {'ip_address': '10.0.0.4', 'network': '10.0.0.0/29',
+         'status': 'USED'},
+        {'ip_address': '10.0.0.7', 'network': '10.0.0.0/29',
+         'status': 'USED'},
+        {'ip_address': '10.1.0.5', 'network': '10.1.0.0/30',
+         'status': 'USED'},
+        {'ip_address': '10.2.0.1', 'network': '10.2.0.0/30',
+         'status': 'UNUSED'}]
+
+
+class AddressTableTests(object):
+
+    def setUp(self):
+        self.table = analytics.AddressTable()
+        self.table.extend(ROWS)
+
+    def test_len(self):
+        self.assertEqual(len(ROWS), len(self.table))
+
+    def test_utilization(self):
+        self.assertEqual(
+            [analytics.Utilization('10.0.0.0/29', 8, 4, 4, 1, 2),
+             analytics.Utilization('10.1.0.0/30', 4, 0, 4, 0, 4),
+             analytics.Utilization('10.2.0.0/30', 4, 0, 4, 0, 4)],
+            self.table.utilization())
+
+    def test_free_ranges(self):
+        self.assertEqual([('10.0.0.2', '10.0.0.3'), ('10.0.0.5', '10.0.0.6')],
+                         self.table.free_ranges('10.0.0.0/29'))
+
+    def test_free_ranges_ignore_other_networks(self):
+        self.assertEqual([('10.1.0.0', '10.1.0.3')],
+                         self.table.free_ranges('10.1.0.0/30'))
+
+    def test_free_ranges_unknown_network(self):
+        self.assertRaises(KeyError, self.table.free_ranges, '10.9.0.0/24')
+
+    def test_conflicted(self):
+        self.assertEqual(['10.0.0.4'], self.table.conflicted())
+
+    def test_lease_state_counts(self):
+        self.assertEqual({None: 6, 'ACTIVE': 1, 'FREE': 1},
+                         self.table.lease_state_counts())
+
+    def test_empty(self):
+        table = analytics.AddressTable()
+        self.assertEqual([], table.utilization())
+        self.assertEqual([], table.conflicted())
+        self.assertEqual({}, table.lease_state_counts())
+
+    def test_invalid_status(self):
+        self.assertRaises(ValueError, self.table.add, '10.0.0.1',
+                          '10.0.0.0/24', 'BROKEN')
+
+    def test_missing_network(self):
+        self.table.append({'ip_address': '10.9.0.1', 'status': 'USED'})
+        self.assertEqual(len(ROWS), len(self.table))
+        self.assertRaises(ValueError, self.table.network_id, None)
+        self.assertRaises(ValueError, self.table.add, '10.9.0.1', None)
+        self.assertEqual(len(ROWS), len(self.table.networks))
+
+
+class NumPyTests(AddressTableTests, unittest.TestCase):
+
+    def setUp(self):
+        if analytics.numpy is None:
+            raise unittest.SkipTest('numpy is not installed')
+        super(NumPyTests, self).setUp()
+
+
+class PythonTests(AddressTableTests, unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('infoblox.analytics.numpy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super(PythonTests, self).setUp()
+
+
+class PackTests(unittest.TestCase):
+
+    def test_pack(self):
+        self.assertEqual(0x0a000001, analytics.pack('10.0.0.1'))
+
+    def test_unpack(self):
+        self.assertEqual('255.255.255.255', analytics.unpack(0xffffffff))
+
+
+class LoadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = session.Session('127.0.0.1')
+        self.requests = []
+
+    @httmock.all_requests
+    def search_mock(self, url, request):
+        self.requests.append((url.path, dict(urlparse.parse_qsl(url.query)),
+                              json.loads(request.body)))
+        return {'content': json.dumps({'result': ROWS}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_load(self):
+        with httmock.HTTMock(self.search_mock):
+            table = analytics.AddressTable.load(self.session,
+                                                network='10.0.0.0/29')
+        self.assertEqual(len(ROWS), len(table))
+        path, query, criteria = self.requests[0]
+        self.assertEqual('/wapi/v1.2/ipv4address', path)
+        self.assertEqual(','.join(analytics.FIELDS), query['_return_fields'])
+        self.assertEqual({'network': '10.0.0.0/29'}, criteria)
+
+
+class IPv4AddressTests(unittest.TestCase):
+
+    def test_search_values(self):
+        address = record.IPv4Address(None, ip_address='10.0.0.1', lazy=True)
+        self.assertEqual({'ip_address': '10.0.0.1'}, address._search_values)
+        self.assertEqual('ipv4address', address._path)
@@ -0,0 +1,159 @@
+"""
+Batch Tests
+
+"""
+import json
+import threading
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import exceptions
+from infoblox import record
+from infoblox import session
+
+
+class BatchTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+
+    def host(self, name, ref=None):
+        host = record.Host(self.session)
+        host.name = name
+        host.ipv4addrs = [{'ipv4addr': '10.0.0.1'}]
+        host._ref = ref
+        return host
+
+    @httmock.all_requests
+    def request_mock(self, url, request):
+        operations = json.loads(request.body)
+        self.requests.append((url.path, operations))
+        results = ['record:host/%i:%s/default' % (offset, operation['method'])
+                   for offset, operation in enumerate(operations)]
+        return {'content': json.dumps(results),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    @httmock.all_requests
+    def error_mock(self, url, request):
+        return {'content': json.dumps({'text': 'Bad request'}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 400}
+
+    def test_operations_are_queued(self):
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch() as batch:
+                self.host('a.bar.net').save()
+                self.host('b.bar.net').save()
+                self.assertEqual(2, len(batch))
+                self.assertEqual([], self.requests)
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual('/wapi/v1.2/request', self.requests[0][0])
+
+    def test_operations(self):
+        existing = self.host('b.bar.net', 'record:host/b:b.bar.net/default')
+        deleted = self.host('c.bar.net', 'record:host/c:c.bar.net/default')
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch():
+                self.host('a.bar.net').save()
+                existing.save()
+                deleted.delete()
+        operations = self.requests[0][1]
+        self.assertEqual(['POST', 'PUT', 'DELETE'],
+                         [operation['method'] for operation in operations])
+        self.assertEqual(['record:host', 'record:host/b:b.bar.net/default',
+                          'record:host/c:c.bar.net/default'],
+                         [operation['object'] for operation in operations])
+        self.assertNotIn('data', operations[2])
+        self.assertEqual('a.bar.net', operations[0]['data']['name'])
+
+    def test_refs_are_assigned(self):
+        host = self.host('a.bar.net')
+        deleted = self.host('c.bar.net', 'record:host/c:c.bar.net/default')
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch():
+                host.save()
+                deleted.delete()
+        self.assertEqual('record:host/0:POST/default', host._ref)
+        self.assertFalse(host.dirty)
+        self.assertIsNone(deleted._ref)
+
+    def test_chunks(self):
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch(size=2):
+                for offset in range(5):
+                    self.host('%i.bar.net' % offset).save()
+        self.assertEqual([2, 2, 1],
+                         [len(operations) for _path, operations
+                          in self.requests])
+
+    def test_session_queue_is_reset(self):
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch():
+                self.assertIsNotNone(self.session.queue)
+        self.assertIsNone(self.session.queue)
+
+    def test_changes_after_queueing_are_kept(self):
+        host = self.host('a.bar.net')
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch():
+                host.save()
+                host.comment = 'Edited'
+        self.assertEqual('a.bar.net', self.requests[0][1][0]['data']['name'])
+        self.assertNotIn('comment', self.requests[0][1][0]['data'])
+        self.assertTrue(host.dirty)
+        self.assertEqual({'comment': 'Edited'}, host.changes())
+
+    def test_next_available_address_is_fetched(self):
+        host = record.Host(self.session)
+        host.name = 'a.bar.net'
+        host.add_ipv4addr(network='10.0.0.0/24')
+
+        @httmock.all_requests
+        def wapi_mock(url, request):
+            if request.method == 'GET':
+                self.requests.append((url.path, None))
+                content = {'_ref': host._ref, 'name': 'a.bar.net',
+                           'ipv4addrs': [{'ipv4addr': '10.0.0.5'}]}
+                return {'content': json.dumps(content),
+                        'headers': {'content-type': 'application/json'},
+                        'status_code': 200}
+            return self.request_mock(url, request)
+
+        with httmock.HTTMock(wapi_mock):
+            with self.session.batch():
+                host.save()
+            host.add_ipv4addr('10.0.0.9')
+        self.assertEqual('/wapi/v1.2/record:host/0:POST/default',
+                         self.requests[1][0])
+        self.assertEqual({'ipv4addrs': [{'ipv4addr': '10.0.0.5'},
+                                        {'ipv4addr': '10.0.0.9'}]},
+                         host.changes())
+
+    def test_queue_is_per_thread(self):
+        queues = []
+        with httmock.HTTMock(self.request_mock):
+            with self.session.batch():
+                thread = threading.Thread(
+                    target=lambda: queues.append(self.session.queue))
+                thread.start()
+                thread.join()
+                self.assertIsNotNone(self.session.queue)
+        self.assertEqual([None], queues)
+
+    def test_errors(self):
+        host = self.host('a.bar.net')
+        batch = self.session.batch()
+        with httmock.HTTMock(self.error_mock):
+            with self.assertRaises(exceptions.ProtocolError):
+                with batch:
+                    host.save()
+        self.assertEqual(host, batch.errors[0][0])
+        self.assertIsNone(host._ref)
@@ -0,0 +1,74 @@
+"""
+Bulk Tests
+
+"""
+import json
+import time
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import bulk
+from infoblox import exceptions
+from infoblox import record
+from infoblox import session
+
+
+class BulkTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.hosts = []
+        for offset in range(12):
+            host = record.Host(self.session)
+            host._ref = 'record:host/%i:h%i.bar.net/default' % (offset, offset)
+            self.hosts.append(host)
+
+    @httmock.all_requests
+    def fetch_mock(self, url, request):
+        ref = url.path.split('/', 3)[-1]
+        if ref.startswith('record:host/3:'):
+            return {'content': json.dumps({'text': 'Not found'}),
+                    'headers': {'content-type': 'application/json'},
+                    'status_code': 404}
+        return {'content': json.dumps({'_ref': ref,
+                                       'name': ref.split(':')[-1][:-8]}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_results_in_order(self):
+        with httmock.HTTMock(self.fetch_mock):
+            results = self.session.map('fetch', self.hosts, workers=4)
+        self.assertEqual(12, len(results))
+        self.assertIsInstance(results[3], exceptions.ProtocolError)
+        self.assertEqual([True] * 11, results[:3] + results[4:])
+        self.assertEqual('h5.bar.net', self.hosts[5].name)
+
+    def test_callable(self):
+        results = bulk.run(self.session, lambda host: host._ref[12:13],
+                           self.hosts[:3])
+        self.assertEqual(['0', '1', '2'], results)
+
+    def test_empty(self):
+        self.assertEqual([], bulk.fetch(self.session, []))
+
+    def test_pool_is_resized(self):
+        with httmock.HTTMock(self.fetch_mock):
+            bulk.fetch(self.session, self.hosts, workers=16)
+        adapter = self.session.session.get_adapter('https://')
+        self.assertEqual(12, adapter._pool_maxsize)
+
+    def test_rate_limit(self):
+        start = time.time()
+        bulk.run(self.session, lambda host: None, self.hosts[:6], workers=6,
+                 rate=50)
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+    def test_limiter_is_shared_per_host(self):
+        self.assertIs(bulk.limiter('foo', 5), bulk.limiter('foo', 5))
+        self.assertIsNot(bulk.limiter('foo', 5), bulk.limiter('bar', 5))
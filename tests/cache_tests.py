@@ -0,0 +1,109 @@
+"""
+Cache Tests
+
+"""
+import json
+
+import httmock
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import cache
+from infoblox import record
+from infoblox import session
+
+
+class CacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = cache.Cache(ttl=10, maxsize=3)
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get(('record:host', '{}', 'name')))
+        self.assertEqual(1, self.cache.stats()['misses'])
+
+    def test_hit(self):
+        key = ('record:host', '{"name": "foo"}', 'name')
+        self.cache.set(key, '[]', 'record:host')
+        self.assertEqual('[]', self.cache.get(key))
+        self.assertEqual(1, self.cache.stats()['hits'])
+
+    def test_expiry(self):
+        key = ('record:host', '{}', 'name')
+        with mock.patch('infoblox.cache._clock', return_value=100):
+            self.cache.set(key, '[]', 'record:host')
+        with mock.patch('infoblox.cache._clock', return_value=111):
+            self.assertIsNone(self.cache.get(key))
+        self.assertEqual(1, self.cache.stats()['expired'])
+        self.assertEqual(0, len(self.cache))
+
+    def test_lru_eviction(self):
+        for offset in range(3):
+            self.cache.set(('ref/%i' % offset, '{}', ''), offset, 'ref')
+        self.cache.get(('ref/0', '{}', ''))
+        self.cache.set(('ref/3', '{}', ''), 3, 'ref')
+        self.assertIsNone(self.cache.get(('ref/1', '{}', '')))
+        self.assertEqual(0, self.cache.get(('ref/0', '{}', '')))
+        self.assertEqual(1, self.cache.stats()['evictions'])
+
+    def test_invalidate(self):
+        search = ('record:host', '{"name": "a"}', '')
+        ref = ('record:host/a', '{}', '')
+        other = ('record:host/b', '{}', '')
+        network = ('network', '{}', '')
+        self.cache.maxsize = 10
+        self.cache.set(search, 1, 'record:host', ['record:host/a'])
+        self.cache.set(ref, 2, 'record:host', ['record:host/a'])
+        self.cache.set(other, 3, 'record:host', ['record:host/b'])
+        self.cache.set(network, 4, 'network')
+        self.cache.invalidate('record:host', 'record:host/a')
+        self.assertEqual([None, None, 3, 4],
+                         [self.cache.get(key)
+                          for key in [search, ref, other, network]])
+        self.assertEqual(2, self.cache.stats()['invalidations'])
+
+
+class FetchCacheTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+    REF = 'record:host/a:a.bar.net/default'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST, cache=cache.Cache())
+        self.requests = []
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        self.requests.append(request.method)
+        if request.method == 'GET':
+            content = [{'_ref': self.REF, 'name': 'a.bar.net'}]
+        else:
+            content = self.REF
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_fetch_is_cached(self):
+        with httmock.HTTMock(self.wapi_mock):
+            first = record.Host(self.session, name='a.bar.net')
+            second = record.Host(self.session, name='a.bar.net')
+        self.assertEqual(['GET'], self.requests)
+        self.assertEqual(self.REF, second._ref)
+        self.assertEqual(first.name, second.name)
+
+    def test_save_invalidates(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net')
+            host.comment = 'foo'
+            host.save()
+            record.Host(self.session, name='a.bar.net')
+        self.assertEqual(['GET', 'PUT', 'GET', 'GET'], self.requests)
+
+    def test_delete_invalidates(self):
+        with httmock.HTTMock(self.wapi_mock):
+            record.Host(self.session, name='a.bar.net').delete()
+            record.Host(self.session, name='a.bar.net')
+        self.assertEqual(['GET', 'DELETE', 'GET'], self.requests)
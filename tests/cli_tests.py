@@ -0,0 +1,215 @@
+"""
+Command line app Tests
+
+"""
+import gzip
+import io
+import json
+
+import httmock
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import cli
+
+
+class ReadRowsTests(unittest.TestCase):
+
+    def test_csv(self):
+        handle = StringIO('action,name,ipv4addr\n'
+                          'add,a.bar.net,10.0.0.1\n')
+        self.assertEqual([{'action': 'add', 'name': 'a.bar.net',
+                           'ipv4addr': '10.0.0.1'}],
+                         [dict(row) for row in cli.read_rows(handle, 'csv')])
+
+    def test_jsonl(self):
+        handle = StringIO('{"name": "a.bar.net", "ipv4addr": "10.0.0.1"}'
+                          '\n\n{"action": "remove", "name": "b.bar.net"}'
+                          '\n')
+        self.assertEqual([{'name': 'a.bar.net', 'ipv4addr': '10.0.0.1'},
+                          {'action': 'remove', 'name': 'b.bar.net'}],
+                         list(cli.read_rows(handle, 'jsonl')))
+
+
+class ImportHostsTests(unittest.TestCase):
+
+    EXISTING = {'_ref': 'record:host/b:b.bar.net/default',
+                'name': 'b.bar.net',
+                'ipv4addrs': [{'ipv4addr': '10.0.0.2'}]}
+
+    def setUp(self):
+        self.infoblox = cli.InfobloxHost('127.0.0.1')
+        self.batches = []
+        self.status_code = 200
+        self.report = StringIO()
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        if request.method == 'GET':
+            search = json.loads(request.body)
+            content = [self.EXISTING] if search['name'] == 'b.bar.net' \
+                else []
+        elif self.status_code != 200:
+            content = {'text': 'Bad request'}
+        else:
+            operations = json.loads(request.body)
+            self.batches.append(operations)
+            content = ['record:host/%i:%s/default' % (offset,
+                                                       operation['method'])
+                       for offset, operation in enumerate(operations)]
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': self.status_code if request.method == 'POST'
+                else 200}
+
+    def import_hosts(self, rows, **kwargs):
+        with httmock.HTTMock(self.wapi_mock):
+            failed = self.infoblox.import_hosts(rows, self.report, **kwargs)
+        results = [json.loads(line) for line
+                   in self.report.getvalue().splitlines()]
+        return failed, results
+
+    def test_import(self):
+        failed, results = self.import_hosts(
+            [{'name': 'a.bar.net', 'ipv4addr': '10.0.0.1', 'comment': 'a'},
+             {'action': 'remove', 'name': 'b.bar.net'}])
+        self.assertEqual(0, failed)
+        self.assertEqual(['ok', 'ok'],
+                         [result['status'] for result in results])
+        self.assertEqual([[{'method': 'POST', 'object': 'record:host',
+                            'data': {'name': 'a.bar.net', 'comment': 'a',
+                                     'configure_for_dns': True,
+                                     'ipv4addrs': [{'ipv4addr': '10.0.0.1'}],
+                                     'rrset_order': 'cyclic',
+                                     'view': 'default'}},
+                           {'method': 'DELETE',
+                            'object': self.EXISTING['_ref']}]], self.batches)
+
+    def test_batch_size(self):
+        rows = [{'name': 'host%i.bar.net' % offset,
+                 'ipv4addr': '10.0.0.%i' % offset} for offset in range(5)]
+        failed, results = self.import_hosts(iter(rows), batch_size=2)
+        self.assertEqual(0, failed)
+        self.assertEqual([1, 2, 3, 4, 5],
+                         [result['row'] for result in results])
+        self.assertEqual([2, 2, 1], [len(batch) for batch in self.batches])
+
+    def test_invalid_rows(self):
+        failed, results = self.import_hosts(
+            [{'name': 'a.bar.net'},
+             {'action': 'remove', 'name': 'c.bar.net'},
+             {'action': 'rename', 'name': 'a.bar.net'},
+             {'name': 'd.bar.net', 'ipv4addr': '10.0.0.4'}])
+        self.assertEqual(3, failed)
+        self.assertEqual(['Missing ipv4addr', 'Host not found',
+                          'Invalid action: rename'],
+                         [result['error'] for result in results[:3]])
+        self.assertEqual('ok', results[3]['status'])
+        self.assertEqual(1, len(self.batches[0]))
+
+    def test_batch_error(self):
+        self.status_code = 400
+        failed, results = self.import_hosts(
+            [{'name': 'a.bar.net', 'ipv4addr': '10.0.0.1'}])
+        self.assertEqual(1, failed)
+        self.assertEqual('error', results[0]['status'])
+        self.assertIn('Bad request', results[0]['error'])
+
+    def test_progress(self):
+        progress = StringIO()
+        with httmock.HTTMock(self.wapi_mock):
+            self.infoblox.import_hosts([{'name': 'a.bar.net',
+                                         'ipv4addr': '10.0.0.1'}],
+                                       self.report, progress=progress)
+        self.assertEqual('Processed 1 rows, 0 failed\n', progress.getvalue())
+
+
+class ExportTests(unittest.TestCase):
+
+    PAGES = {None: {'result': [{'_ref': 'record:host/a:a.bar.net/default',
+                                'name': 'a.bar.net'}],
+                    'next_page_id': 'page2'},
+             'page2': {'result': [{'_ref': 'record:host/b:b.bar.net/default',
+                                   'name': 'b.bar.net'}]}}
+
+    def setUp(self):
+        self.infoblox = cli.InfobloxHost('127.0.0.1')
+        self.requests = []
+        self.output = io.BytesIO()
+        self.progress = StringIO()
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        query = dict(part.split('=', 1) for part in url.query.split('&'))
+        self.requests.append((url.path, query))
+        if url.path.endswith('record:host'):
+            content = self.PAGES[query.get('_page_id')]
+        else:
+            content = {'result': [{'_ref': 'network/n:10.0.0.0/8/default',
+                                   'network': '10.0.0.0/8'}]}
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def export(self, *args, **kwargs):
+        with httmock.HTTMock(self.wapi_mock):
+            count = self.infoblox.export(self.output, *args,
+                                         progress=self.progress, **kwargs)
+        return count, [json.loads(line.decode('utf-8')) for line
+                       in self.output.getvalue().splitlines()]
+
+    def test_export(self):
+        count, objects = self.export([cli.Host, cli.Network])
+        self.assertEqual(3, count)
+        self.assertEqual(['a.bar.net', 'b.bar.net'],
+                         [obj['name'] for obj in objects[:2]])
+        self.assertEqual('10.0.0.0/8', objects[2]['network'])
+        self.assertEqual(['/wapi/v1.2/record:host', '/wapi/v1.2/record:host',
+                          '/wapi/v1.2/network'],
+                         [path for path, _query in self.requests])
+        self.assertEqual('1', self.requests[0][1]['_paging'])
+
+    def test_progress(self):
+        self.export([cli.Host])
+        self.assertEqual('Exported 1 objects, record:host next page: page2\n'
+                         'Exported 2 objects, record:host next page: None\n',
+                         self.progress.getvalue())
+
+    def test_resume(self):
+        count, objects = self.export([cli.Host, cli.Network],
+                                     page_id='page2')
+        self.assertEqual(2, count)
+        self.assertEqual('b.bar.net', objects[0]['name'])
+        self.assertEqual('page2', self.requests[0][1]['_page_id'])
+        self.assertNotIn('_page_id', self.requests[1][1])
+
+    def test_resume_later_type(self):
+        count, objects = self.export([cli.Host, cli.Network],
+                                     page_id='network-page',
+                                     page_type='network')
+        self.assertEqual(1, count)
+        self.assertEqual('10.0.0.0/8', objects[0]['network'])
+        self.assertEqual(['/wapi/v1.2/network'],
+                         [path for path, _query in self.requests])
+        self.assertEqual('network-page', self.requests[0][1]['_page_id'])
+
+    def test_resume_unknown_type(self):
+        self.assertRaises(ValueError, self.export, [cli.Host],
+                          page_id='page2', page_type='network')
+
+    def test_gzip(self):
+        output = gzip.GzipFile(fileobj=self.output, mode='wb')
+        with httmock.HTTMock(self.wapi_mock):
+            self.infoblox.export(output, [cli.Network])
+        output.close()
+        self.output.seek(0)
+        with gzip.GzipFile(fileobj=self.output, mode='rb') as handle:
+            self.assertEqual('10.0.0.0/8',
+                             json.loads(handle.read().decode('utf-8'))
+                             ['network'])
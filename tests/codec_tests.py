@@ -0,0 +1,154 @@
+"""
+Codec Tests
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import codec
+
+CAFE = b'caf\xc3\xa9'.decode('utf-8')
+
+VALUE = {'_ref': 'record:host/a:a.bar.net/default',
+         'comment': CAFE,
+         'ipv4addrs': [{'ipv4addr': '10.0.0.1'}],
+         'use_ttl': False,
+         'ttl': None}
+
+
+def installed(backend):
+    try:
+        __import__(backend)
+    except ImportError:
+        return False
+    return True
+
+
+class CodecTests(object):
+
+    BACKEND = None
+
+    def setUp(self):
+        if not installed(self.BACKEND):
+            raise unittest.SkipTest('%s is not installed' % self.BACKEND)
+        self.previous = codec.name
+        codec.use(self.BACKEND)
+
+    def tearDown(self):
+        codec.use(self.previous)
+
+    def test_name(self):
+        self.assertEqual(self.BACKEND, codec.name)
+
+    def test_dumps(self):
+        self.assertEqual(VALUE, codec.loads(codec.dumps(VALUE)))
+
+    def test_dumps_non_ascii(self):
+        self.assertIn(CAFE, codec.dumps(VALUE))
+
+    def test_encode(self):
+        value = codec.encode(VALUE)
+        self.assertIsInstance(value, bytes)
+        self.assertIn(CAFE.encode('utf-8'), value)
+        self.assertEqual(VALUE, codec.loads(value))
+
+    def test_encode_slashes(self):
+        self.assertIn(b'record:host/a', codec.encode(VALUE))
+
+    def test_loads_text(self):
+        self.assertEqual(VALUE, codec.loads(codec.encode(VALUE)
+                                            .decode('utf-8')))
+
+    def test_loads_invalid(self):
+        self.assertRaises(ValueError, codec.loads, b'{"result": [')
+
+
+class JSONTests(CodecTests, unittest.TestCase):
+    BACKEND = 'json'
+
+
+class SimpleJSONTests(CodecTests, unittest.TestCase):
+    BACKEND = 'simplejson'
+
+
+class UJSONTests(CodecTests, unittest.TestCase):
+    BACKEND = 'ujson'
+
+
+class ORJSONTests(CodecTests, unittest.TestCase):
+    BACKEND = 'orjson'
+
+
+class UseTests(unittest.TestCase):
+
+    def tearDown(self):
+        codec.use()
+
+    def test_default_is_first_installed(self):
+        self.assertEqual([backend for backend in codec.BACKENDS
+                          if installed(backend)][0], codec.use())
+
+    def test_unsupported(self):
+        self.assertRaises(ValueError, codec.use, 'pickle')
+
+
+class IterloadTests(unittest.TestCase):
+
+    DOCUMENT = codec.encode({'result': [VALUE, 12345, [], {}, CAFE],
+                             'next_page_id': 'page2'})
+
+    @staticmethod
+    def chunks(value, size):
+        return [value[offset:offset + size]
+                for offset in range(0, len(value), size)]
+
+    def test_object(self):
+        meta = {}
+        self.assertEqual(codec.loads(self.DOCUMENT)['result'],
+                         list(codec.iterload([self.DOCUMENT], meta)))
+        self.assertEqual({'next_page_id': 'page2'}, meta)
+
+    def test_chunk_boundaries(self):
+        expectation = codec.loads(self.DOCUMENT)['result']
+        for size in range(1, 12):
+            meta = {}
+            self.assertEqual(expectation,
+                             list(codec.iterload(
+                                 self.chunks(self.DOCUMENT, size), meta)))
+            self.assertEqual({'next_page_id': 'page2'}, meta)
+
+    def test_number_split_across_chunks(self):
+        self.assertEqual([12345, 6],
+                         list(codec.iterload([b'[12', b'345', b', 6]'])))
+
+    def test_float_split_across_chunks(self):
+        self.assertEqual([1.5, 2],
+                         list(codec.iterload([b'[1.', b'5,2]'])))
+
+    def test_exponent_split_across_chunks(self):
+        self.assertEqual([1e5, 2.5e-3],
+                         list(codec.iterload([b'[1e', b'5, 2.5e', b'-',
+                                              b'3]'])))
+
+    def test_array(self):
+        self.assertEqual([1, 2, 3],
+                         list(codec.iterload([b' [1, 2 ,', b'3 ]\n'])))
+
+    def test_empty(self):
+        self.assertEqual([], list(codec.iterload([b'[ ]'])))
+        self.assertEqual([], list(codec.iterload([b'{"result": []}'])))
+
+    def test_is_incremental(self):
+        def chunks():
+            yield b'[{"a": 1}, '
+            raise AssertionError('Read too far')
+        self.assertEqual({'a': 1}, next(codec.iterload(chunks())))
+
+    def test_truncated(self):
+        self.assertRaises(ValueError, list,
+                          codec.iterload(self.chunks(self.DOCUMENT[:-20], 5)))
+
+    def test_not_an_array(self):
+        self.assertRaises(ValueError, list, codec.iterload([b'"foo"']))
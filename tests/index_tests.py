@@ -0,0 +1,136 @@
+"""
+NetworkIndex Tests
+
+"""
+import json
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import index
+from infoblox import network
+from infoblox import session
+
+
+def make_network(cidr, comment=None):
+    return network.Network._build(None, {'_ref': 'network/%s/default' % cidr,
+                                         'network': cidr,
+                                         'comment': comment})
+
+
+class ParseTests(unittest.TestCase):
+
+    def test_ipv4_network(self):
+        self.assertEqual((index.socket.AF_INET, 0x0a000000, 8),
+                         index.parse('10.0.0.0/8'))
+
+    def test_ipv4_address(self):
+        self.assertEqual((index.socket.AF_INET, 0x0a010203, 32),
+                         index.parse('10.1.2.3'))
+
+    def test_ipv6_network(self):
+        self.assertEqual((index.socket.AF_INET6, 0x20010db8 << 96, 32),
+                         index.parse('2001:db8::/32'))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, index.parse, '10.0.0.256')
+        self.assertRaises(ValueError, index.parse, '10.0.0.0/33')
+
+
+class NetworkIndexTests(unittest.TestCase):
+
+    CIDRS = ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '10.2.0.0/16',
+             '192.168.0.0/24', '2001:db8::/32', '2001:db8:1::/48']
+
+    def setUp(self):
+        self.index = index.NetworkIndex([make_network(cidr)
+                                         for cidr in self.CIDRS])
+
+    def test_len(self):
+        self.assertEqual(7, len(self.index))
+
+    def test_lookup(self):
+        self.assertEqual('10.1.2.0/24', self.index.lookup('10.1.2.3').network)
+        self.assertEqual('10.1.0.0/16', self.index.lookup('10.1.3.3').network)
+        self.assertEqual('10.0.0.0/8', self.index.lookup('10.3.0.1').network)
+        self.assertIsNone(self.index.lookup('172.16.0.1'))
+
+    def test_lookup_ipv6(self):
+        self.assertEqual('2001:db8:1::/48',
+                         self.index.lookup('2001:db8:1::5').network)
+        self.assertEqual('2001:db8::/32',
+                         self.index.lookup('2001:db8:2::5').network)
+
+    def test_containing(self):
+        self.assertEqual(['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24'],
+                         [net.network for net in
+                          self.index.containing('10.1.2.128/25')])
+
+    def test_contained(self):
+        self.assertEqual(['10.1.0.0/16', '10.1.2.0/24'],
+                         [net.network for net in
+                          self.index.contained('10.1.0.0/16')])
+        self.assertEqual(['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24',
+                          '10.2.0.0/16', '192.168.0.0/24'],
+                         [net.network for net in
+                          self.index.contained('0.0.0.0/0')])
+        self.assertEqual([], self.index.contained('172.16.0.0/12'))
+
+    def test_contains(self):
+        self.assertIn('10.1.0.0/16', self.index)
+        self.assertNotIn('10.1.0.0/17', self.index)
+
+    def test_remove(self):
+        removed = self.index.remove('10.1.2.0/24')
+        self.assertEqual('10.1.2.0/24', removed.network)
+        self.assertEqual('10.1.0.0/16', self.index.lookup('10.1.2.3').network)
+        self.assertEqual(6, len(self.index))
+        self.assertRaises(KeyError, self.index.remove, '10.1.2.0/24')
+
+    def test_remove_prunes_nodes(self):
+        self.index.remove('192.168.0.0/24')
+        self.assertIsNone(self.index._roots[index.socket.AF_INET][1])
+
+    def test_add_replaces(self):
+        self.index.add(make_network('10.1.0.0/16', 'new'))
+        self.assertEqual('new', self.index.lookup('10.1.9.9').comment)
+        self.assertEqual(7, len(self.index))
+
+
+class NetworkIndexLoadTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.networks = [{'_ref': 'network/a:10.0.0.0/8/default',
+                          'network': '10.0.0.0/8', 'comment': 'a'},
+                         {'_ref': 'network/b:10.1.0.0/16/default',
+                          'network': '10.1.0.0/16', 'comment': 'b'}]
+
+    @httmock.all_requests
+    def search_mock(self, url, request):
+        return {'content': json.dumps({'result': self.networks}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_load(self):
+        with httmock.HTTMock(self.search_mock):
+            networks = index.NetworkIndex.load(self.session)
+        self.assertEqual(2, len(networks))
+        self.assertEqual('b', networks.lookup('10.1.1.1').comment)
+
+    def test_refresh(self):
+        with httmock.HTTMock(self.search_mock):
+            networks = index.NetworkIndex.load(self.session)
+            self.networks[1]['comment'] = 'changed'
+            del self.networks[0]
+            self.networks.append({'_ref': 'network/c:10.2.0.0/16/default',
+                                  'network': '10.2.0.0/16'})
+            self.assertEqual((1, 1, 1), networks.refresh())
+        self.assertEqual('changed', networks.lookup('10.1.1.1').comment)
+        self.assertIsNone(networks.lookup('10.3.0.0'))
+        self.assertEqual('10.2.0.0/16', networks.lookup('10.2.0.1').network)
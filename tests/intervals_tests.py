@@ -0,0 +1,147 @@
+"""
+IntervalSet Tests
+
+"""
+import json
+import socket
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
+
+from infoblox import intervals
+from infoblox import network
+from infoblox import session
+
+
+def networks(*cidrs):
+    return intervals.IntervalSet.from_networks(cidrs)
+
+
+class IntervalSetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.container = networks('10.0.0.0/16')
+        self.used = networks('10.0.2.0/23', '10.0.0.0/24', '10.0.1.0/25')
+
+    def test_merges_adjacent_networks(self):
+        self.assertEqual(['10.0.0.0/24', '10.0.1.0/25', '10.0.2.0/23'],
+                         self.used.cidrs())
+        self.assertEqual([(0x0a000000, 0x0a00017f), (0x0a000200, 0x0a0003ff)],
+                         list(self.used))
+
+    def test_merges_overlapping_networks(self):
+        self.assertEqual(networks('10.0.0.0/23'),
+                         networks('10.0.0.0/24', '10.0.0.128/25',
+                                  '10.0.0.0/23', '10.0.1.0/24'))
+
+    def test_host_bits_are_ignored(self):
+        self.assertEqual(networks('10.0.0.0/24'), networks('10.0.0.5/24'))
+
+    def test_network_objects(self):
+        value = network.Network._build(None, {'network': '10.0.0.0/24'})
+        self.assertEqual(networks('10.0.0.0/24'),
+                         intervals.IntervalSet.from_networks([value]))
+
+    def test_mixed_families(self):
+        self.assertRaises(ValueError, networks, '10.0.0.0/8', '2001:db8::/32')
+        self.assertRaises(ValueError, self.used.union,
+                          networks('2001:db8::/32'))
+
+    def test_difference(self):
+        free = self.container - self.used
+        self.assertEqual(['10.0.1.128/25', '10.0.4.0/22', '10.0.8.0/21',
+                          '10.0.16.0/20', '10.0.32.0/19', '10.0.64.0/18',
+                          '10.0.128.0/17'], free.cidrs())
+        self.assertEqual(self.container.size - self.used.size, free.size)
+
+    def test_difference_outside(self):
+        self.assertEqual(self.used, self.used - networks('192.168.0.0/16'))
+        self.assertEqual(0, len(self.used - self.container))
+
+    def test_union(self):
+        free = self.container - self.used
+        self.assertEqual(self.container, free | self.used)
+        self.assertEqual(self.used, self.used | intervals.IntervalSet())
+
+    def test_contains(self):
+        self.assertIn('10.0.1.127', self.used)
+        self.assertIn('10.0.2.0/24', self.used)
+        self.assertNotIn('10.0.1.128', self.used)
+        self.assertNotIn('10.0.0.0/22', self.used)
+        self.assertNotIn('2001:db8::1', self.used)
+
+    def test_free_prefixes(self):
+        free = self.container - self.used
+        self.assertEqual(['10.0.1.128/26', '10.0.1.192/26', '10.0.4.0/26'],
+                         list(free.free_prefixes(26))[:3])
+        self.assertEqual(['10.0.4.0/22', '10.0.8.0/22'],
+                         list(free.free_prefixes(22))[:2])
+        self.assertEqual([], list(free.free_prefixes(16)))
+
+    def test_free_prefixes_invalid(self):
+        self.assertRaises(ValueError, list, self.used.free_prefixes(33))
+
+    def test_fragmentation(self):
+        self.assertEqual(intervals.Fragmentation(2, 896, 512, 23,
+                                                 1 - 512 / 896.0),
+                         self.used.fragmentation())
+
+    def test_fragmentation_empty(self):
+        self.assertEqual(intervals.Fragmentation(0, 0, 0, None, 0.0),
+                         intervals.IntervalSet().fragmentation())
+
+    def test_ipv6(self):
+        free = networks('2001:db8::/32') - networks('2001:db8::/34')
+        self.assertEqual(socket.AF_INET6, free.family)
+        self.assertEqual(['2001:db8:4000::/34', '2001:db8:8000::/33'],
+                         free.cidrs())
+        self.assertEqual('2001:db8:4000::/48',
+                         next(free.free_prefixes(48)))
+
+
+class FreeSpaceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = session.Session('127.0.0.1')
+        self.requests = []
+        self.containers = []
+
+    @httmock.all_requests
+    def search_mock(self, url, request):
+        self.requests.append((url.path, dict(urlparse.parse_qsl(url.query)),
+                              json.loads(request.body)))
+        if url.path.endswith('/networkcontainer'):
+            result = self.containers
+        else:
+            result = [{'_ref': 'network/a:10.0.0.0/24/default',
+                       'network': '10.0.0.0/24'},
+                      {'_ref': 'network/b:10.0.2.0/24/default',
+                       'network': '10.0.2.0/24'}]
+        return {'content': json.dumps({'result': result}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_free_space(self):
+        with httmock.HTTMock(self.search_mock):
+            free = intervals.free_space(self.session, '10.0.0.0/22')
+        self.assertEqual(['10.0.1.0/24', '10.0.3.0/24'], free.cidrs())
+        self.assertEqual(['/wapi/v1.2/network', '/wapi/v1.2/networkcontainer'],
+                         [path for path, _query, _criteria in self.requests])
+        for _path, query, criteria in self.requests:
+            self.assertEqual('network', query['_return_fields'])
+            self.assertEqual({'network_container': '10.0.0.0/22',
+                              'network_view': 'default'}, criteria)
+
+    def test_free_space_nested_container(self):
+        self.containers = [{'_ref': 'networkcontainer/c:10.0.3.0/25/default',
+                            'network': '10.0.3.0/25'}]
+        with httmock.HTTMock(self.search_mock):
+            free = intervals.free_space(self.session, '10.0.0.0/22')
+        self.assertEqual(['10.0.1.0/24', '10.0.3.128/25'], free.cidrs())
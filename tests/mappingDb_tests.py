@@ -0,0 +1,441 @@
+"""
+MappingDb Tests
+
+"""
+import json
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
+
+from infoblox import exceptions
+from infoblox import network
+from infoblox import record
+from infoblox import session
+
+
+class SearchTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+    PAGES = {None: {'result': [{'_ref': 'record:host/a:a.bar.net/default',
+                                'name': 'a.bar.net'},
+                               {'_ref': 'record:host/b:b.bar.net/default',
+                                'name': 'b.bar.net'}],
+                    'next_page_id': 'page2'},
+             'page2': {'result': [{'_ref': 'record:host/c:c.bar.net/default',
+                                   'name': 'c.bar.net',
+                                   'comment': 'foo'}]}}
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+
+    @httmock.all_requests
+    def search_mock(self, url, request):
+        query = dict(urlparse.parse_qsl(url.query))
+        self.requests.append((url.path, query, request.body))
+        return {'content': json.dumps(self.PAGES[query.get('_page_id')]),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    @httmock.all_requests
+    def error_mock(self, url, request):
+        return {'content': json.dumps({'text': 'Bad search'}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 400}
+
+    def test_search_yields_all_pages(self):
+        with httmock.HTTMock(self.search_mock):
+            hosts = list(record.Host.search(self.session, zone='bar.net'))
+        self.assertEqual(['a.bar.net', 'b.bar.net', 'c.bar.net'],
+                         [host.name for host in hosts])
+        self.assertEqual(2, len(self.requests))
+
+    def test_search_builds_clean_objects(self):
+        with httmock.HTTMock(self.search_mock):
+            host = list(record.Host.search(self.session))[2]
+        self.assertIsInstance(host, record.Host)
+        self.assertEqual('record:host/c:c.bar.net/default', host._ref)
+        self.assertEqual('foo', host.comment)
+        self.assertFalse(host.dirty)
+
+    def test_search_paging_arguments(self):
+        with httmock.HTTMock(self.search_mock):
+            list(record.Host.search(self.session, 2, zone='bar.net'))
+        path, query, body = self.requests[0]
+        self.assertEqual('/wapi/v1.2/record:host', path)
+        self.assertEqual('1', query['_paging'])
+        self.assertEqual('2', query['_max_results'])
+        self.assertEqual({'zone': 'bar.net'}, json.loads(body))
+        self.assertEqual('page2', self.requests[1][1]['_page_id'])
+
+    def test_search_is_lazy(self):
+        with httmock.HTTMock(self.search_mock):
+            hosts = record.Host.search(self.session)
+            next(hosts)
+            self.assertEqual(1, len(self.requests))
+
+    def test_pages_resume(self):
+        with httmock.HTTMock(self.search_mock):
+            pages = list(record.Host.pages(self.session, page_id='page2'))
+        self.assertEqual(1, len(pages))
+        self.assertIsNone(pages[0][0])
+        self.assertEqual('c.bar.net', pages[0][1][0].name)
+
+    def test_search_compact(self):
+        with httmock.HTTMock(self.search_mock):
+            host = next(record.Host.search(self.session, compact=True))
+        self.assertIs(record.Host.compact(), type(host))
+
+    def test_search_fields_changes(self):
+        with httmock.HTTMock(self.search_mock):
+            host = next(record.Host.search(self.session,
+                                           fields=['name', 'comment']))
+            host.comment = 'bar'
+            self.assertEqual({'comment': 'bar'}, host.changes())
+        self.assertEqual(1, len(self.requests))
+
+    def test_search_error(self):
+        with httmock.HTTMock(self.error_mock):
+            self.assertRaises(exceptions.ProtocolError, list,
+                              record.Host.search(self.session))
+
+    @httmock.all_requests
+    def list_mock(self, url, request):
+        self.requests.append((url.path, dict(urlparse.parse_qsl(url.query)),
+                              request.body))
+        return {'content': json.dumps(self.PAGES[None]['result']),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_stream(self):
+        with httmock.HTTMock(self.list_mock):
+            hosts = list(record.Host.stream(self.session, max_results=5,
+                                            chunk_size=7, zone='bar.net'))
+        self.assertEqual(['a.bar.net', 'b.bar.net'],
+                         [host.name for host in hosts])
+        self.assertFalse(hosts[0].dirty)
+        path, query, body = self.requests[0]
+        self.assertEqual('5', query['_max_results'])
+        self.assertNotIn('_paging', query)
+        self.assertEqual({'zone': 'bar.net'}, json.loads(body))
+
+    def test_stream_pages(self):
+        with httmock.HTTMock(self.search_mock):
+            hosts = list(record.Host.stream(self.session, 2, chunk_size=7,
+                                            zone='bar.net'))
+        self.assertEqual(['a.bar.net', 'b.bar.net', 'c.bar.net'],
+                         [host.name for host in hosts])
+        self.assertEqual('2', self.requests[0][1]['_max_results'])
+        self.assertEqual('page2', self.requests[1][1]['_page_id'])
+
+    def test_stream_compact_fields(self):
+        with httmock.HTTMock(self.list_mock):
+            host = next(record.Host.stream(self.session, compact=True,
+                                           fields=['name']))
+        self.assertIsInstance(host, record.Host.compact())
+        self.assertEqual('name', self.requests[0][1]['_return_fields'])
+
+    def test_stream_error(self):
+        with httmock.HTTMock(self.error_mock):
+            self.assertRaises(exceptions.ProtocolError, list,
+                              record.Host.stream(self.session))
+
+
+class LazyTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+    HOST_REF = 'record:host/a:a.bar.net/default'
+    IPV4_REF = 'record:host_ipv4addr/a4:10.0.0.1/a.bar.net/default'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        self.requests.append(url.path)
+        if 'host_ipv4addr' in url.path:
+            content = {'_ref': self.IPV4_REF, 'ipv4addr': '10.0.0.1',
+                       'mac': '00:11:22:33:44:55'}
+        else:
+            content = [{'_ref': self.HOST_REF, 'name': 'a.bar.net',
+                        'comment': 'foo',
+                        'ipv4addrs': [{'_ref': self.IPV4_REF,
+                                       'host': 'a.bar.net',
+                                       'ipv4addr': '10.0.0.1'}]}]
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_not_fetched_on_construction(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net', lazy=True)
+            self.assertEqual('a.bar.net', host.name)
+        self.assertEqual([], self.requests)
+        self.assertIsInstance(host, record.Host)
+
+    def test_fetched_on_field_access(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net', lazy=True)
+            self.assertEqual('foo', host.comment)
+            self.assertEqual('foo', host.comment)
+        self.assertEqual(['/wapi/v1.2/record:host'], self.requests)
+        self.assertIs(record.Host, type(host))
+
+    def test_load(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net', lazy=True)
+            self.assertTrue(host.load())
+            self.assertFalse(host.load())
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(self.HOST_REF, host._ref)
+
+    def test_nothing_to_load(self):
+        host = record.Host(self.session, lazy=True)
+        self.assertIs(record.Host, type(host))
+        self.assertFalse(host.load())
+
+    def test_compact(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host.compact()(self.session, name='a.bar.net',
+                                         lazy=True)
+            self.assertEqual([], self.requests)
+            self.assertEqual('foo', host.comment)
+        self.assertIs(record.Host.compact(), type(host))
+
+    def test_nested_objects_are_proxies(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net')
+            address = host.ipv4addrs[0]
+            self.assertEqual(1, len(self.requests))
+            self.assertIsInstance(address, record.HostIPv4)
+            self.assertEqual('10.0.0.1', address.ipv4addr)
+            self.assertEqual(self.IPV4_REF, address._ref)
+            self.assertEqual(1, len(self.requests))
+            self.assertEqual('00:11:22:33:44:55', address.mac)
+        self.assertEqual('/wapi/v1.2/' + self.IPV4_REF, self.requests[1])
+
+    def test_load_keeps_edits_to_loaded_fields(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net')
+            address = host.ipv4addrs[0]
+            address.ipv4addr = '10.0.0.2'
+            self.assertEqual('00:11:22:33:44:55', address.mac)
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual('10.0.0.2', address.ipv4addr)
+        self.assertEqual({'ipv4addr': '10.0.0.2'}, address.changes())
+
+    def test_dumps_does_not_load_nested_objects(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net')
+            values = json.loads(host.dumps())
+        self.assertEqual(['/wapi/v1.2/record:host'], self.requests)
+        self.assertEqual('10.0.0.1', values['ipv4addrs'][0]['ipv4addr'])
+        self.assertNotIn('mac', values['ipv4addrs'][0])
+
+    def test_nested_ipv6_proxies_not_fetched_on_build(self):
+        ref = 'record:host_ipv6addr/b:2001%3Adb8%3A%3A1/a.bar.net/default'
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host._build(self.session,
+                                      {'_ref': self.HOST_REF,
+                                       'name': 'a.bar.net',
+                                       'ipv6addrs': [{'_ref': ref,
+                                                      'ipv6addr':
+                                                          '2001:db8::1'}]})
+        self.assertEqual([], self.requests)
+        self.assertEqual([{'ipv6addr': '2001:db8::1'}],
+                         host._save_values()['ipv6addrs'])
+
+    def test_scalar_lists_are_kept(self):
+        address = record.IPv4Address._build(
+            self.session, {'_ref': 'ipv4address/a:10.0.0.1',
+                           'ip_address': '10.0.0.1',
+                           'names': ['a.bar.net'],
+                           'types': ['HOST']})
+        self.assertEqual(['a.bar.net'], address._save_values()['names'])
+        self.assertEqual({}, address.changes())
+
+
+class SaveTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+    REF = 'record:host/a:a.bar.net/default'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+        self.host_values = {'_ref': self.REF, 'name': 'a.bar.net',
+                            'comment': 'foo', 'extattrs': {'Site': 'NYC'},
+                            'ipv4addrs': [{'ipv4addr': '10.0.0.1'}]}
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        body = json.loads(request.body) if request.body else None
+        self.requests.append((request.method, url.query, body))
+        if request.method == 'GET' or '_return_fields' in url.query:
+            content = self.host_values
+        else:
+            content = self.REF
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def fetch_host(self):
+        with httmock.HTTMock(self.wapi_mock):
+            host = record.Host(self.session, name='a.bar.net')
+        del self.requests[:]
+        return host
+
+    def test_loaded_object_is_clean(self):
+        host = self.fetch_host()
+        self.assertFalse(host.dirty)
+        self.assertEqual({}, host.changes())
+
+    def test_no_request_without_changes(self):
+        host = self.fetch_host()
+        with httmock.HTTMock(self.wapi_mock):
+            self.assertTrue(host.save())
+        self.assertEqual([], self.requests)
+
+    def test_only_changes_are_sent(self):
+        host = self.fetch_host()
+        host.comment = 'bar'
+        self.assertTrue(host.dirty)
+        with httmock.HTTMock(self.wapi_mock):
+            host.save()
+        self.assertEqual(('PUT', '', {'_ref': self.REF, 'comment': 'bar'}),
+                         self.requests[0])
+
+    def test_in_place_changes_are_detected(self):
+        host = self.fetch_host()
+        host.extattrs['Site'] = 'LAX'
+        host.add_ipv4addr('10.0.0.2')
+        self.assertEqual(['extattrs', 'ipv4addrs'], sorted(host.changes()))
+
+    def test_cleared_fields_are_sent(self):
+        host = self.fetch_host()
+        host.comment = None
+        self.assertEqual({'comment': None}, host.changes())
+
+    def test_new_object_sends_all_values(self):
+        host = record.Host(self.session)
+        host.name = 'b.bar.net'
+        with httmock.HTTMock(self.wapi_mock):
+            host.save()
+        self.assertEqual('POST', self.requests[0][0])
+        self.assertEqual('b.bar.net', self.requests[0][2]['name'])
+        self.assertIn('view', self.requests[0][2])
+
+    def test_save_refetches(self):
+        host = self.fetch_host()
+        host.comment = 'bar'
+        with httmock.HTTMock(self.wapi_mock):
+            host.save()
+        self.assertEqual(['PUT', 'GET'],
+                         [method for method, _query, _body in self.requests])
+
+    def test_save_with_return_fields(self):
+        host = self.fetch_host()
+        host.comment = 'bar'
+        self.host_values['comment'] = 'bar'
+        with httmock.HTTMock(self.wapi_mock):
+            host.save(return_fields=True)
+        self.assertEqual(1, len(self.requests))
+        self.assertIn('_return_fields=', self.requests[0][1])
+        self.assertFalse(host.dirty)
+
+
+class ProjectionTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+    REF = 'network/ZG5zLm5ldHdvcmskMTAuMC4wLjAvMjQvMA:10.0.0.0/24/default'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        query = dict(urlparse.parse_qsl(url.query))
+        self.requests.append(query.get('_return_fields'))
+        values = {'_ref': self.REF, 'network': '10.0.0.0/24',
+                  'comment': 'foo', 'members': [{'name': 'dhcp1'}],
+                  'network_view': 'default'}
+        fields = query['_return_fields'].split(',')
+        content = dict((key, value) for key, value in values.items()
+                       if key == '_ref' or key in fields)
+        if url.path.endswith('/network'):
+            content = [content]
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_only_projected_fields_are_fetched(self):
+        with httmock.HTTMock(self.wapi_mock):
+            obj = network.Network(self.session, network='10.0.0.0/24',
+                                  fields=['network', 'comment'])
+            self.assertEqual('foo', obj.comment)
+        self.assertEqual(['network,comment'], self.requests)
+        self.assertEqual(self.REF, obj._ref)
+
+    def test_other_fields_are_loaded_on_access(self):
+        with httmock.HTTMock(self.wapi_mock):
+            obj = network.Network(self.session, network='10.0.0.0/24',
+                                  fields=['network', 'comment'])
+            self.assertEqual([{'name': 'dhcp1'}], obj.members)
+            self.assertEqual('default', obj.network_view)
+        self.assertEqual(2, len(self.requests))
+        self.assertIn('members', self.requests[1].split(','))
+        self.assertIs(network.Network, type(obj))
+
+    def test_changes_ignore_unloaded_fields(self):
+        with httmock.HTTMock(self.wapi_mock):
+            obj = network.Network(self.session, network='10.0.0.0/24',
+                                  fields=['network', 'comment'])
+            obj.comment = 'bar'
+            self.assertEqual({'comment': 'bar'}, obj.changes())
+        self.assertEqual(1, len(self.requests))
+
+    def test_load_keeps_edits_to_projected_fields(self):
+        with httmock.HTTMock(self.wapi_mock):
+            obj = network.Network(self.session, network='10.0.0.0/24',
+                                  fields=['network', 'comment'])
+            obj.comment = 'bar'
+            self.assertEqual([{'name': 'dhcp1'}], obj.members)
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual('bar', obj.comment)
+        self.assertEqual({'comment': 'bar'}, obj.changes())
+
+    def test_assigning_unloaded_field_loads_first(self):
+        with httmock.HTTMock(self.wapi_mock):
+            obj = network.Network(self.session, network='10.0.0.0/24',
+                                  fields=['network'])
+            obj.members = []
+            self.assertEqual(2, len(self.requests))
+        self.assertEqual([], obj.members)
+
+    def test_lazy_projection(self):
+        with httmock.HTTMock(self.wapi_mock):
+            obj = network.Network(self.session, network='10.0.0.0/24',
+                                  lazy=True, fields=['network', 'comment'])
+            self.assertEqual([], self.requests)
+            self.assertEqual('foo', obj.comment)
+            self.assertEqual(['network,comment'], self.requests)
+            self.assertEqual('default', obj.network_view)
+        self.assertEqual(2, len(self.requests))
+
+    def test_class_projection(self):
+
+        class SmallNetwork(network.Network):
+            _projection = ['network']
+
+        with httmock.HTTMock(self.wapi_mock):
+            SmallNetwork(self.session, network='10.0.0.0/24')
+        self.assertEqual(['network'], self.requests)
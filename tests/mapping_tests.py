@@ -0,0 +1,122 @@
+"""
+Mapping Tests
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import mapping
+
+CAFE = b'caf\xc3\xa9'.decode('utf-8')
+
+
+class Example(mapping.Mapping):
+    bar = None
+    foo = 'default'
+
+    @property
+    def baz(self):
+        return 'qux'
+
+    def method(self):
+        return None
+
+
+class MappingSchemaTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obj = Example()
+
+    def test_class_fields(self):
+        self.assertEqual(('bar', 'foo'), Example._fields)
+
+    def test_keys(self):
+        self.assertEqual(['bar', 'foo'], self.obj.keys())
+
+    def test_keys_returns_new_list(self):
+        self.obj.keys().append('_ref')
+        self.assertEqual(['bar', 'foo'], self.obj.keys())
+
+    def test_extra_keys(self):
+        self.obj.corge = 1
+        self.assertEqual(['bar', 'corge', 'foo'], self.obj.keys())
+        self.assertIn('corge', self.obj)
+        self.assertEqual(3, len(self.obj))
+
+    def test_extra_keys_are_per_instance(self):
+        self.obj.corge = 1
+        self.assertNotIn('corge', Example())
+
+    def test_delete_extra_key(self):
+        self.obj.corge = 1
+        del self.obj['corge']
+        self.assertEqual(['bar', 'foo'], self.obj.keys())
+
+    def test_getitem_raises_key_error(self):
+        self.assertRaises(KeyError, self.obj.__getitem__, 'baz')
+
+    def test_clear_restores_defaults(self):
+        self.obj.foo = 'bar'
+        self.obj.clear()
+        self.assertEqual('default', self.obj.foo)
+
+    def test_dirty(self):
+        self.assertFalse(self.obj.dirty)
+        self.obj.foo = 'bar'
+        self.assertTrue(self.obj.dirty)
+
+
+class CompactMappingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cls = Example.compact()
+        self.obj = self.cls()
+
+    def test_compact_class_is_cached(self):
+        self.assertIs(self.cls, Example.compact())
+        self.assertIs(self.cls, self.cls.compact())
+
+    def test_compact_is_subclass(self):
+        self.assertIsInstance(self.obj, Example)
+
+    def test_fields_in_slots(self):
+        self.assertEqual(('bar', 'foo', '_dirty', '_extra'),
+                         self.cls.__slots__)
+
+    def test_same_keys(self):
+        self.assertEqual(Example().keys(), self.obj.keys())
+
+    def test_default_values(self):
+        self.assertEqual({'bar': None, 'foo': 'default'}, self.obj.as_dict())
+
+    def test_assigned_values(self):
+        self.obj.foo = 'bar'
+        self.assertEqual('bar', self.obj['foo'])
+        self.assertTrue(self.obj.dirty)
+
+    def test_extra_keys(self):
+        self.obj.corge = 1
+        self.assertEqual(['bar', 'corge', 'foo'], self.obj.keys())
+
+    def test_clear_restores_defaults(self):
+        self.obj.foo = 'bar'
+        self.obj.clear()
+        self.assertEqual('default', self.obj.foo)
+
+    def test_missing_attribute(self):
+        self.assertRaises(AttributeError, getattr, self.obj, 'corge')
+
+
+class MappingSerializationTests(unittest.TestCase):
+
+    def test_dumps(self):
+        obj = Example(bar=CAFE)
+        self.assertEqual({'bar': CAFE, 'foo': 'default'},
+                         mapping.codec.loads(obj.dumps()))
+
+    def test_loads(self):
+        obj = Example()
+        obj.loads('{"bar": 1, "foo": "baz"}')
+        self.assertEqual((1, 'baz'), (obj.bar, obj.foo))
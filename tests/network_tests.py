@@ -0,0 +1,118 @@
+"""
+Network Tests
+
+"""
+import json
+import threading
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    import urlparse
+except ImportError:
+    import urllib.parse as urlparse
+
+from infoblox import exceptions
+from infoblox import network
+from infoblox import session
+
+
+class NextAvailableTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+    REF = 'network/ZG5zLm5ldHdvcmskMTAuMC4wLjAvMjQvMA:10.0.0.0/24/default'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.network = network.Network._build(self.session,
+                                              {'_ref': self.REF,
+                                               'network': '10.0.0.0/24'})
+        self.requests = []
+        self.used = 0
+
+    @httmock.all_requests
+    def function_mock(self, url, request):
+        data = json.loads(request.body)
+        self.requests.append((request.method, url.path,
+                              dict(urlparse.parse_qsl(url.query)), data))
+        ips = []
+        offset = 1
+        while len(ips) < data['num'] and offset < 255:
+            address = '10.0.0.%i' % offset
+            if address not in data.get('exclude', []) and offset > self.used:
+                ips.append(address)
+            offset += 1
+        return {'content': json.dumps({'ips': ips}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    @httmock.all_requests
+    def error_mock(self, url, request):
+        return {'content': json.dumps({'text': 'Network is full'}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 400}
+
+    def test_next_available_ip(self):
+        with httmock.HTTMock(self.function_mock):
+            ips = self.network.next_available_ip(3, ['10.0.0.2'])
+        self.assertEqual(['10.0.0.1', '10.0.0.3', '10.0.0.4'], ips)
+        method, path, query, data = self.requests[0]
+        self.assertEqual('POST', method)
+        self.assertEqual('/wapi/v1.2/' + self.REF, path)
+        self.assertEqual({'_function': 'next_available_ip'}, query)
+        self.assertEqual({'num': 3, 'exclude': ['10.0.0.2']}, data)
+
+    def test_next_available_ip_error(self):
+        with httmock.HTTMock(self.error_mock):
+            self.assertRaises(exceptions.ProtocolError,
+                              self.network.next_available_ip)
+
+    def test_next_available_ip_without_reference(self):
+        self.assertRaises(ValueError,
+                          network.Network(self.session).next_available_ip)
+
+    def test_pool_fetches_in_batches(self):
+        pool = network.AddressPool(self.network, 4)
+        with httmock.HTTMock(self.function_mock):
+            ips = [pool.get() for _offset in range(6)]
+        self.assertEqual(['10.0.0.%i' % offset for offset in range(1, 7)],
+                         ips)
+        self.assertEqual(2, len(self.requests))
+        self.assertEqual(['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4'],
+                         self.requests[1][3]['exclude'])
+        self.assertEqual(2, len(pool))
+
+    def test_pool_release(self):
+        pool = network.AddressPool(self.network, 1)
+        with httmock.HTTMock(self.function_mock):
+            pool.get()
+            self.used = 1
+            pool.release('10.0.0.1')
+            pool.get()
+        self.assertNotIn('exclude', self.requests[1][3])
+
+    def test_pool_threads_get_unique_addresses(self):
+        pool = network.AddressPool(self.network, 8)
+        ips = []
+
+        def worker():
+            for _offset in range(10):
+                ips.append(pool.get())
+
+        with httmock.HTTMock(self.function_mock):
+            threads = [threading.Thread(target=worker) for _offset in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(40, len(set(ips)))
+        self.assertEqual(5, len(self.requests))
+
+    def test_pool_exhausted(self):
+        self.used = 254
+        pool = network.AddressPool(self.network)
+        with httmock.HTTMock(self.function_mock):
+            self.assertRaises(exceptions.ProtocolError, pool.get)
@@ -0,0 +1,148 @@
+"""
+Reconcile Tests
+
+"""
+import json
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import network
+from infoblox import reconcile
+from infoblox import record
+from infoblox import session
+
+
+def make_host(name, *addresses, **values):
+    values.update({'_ref': 'record:host/%s:%s/default' % (name, name),
+                   'name': name,
+                   'view': 'default',
+                   'ipv4addrs': [{'_ref': 'record:host_ipv4addr/%s:%s/%s/'
+                                          'default' % (name, address, name),
+                                  'ipv4addr': address,
+                                  'mac': '00:50:56:00:00:01'}
+                                 for address in addresses]})
+    return values
+
+
+class KeyTests(unittest.TestCase):
+
+    def test_default_view(self):
+        self.assertEqual(('a.bar.net', 'default'),
+                         reconcile.key('record:host', {'name': 'a.bar.net'}))
+
+    def test_network(self):
+        obj = network.Network._build(None, {'network': '10.0.0.0/8',
+                                            'network_view': 'internal'})
+        self.assertEqual(('10.0.0.0/8', 'internal'),
+                         reconcile.key('network', obj))
+
+
+class PlanTests(unittest.TestCase):
+
+    def setUp(self):
+        self.current = [record.Host._build(None, make_host(name, address))
+                        for name, address in [('a.bar.net', '10.0.0.1'),
+                                              ('b.bar.net', '10.0.0.2'),
+                                              ('c.bar.net', '10.0.0.3')]]
+
+    def plan(self, desired):
+        return reconcile.plan(record.Host, desired, self.current)
+
+    def test_unchanged(self):
+        result = self.plan([{'name': 'a.bar.net', 'view': 'default',
+                             'ipv4addrs': ['10.0.0.1']},
+                            {'name': 'b.bar.net', 'ipv4addrs': ['10.0.0.2']},
+                            {'name': 'c.bar.net',
+                             'ipv4addrs': [{'ipv4addr': '10.0.0.3'}]}])
+        self.assertEqual(0, len(result))
+
+    def test_add(self):
+        desired = {'name': 'd.bar.net', 'ipv4addrs': ['10.0.0.4']}
+        result = self.plan([desired])
+        self.assertEqual([desired], result.add)
+
+    def test_modify(self):
+        result = self.plan([{'name': 'a.bar.net', 'comment': 'foo',
+                             'ipv4addrs': ['10.0.0.1']},
+                            {'name': 'b.bar.net',
+                             'ipv4addrs': ['10.0.0.2', '10.0.1.2']},
+                            {'name': 'c.bar.net'}])
+        self.assertEqual([(self.current[0], {'comment': 'foo'}),
+                          (self.current[1],
+                           {'ipv4addrs': ['10.0.0.2', '10.0.1.2']})],
+                         result.modify)
+
+    def test_delete(self):
+        result = self.plan([{'name': 'a.bar.net'}])
+        self.assertEqual(set(['b.bar.net', 'c.bar.net']),
+                         set(host.name for host in result.delete))
+
+    def test_other_view_is_added(self):
+        result = self.plan([{'name': 'a.bar.net', 'view': 'internal'},
+                            {'name': 'b.bar.net'}, {'name': 'c.bar.net'}])
+        self.assertEqual(1, len(result.add))
+        self.assertEqual([self.current[0]], result.delete)
+
+    def test_assign_keeps_existing_addresses(self):
+        host = self.current[1]
+        existing = host.ipv4addrs[0]
+        reconcile.Plan._assign(host, {'ipv4addrs': ['10.0.0.2', '10.0.1.2']})
+        self.assertIs(existing, host.ipv4addrs[0])
+        self.assertEqual({'ipv4addr': '10.0.1.2'}, host.ipv4addrs[1])
+        self.assertEqual([{'ipv4addr': '10.0.0.2', 'mac': '00:50:56:00:00:01'},
+                          {'ipv4addr': '10.0.1.2'}],
+                         host.changes()['ipv4addrs'])
+
+
+class ReconcileTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+        self.hosts = [make_host('a.bar.net', '10.0.0.1'),
+                      make_host('b.bar.net', '10.0.0.2')]
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        body = json.loads(request.body) if request.body else None
+        self.requests.append((request.method, url.path, url.query, body))
+        if request.method == 'GET':
+            content = {'result': self.hosts}
+        else:
+            content = ['record:host/%i:%s/default' % (offset,
+                                                       operation['method'])
+                       for offset, operation in enumerate(body)]
+        return {'content': json.dumps(content),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_reconcile(self):
+        with httmock.HTTMock(self.wapi_mock):
+            result, errors = reconcile.reconcile(
+                self.session, record.Host,
+                [{'name': 'a.bar.net', 'ipv4addrs': ['10.0.0.1'],
+                  'comment': 'foo'},
+                 {'name': 'c.bar.net', 'ipv4addrs': ['10.0.0.3']}],
+                zone='bar.net')
+        self.assertEqual([], errors)
+        self.assertEqual((1, 1, 1), (len(result.add), len(result.modify),
+                                     len(result.delete)))
+        self.assertEqual(['GET', 'POST'],
+                         [method for method, _path, _query, _body
+                          in self.requests])
+        self.assertIn('_return_fields=comment%2Cipv4addrs%2Cname%2Cview',
+                      self.requests[0][2])
+        self.assertEqual({'zone': 'bar.net'}, self.requests[0][3])
+        operations = self.requests[1][3]
+        self.assertEqual(['POST', 'PUT', 'DELETE'],
+                         [operation['method'] for operation in operations])
+        self.assertEqual([{'ipv4addr': '10.0.0.3'}],
+                         operations[0]['data']['ipv4addrs'])
+        self.assertEqual({'comment': 'foo'}, operations[1]['data'])
+        self.assertEqual(self.hosts[1]['_ref'], operations[2]['object'])
@@ -0,0 +1,165 @@
+"""
+Record Tests
+
+"""
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import network
+from infoblox import record
+from infoblox import session
+
+
+class AddressesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.addresses = record.Addresses('ipv6addr', ['2001:db8::1'])
+
+    def test_items_are_dicts(self):
+        self.assertEqual([{'ipv6addr': '2001:db8::1'}], list(self.addresses))
+
+    def test_contains_normalized(self):
+        self.assertIn('2001:DB8:0::0001', self.addresses)
+        self.assertIn({'ipv6addr': '2001:db8:0:0::1'}, self.addresses)
+        self.assertNotIn('2001:db8::2', self.addresses)
+
+    def test_add_duplicate(self):
+        self.assertRaises(ValueError, self.addresses.add, '2001:db8:0::1')
+
+    def test_add_keeps_order(self):
+        self.addresses.add('2001:db8::3')
+        self.addresses.add({'ipv6addr': '2001:db8::2'})
+        self.assertEqual(['2001:db8::1', '2001:db8::3', '2001:db8::2'],
+                         [item['ipv6addr'] for item in self.addresses])
+
+    def test_add_function_call(self):
+        value = 'func:nextavailableip:2001:db8::/64'
+        self.addresses.add(value)
+        self.assertIn(value, self.addresses)
+
+    def test_add_function_call_twice(self):
+        value = 'func:nextavailableip:2001:db8::/64'
+        self.addresses.add(value)
+        self.addresses.add(value)
+        self.assertEqual(3, len(self.addresses))
+        self.addresses.remove(value)
+        self.assertIn(value, self.addresses)
+        self.assertEqual(2, len(self.addresses))
+
+    def test_remove(self):
+        self.addresses.remove('2001:db8:0::1')
+        self.assertEqual(0, len(self.addresses))
+
+    def test_remove_missing(self):
+        self.assertRaises(ValueError, self.addresses.remove, '2001:db8::2')
+
+    def test_discard_missing(self):
+        self.addresses.discard('2001:db8::2')
+        self.assertEqual(1, len(self.addresses))
+
+    def test_index(self):
+        self.assertEqual({'ipv6addr': '2001:db8::1'}, self.addresses[0])
+
+    def test_equals_list(self):
+        self.assertEqual([{'ipv6addr': '2001:db8::1'}], self.addresses)
+
+    def test_save_as(self):
+        ref = 'record:host_ipv6addr/a:2001%3Adb8%3A%3A2/a.bar.net/default'
+        self.addresses.add(record.HostIPv6._proxy(None, {'_ref': ref,
+                                                         'ipv6addr':
+                                                             '2001:db8::2'}))
+        self.assertEqual([{'ipv6addr': '2001:db8::1'},
+                          {'ipv6addr': '2001:db8::2'}],
+                         self.addresses._save_as())
+
+
+class HostAddressTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = session.Session('127.0.0.1')
+
+    def test_addresses_per_host(self):
+        host = record.Host(self.session)
+        other = record.Host(self.session)
+        host.add_ipv4addr('10.0.0.1')
+        self.assertEqual(0, len(other.ipv4addrs))
+        self.assertEqual([], record.Host.ipv4addrs)
+
+    def test_assigned_list_is_coerced(self):
+        host = record.Host(self.session, ipv4addrs=[{'ipv4addr': '10.0.0.1'}])
+        self.assertIsInstance(host.ipv4addrs, record.Addresses)
+        self.assertRaises(ValueError, host.add_ipv4addr, '10.0.0.1')
+
+    def test_compact_host(self):
+        host = record.Host.compact()(self.session)
+        host.add_ipv4addr('10.0.0.1')
+        self.assertIn('10.0.0.1', host.ipv4addrs)
+
+    def test_remove_ipv4addr(self):
+        host = record.Host(self.session)
+        host.add_ipv4addr('10.0.0.1')
+        host.add_ipv4addr('10.0.0.2')
+        host.remove_ipv4addr('10.0.0.1')
+        host.remove_ipv4addr('10.0.0.3')
+        self.assertEqual([{'ipv4addr': '10.0.0.2'}], host.ipv4addrs)
+
+    def test_add_ipv6addr_duplicate(self):
+        host = record.Host(self.session)
+        host.add_ipv6addr('2001:db8::1')
+        self.assertRaises(ValueError, host.add_ipv6addr, '2001:DB8::1')
+
+    def test_remove_ipv6addr(self):
+        host = record.Host(self.session)
+        host.add_ipv6addr('2001:db8::1')
+        host.remove_ipv6addr('2001:db8:0::1')
+        self.assertEqual(0, len(host.ipv6addrs))
+
+    def test_save_values(self):
+        host = record.Host(self.session)
+        host.name = 'a.bar.net'
+        host.add_ipv4addr('10.0.0.1')
+        host.add_ipv6addr('2001:db8::1')
+        values = host._save_values()
+        self.assertEqual([{'ipv4addr': '10.0.0.1'}], values['ipv4addrs'])
+        self.assertEqual([{'ipv6addr': '2001:db8::1'}], values['ipv6addrs'])
+
+    def test_dumps_round_trip(self):
+        host = record.Host(self.session)
+        host.name = 'a.bar.net'
+        host.add_ipv4addr('10.0.0.1')
+        host.add_ipv6addr('2001:db8::1')
+        self.assertIsInstance(host.as_dict()['ipv4addrs'], list)
+        other = record.Host(self.session)
+        other.loads(host.dumps())
+        self.assertEqual('a.bar.net', other.name)
+        self.assertEqual([{'ipv4addr': '10.0.0.1'}], other.ipv4addrs)
+        self.assertIn('2001:db8::1', other.ipv6addrs)
+
+    def test_add_ipv4addr_network(self):
+        host = record.Host(self.session)
+        host.add_ipv4addr(network='10.0.0.0/24')
+        self.assertEqual([{'ipv4addr': 'func:nextavailableip:10.0.0.0/24'}],
+                         host._save_values()['ipv4addrs'])
+
+    def test_add_ipv4addr_network_twice(self):
+        host = record.Host(self.session)
+        host.add_ipv4addr(network='10.0.0.0/24')
+        host.add_ipv4addr(network='10.0.0.0/24')
+        value = {'ipv4addr': 'func:nextavailableip:10.0.0.0/24'}
+        self.assertEqual([value, value], host._save_values()['ipv4addrs'])
+
+    def test_add_ipv4addr_network_object(self):
+        value = network.Network._build(None, {'network': '10.0.0.0/24',
+                                              'network_view': 'internal'})
+        host = record.Host(self.session)
+        host.add_ipv4addr(network=value)
+        self.assertIn('func:nextavailableip:10.0.0.0/24,internal',
+                      host.ipv4addrs)
+
+    def test_add_ipv4addr_requires_one_argument(self):
+        host = record.Host(self.session)
+        self.assertRaises(ValueError, host.add_ipv4addr)
+        self.assertRaises(ValueError, host.add_ipv4addr, '10.0.0.1',
+                          '10.0.0.0/24')
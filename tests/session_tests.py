@@ -2,12 +2,22 @@
 Infoblox Tests
 
 """
+import threading
+
 import httmock
+import mock
 try:
     import unittest2 as unittest
 except ImportError:
     import unittest
+try:
+    from http import server
+except ImportError:
+    import BaseHTTPServer as server
 
+import requests
+
+from infoblox import exceptions
 from infoblox import session
 
 
@@ -55,3 +65,355 @@ class SessionGetTests(SessionTests):
         with httmock.HTTMock(self.get_mock):
             response = self.session.get('objname', {'name': 'foo'})
             self.assertEqual(self.content, response.json())
+
+
+class SessionOptionTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def test_defaults(self):
+        obj = session.Session(self.HOST)
+        adapter = obj.session.get_adapter('https://')
+        self.assertEqual(obj.POOL_SIZE, adapter._pool_maxsize)
+        self.assertEqual(0, adapter.max_retries.total)
+        self.assertFalse(obj.session.verify)
+        self.assertIsNone(obj.timeout)
+
+    def test_options(self):
+        obj = session.Session(self.HOST, pool_size=32, max_retries=3,
+                              backoff_factor=0.5, timeout=10, verify=True)
+        adapter = obj.session.get_adapter('https://')
+        self.assertEqual(32, adapter._pool_maxsize)
+        self.assertEqual(3, adapter.max_retries.total)
+        self.assertEqual(0.5, adapter.max_retries.backoff_factor)
+        self.assertEqual(0, adapter.max_retries.status)
+        self.assertTrue(obj.session.verify)
+
+    def test_ca_bundle(self):
+        obj = session.Session(self.HOST, ca_bundle='/etc/ssl/infoblox.pem')
+        self.assertEqual('/etc/ssl/infoblox.pem', obj.session.verify)
+
+    def test_http_adapter(self):
+        obj = session.Session(self.HOST, https=False, pool_size=4)
+        self.assertEqual(4, obj.session.get_adapter('http://')._pool_maxsize)
+
+    def test_resize_pool_keeps_retries(self):
+        obj = session.Session(self.HOST, max_retries=2)
+        obj.resize_pool(20)
+        adapter = obj.session.get_adapter('https://')
+        self.assertEqual(20, adapter._pool_maxsize)
+        self.assertEqual(2, adapter.max_retries.total)
+
+    def test_timeout(self):
+        obj = session.Session(self.HOST, timeout=2.5)
+        with mock.patch.object(obj.session, 'request') as request:
+            obj.get('record:host')
+        self.assertEqual(2.5, request.call_args[1]['timeout'])
+
+
+class RetryTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST, max_retries=3,
+                                       backoff_factor=1, max_backoff=2)
+        self.statuses = []
+        self.headers = {}
+        self.requests = []
+        patcher = mock.patch('infoblox.session.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @httmock.all_requests
+    def status_mock(self, url, request):
+        self.requests.append(request.method)
+        status = self.statuses.pop(0) if self.statuses else 200
+        return {'content': '[]',
+                'headers': dict(self.headers,
+                                **{'content-type': 'application/json'}),
+                'status_code': status}
+
+    def test_retries_until_success(self):
+        self.statuses = [503, 502]
+        with httmock.HTTMock(self.status_mock):
+            self.assertEqual(200, self.session.get('record:host').status_code)
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual(2, self.session.retry_stats()['retries'])
+
+    def test_backoff_is_bounded(self):
+        self.statuses = [503, 503, 503]
+        with mock.patch('infoblox.session.random.uniform',
+                        side_effect=lambda low, high: high):
+            with httmock.HTTMock(self.status_mock):
+                self.session.get('record:host')
+        self.assertEqual([1, 2, 2], [call[0][0] for call
+                                     in self.sleep.call_args_list])
+
+    def test_exhausted(self):
+        self.statuses = [504] * 5
+        with httmock.HTTMock(self.status_mock):
+            self.assertEqual(504, self.session.get('record:host').status_code)
+        self.assertEqual(4, len(self.requests))
+        self.assertEqual(1, self.session.retry_stats()['exhausted'])
+
+    def test_post_not_retried(self):
+        self.statuses = [503]
+        with httmock.HTTMock(self.status_mock):
+            response = self.session.post('record:host', {'name': 'a'})
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(1, len(self.requests))
+
+    def test_post_retried_on_too_many_requests(self):
+        self.statuses = [429]
+        with httmock.HTTMock(self.status_mock):
+            response = self.session.post('record:host', {'name': 'a'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(['POST', 'POST'], self.requests)
+
+    def test_not_retried_by_default(self):
+        self.statuses = [503]
+        with httmock.HTTMock(self.status_mock):
+            response = session.Session(self.HOST).get('record:host')
+        self.assertEqual(503, response.status_code)
+
+    def test_default_backoff(self):
+        self.statuses = [503, 503]
+        obj = session.Session(self.HOST, max_retries=2)
+        with mock.patch('infoblox.session.random.uniform',
+                        side_effect=lambda low, high: high):
+            with httmock.HTTMock(self.status_mock):
+                self.assertEqual(200, obj.get('record:host').status_code)
+        self.assertEqual([obj.BACKOFF_FACTOR, obj.BACKOFF_FACTOR * 2],
+                         [call[0][0] for call in self.sleep.call_args_list])
+
+    def test_retry_after(self):
+        self.statuses = [429]
+        self.headers = {'Retry-After': '1.5'}
+        with httmock.HTTMock(self.status_mock):
+            self.session.get('record:host')
+        self.assertGreaterEqual(self.sleep.call_args[0][0], 1.5)
+        self.assertEqual(1, self.session.retry_stats()['retry_after'])
+
+    def test_retry_after_too_long(self):
+        self.statuses = [503]
+        self.headers = {'Retry-After': '120'}
+        with httmock.HTTMock(self.status_mock):
+            self.assertEqual(503, self.session.get('record:host').status_code)
+        self.assertFalse(self.sleep.called)
+        self.assertEqual(1, self.session.retry_stats()['exhausted'])
+
+    def test_retry_after_date(self):
+        response = requests.Response()
+        response.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.assertEqual(0.0, session._retry_after(response))
+        response.headers['Retry-After'] = 'soon'
+        self.assertIsNone(session._retry_after(response))
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.breaker = session.CircuitBreaker(failure_threshold=2,
+                                              reset_timeout=10)
+        self.session = session.Session(self.HOST, breaker=self.breaker)
+        self.status = 503
+        self.requests = 0
+        patcher = mock.patch('infoblox.session._clock', return_value=100)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @httmock.all_requests
+    def status_mock(self, url, request):
+        self.requests += 1
+        return {'content': '[]', 'status_code': self.status}
+
+    def send(self, count):
+        with httmock.HTTMock(self.status_mock):
+            for _offset in range(count):
+                self.session.get('record:host')
+
+    def test_opens_after_consecutive_failures(self):
+        self.send(2)
+        self.assertEqual(session.CircuitBreaker.OPEN, self.breaker.state)
+        self.assertRaises(exceptions.CircuitOpenError, self.session.get,
+                          'record:host')
+        self.assertEqual(2, self.requests)
+        self.assertEqual({'retries': 0, 'retry_after': 0, 'exhausted': 0,
+                          'rejected': 1,
+                          'circuit': {'state': 'open', 'failures': 2,
+                                      'opened': 1, 'rejected': 1}},
+                         self.session.retry_stats())
+
+    def test_success_resets_failures(self):
+        self.send(1)
+        self.status = 200
+        self.send(1)
+        self.status = 503
+        self.send(1)
+        self.assertEqual(session.CircuitBreaker.CLOSED, self.breaker.state)
+
+    def test_half_open_trial_closes(self):
+        self.send(2)
+        self.clock.return_value = 110
+        self.status = 200
+        self.send(2)
+        self.assertEqual(session.CircuitBreaker.CLOSED, self.breaker.state)
+        self.assertEqual(4, self.requests)
+
+    def test_half_open_allows_one_trial(self):
+        self.send(2)
+        self.clock.return_value = 110
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.send(2)
+        self.clock.return_value = 110
+        self.send(1)
+        self.assertEqual(session.CircuitBreaker.OPEN, self.breaker.state)
+        self.assertRaises(exceptions.CircuitOpenError, self.session.get,
+                          'record:host')
+        self.assertEqual(2, self.breaker.stats()['opened'])
+
+    def test_connection_errors_are_failures(self):
+        with mock.patch.object(self.session.session, 'request',
+                               side_effect=requests.ConnectionError):
+            for _offset in range(2):
+                self.assertRaises(requests.ConnectionError,
+                                  self.session.get, 'record:host')
+        self.assertEqual(session.CircuitBreaker.OPEN, self.breaker.state)
+
+    def test_rejection_is_a_protocol_error(self):
+        self.send(2)
+        self.assertRaises(exceptions.ProtocolError, self.session.get,
+                          'record:host')
+
+
+class Handler(server.BaseHTTPRequestHandler):
+    """Stub WAPI handler that keeps connections alive"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'[]'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class AuthHandler(Handler):
+    """Stub WAPI handler issuing ibapauth cookies on basic authentication"""
+
+    def do_GET(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        cookie = self.headers.get('Cookie', '')
+        authorization = self.headers.get('Authorization')
+        self.server.requests.append((self.path, cookie, authorization))
+        if cookie.startswith('ibapauth=') and cookie[9:] in self.server.tokens:
+            return self.respond(200)
+        if authorization:
+            token = 'token%i' % len(self.server.requests)
+            self.server.tokens.add(token)
+            return self.respond(200, token)
+        self.respond(401)
+
+    do_POST = do_GET
+
+    def respond(self, status, token=None):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        if token:
+            self.send_header('Set-Cookie', 'ibapauth=%s; Path=/' % token)
+        self.end_headers()
+
+
+class StubServerTests(unittest.TestCase):
+
+    HANDLER = None
+
+    def setUp(self):
+        self.server = server.HTTPServer(('127.0.0.1', 0), self.HANDLER)
+        self.server.requests = []
+        self.server.tokens = set()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.session = session.Session('127.0.0.1:%i' %
+                                       self.server.server_address[1],
+                                       https=False)
+
+    def tearDown(self):
+        self.session.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class SessionConnectionStatsTests(StubServerTests):
+
+    HANDLER = Handler
+
+    def test_connection_reuse(self):
+        for _offset in range(3):
+            self.session.get('record:host').json()
+        self.assertEqual({'requests': 3, 'connections': 1, 'reused': 2},
+                         self.session.connection_stats())
+
+    def test_no_requests(self):
+        self.assertEqual({'requests': 0, 'connections': 0, 'reused': 0},
+                         self.session.connection_stats())
+
+    def test_resize_pool_keeps_stats(self):
+        self.session.get('record:host').json()
+        adapter = self.session.session.get_adapter('http://')
+        with mock.patch.object(adapter, 'close',
+                               wraps=adapter.close) as close:
+            self.session.resize_pool(self.session.pool_size + 1)
+        close.assert_called_once_with()
+        self.assertIsNot(adapter, self.session.session.get_adapter('http://'))
+        self.session.get('record:host').json()
+        self.assertEqual({'requests': 2, 'connections': 2, 'reused': 0},
+                         self.session.connection_stats())
+
+
+class SessionCookieAuthTests(StubServerTests):
+
+    HANDLER = AuthHandler
+
+    def test_cookie_reused(self):
+        for _offset in range(3):
+            self.assertEqual(200, self.session.get('record:host').status_code)
+        self.assertEqual([True, False, False],
+                         [bool(auth) for _path, _cookie, auth
+                          in self.server.requests])
+        self.assertEqual({'credentials': 1, 'cookie': 2, 'expired': 0},
+                         self.session.auth_stats())
+
+    def test_reauthenticate_on_expired_cookie(self):
+        self.session.get('record:host')
+        self.server.tokens.clear()
+        self.assertEqual(200, self.session.get('record:host').status_code)
+        self.assertEqual([True, False, True],
+                         [bool(auth) for _path, _cookie, auth
+                          in self.server.requests])
+        self.assertEqual({'credentials': 2, 'cookie': 0, 'expired': 1},
+                         self.session.auth_stats())
+        self.session.get('record:host')
+        self.assertEqual(1, self.session.auth_stats()['cookie'])
+
+    def test_logout(self):
+        self.session.get('record:host')
+        self.session.logout()
+        self.assertEqual('/wapi/v1.2/logout', self.server.requests[-1][0])
+        self.assertNotIn('ibapauth', self.session.session.cookies)
+
+    def test_logout_without_session(self):
+        self.assertIsNone(self.session.logout())
+        self.assertEqual([], self.server.requests)
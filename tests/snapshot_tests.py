@@ -0,0 +1,137 @@
+"""
+HostSnapshot Tests
+
+"""
+import json
+
+import httmock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import record
+from infoblox import session
+from infoblox import snapshot
+
+
+def host_values(name, ipv4addr, mac=None, ipv6addr=None, view='default'):
+    values = {'_ref': 'record:host/%s:%s/%s' % (name, name, view),
+              'name': name,
+              'view': view,
+              'ipv4addrs': [{'_ref': 'record:host_ipv4addr/%s:%s/%s/%s' %
+                                     (name, ipv4addr, name, view),
+                             'host': name,
+                             'ipv4addr': ipv4addr}]}
+    if mac:
+        values['ipv4addrs'][0]['mac'] = mac
+    if ipv6addr:
+        values['ipv6addrs'] = [{'_ref': 'record:host_ipv6addr/%s:%s/%s/%s' %
+                                        (name, ipv6addr, name, view),
+                                'host': name,
+                                'ipv6addr': ipv6addr}]
+    return values
+
+
+def make_host(*args, **kwargs):
+    return record.Host._build(None, host_values(*args, **kwargs))
+
+
+class KeyTests(unittest.TestCase):
+
+    def test_ipv6_spellings_match(self):
+        self.assertEqual(snapshot.address_key('2001:db8::1'),
+                         snapshot.address_key('2001:DB8:0:0::0001'))
+
+    def test_invalid_address(self):
+        self.assertRaises(ValueError, snapshot.address_key, '10.0.0.256')
+
+    def test_mac_separators(self):
+        self.assertEqual('005056aabbcc',
+                         snapshot.mac_key('00:50:56:AA:BB:CC'))
+        self.assertEqual('005056aabbcc', snapshot.mac_key('0050.56aa.bbcc'))
+
+
+class HostSnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+        self.foo = make_host('foo.bar.net', '10.0.0.1', '00:50:56:aa:bb:cc',
+                             '2001:db8::1')
+        self.baz = make_host('baz.bar.net', '10.0.0.2')
+        self.snapshot = snapshot.HostSnapshot([self.foo, self.baz])
+
+    def test_len(self):
+        self.assertEqual(2, len(self.snapshot))
+
+    def test_iter(self):
+        self.assertEqual(set(['foo.bar.net', 'baz.bar.net']),
+                         set(host.name for host in self.snapshot))
+
+    def test_find_by_name(self):
+        self.assertEqual([self.baz], self.snapshot.find_by_name('baz.bar.net'))
+
+    def test_find_by_ipv4(self):
+        self.assertEqual([self.foo], self.snapshot.find_by_ip('10.0.0.1'))
+
+    def test_find_by_ipv6(self):
+        self.assertEqual([self.foo],
+                         self.snapshot.find_by_ip('2001:db8:0::0001'))
+
+    def test_find_by_mac(self):
+        self.assertEqual([self.foo],
+                         self.snapshot.find_by_mac('00-50-56-AA-BB-CC'))
+
+    def test_not_found(self):
+        self.assertEqual([], self.snapshot.find_by_ip('10.0.0.3'))
+        self.assertEqual([], self.snapshot.find_by_mac('00:50:56:00:00:00'))
+        self.assertEqual([], self.snapshot.find_by_name('qux.bar.net'))
+
+    def test_shared_name(self):
+        other = make_host('foo.bar.net', '10.1.0.1', view='internal')
+        self.snapshot.add(other)
+        self.assertEqual([self.foo, other],
+                         self.snapshot.find_by_name('foo.bar.net'))
+        self.assertEqual(3, len(list(self.snapshot)))
+
+    def test_shared_address(self):
+        other = make_host('qux.bar.net', '10.0.0.1', view='internal')
+        self.snapshot.add(other)
+        self.assertEqual([self.foo, other],
+                         self.snapshot.find_by_ip('10.0.0.1'))
+
+    def test_find_does_not_load_addresses(self):
+        address = self.foo.ipv4addrs[0]
+        self.assertIn('configure_for_dhcp', address._unloaded)
+
+
+class HostSnapshotLoadTests(unittest.TestCase):
+
+    HOST = '127.0.0.1'
+
+    def setUp(self):
+        self.session = session.Session(self.HOST)
+        self.requests = []
+
+    @httmock.all_requests
+    def search_mock(self, url, request):
+        self.requests.append(url)
+        hosts = [host_values('foo.bar.net', '10.0.0.1', '00:50:56:aa:bb:cc'),
+                 host_values('baz.bar.net', '10.0.0.2')]
+        return {'content': json.dumps({'result': hosts}),
+                'headers': {'content-type': 'application/json'},
+                'status_code': 200}
+
+    def test_load(self):
+        with httmock.HTTMock(self.search_mock):
+            hosts = snapshot.HostSnapshot.load(self.session, zone='bar.net')
+        self.assertEqual(2, len(hosts))
+        self.assertEqual('foo.bar.net',
+                         hosts.find_by_mac('00:50:56:aa:bb:cc')[0].name)
+        self.assertEqual('baz.bar.net', hosts.find_by_ip('10.0.0.2')[0].name)
+        self.assertEqual(1, len(self.requests))
+
+    def test_load_requests_fields(self):
+        with httmock.HTTMock(self.search_mock):
+            snapshot.HostSnapshot.load(self.session, zone='bar.net')
+        self.assertIn('_return_fields=name%2Cipv4addrs%2Cipv6addrs%2Cview%2C'
+                      'comment', self.requests[0].query)
@@ -0,0 +1,182 @@
+"""
+Throttle Tests
+
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import httmock
+import mock
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from infoblox import session
+from infoblox import throttle
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('infoblox.throttle._clock', return_value=100.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('infoblox.throttle.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst(self):
+        bucket = throttle.TokenBucket(10, 3)
+        self.assertEqual([0, 0, 0], [bucket.acquire() for _offset in range(3)])
+        self.assertFalse(self.sleep.called)
+
+    def test_waits_are_spaced(self):
+        bucket = throttle.TokenBucket(10, 1)
+        delays = [bucket.acquire() for _offset in range(4)]
+        self.assertEqual([0, 0.1, 0.2, 0.3], [round(delay, 6)
+                                              for delay in delays])
+
+    def test_refills(self):
+        bucket = throttle.TokenBucket(10, 2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.return_value = 100.2
+        self.assertEqual([0, 0], [bucket.acquire(), bucket.acquire()])
+
+    def test_refill_is_capped(self):
+        bucket = throttle.TokenBucket(10, 2)
+        self.clock.return_value = 1000.0
+        self.assertEqual(0.1, round([bucket.acquire()
+                                     for _offset in range(3)][-1], 6))
+
+
+class FileLimitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'limits')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_bucket_state_is_shared(self):
+        first = throttle.FileTokenBucket(self.path, 1, 2)
+        second = throttle.FileTokenBucket(self.path, 1, 2)
+        with mock.patch('infoblox.throttle.time.sleep'):
+            self.assertEqual(0, first.acquire())
+            self.assertEqual(0, second.acquire())
+            self.assertGreater(first.acquire(), 0.9)
+        first.close()
+        second.close()
+
+    def test_semaphore_is_shared(self):
+        first = throttle.FileSemaphore(self.path, 1, poll=0.001)
+        second = throttle.FileSemaphore(self.path, 1, poll=0.001)
+        first.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            second.acquire()
+            acquired.set()
+            second.release()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        first.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        first.close()
+        second.close()
+
+    def test_semaphore_slots(self):
+        semaphore = throttle.FileSemaphore(self.path, 2)
+        semaphore.acquire()
+        semaphore.acquire()
+        self.assertEqual([], semaphore._free)
+        semaphore.release()
+        self.assertEqual(1, len(semaphore._free))
+        semaphore.close()
+
+    def test_budget_files(self):
+        budget = throttle.Budget(5, max_in_flight=2, path=self.path)
+        with budget:
+            pass
+        self.assertEqual(['limits.bucket', 'limits.slot.0', 'limits.slot.1'],
+                         sorted(os.listdir(self.directory)))
+
+
+class BudgetTests(unittest.TestCase):
+
+    def test_unlimited(self):
+        budget = throttle.Budget()
+        with budget:
+            self.assertEqual(1, budget.stats()['in_flight'])
+        self.assertEqual({'requests': 1, 'delayed': 0, 'waited': 0.0,
+                          'in_flight': 0, 'peak_in_flight': 1},
+                         budget.stats())
+
+    def test_max_in_flight(self):
+        budget = throttle.Budget(max_in_flight=2)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def request():
+            with budget:
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.01)
+                with lock:
+                    running[0] -= 1
+
+        threads = [threading.Thread(target=request) for _offset in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, peak[0])
+        self.assertEqual(2, budget.stats()['peak_in_flight'])
+        self.assertEqual(6, budget.stats()['requests'])
+
+    def test_rate(self):
+        budget = throttle.Budget(rate=100, burst=1)
+        for _offset in range(3):
+            with budget:
+                pass
+        stats = budget.stats()
+        self.assertEqual(2, stats['delayed'])
+        self.assertGreater(stats['waited'], 0.015)
+
+
+class SessionLimitsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.limits = throttle.Limits(write=throttle.Budget(max_in_flight=1))
+        self.session = session.Session('127.0.0.1', limits=self.limits)
+
+    @httmock.all_requests
+    def wapi_mock(self, url, request):
+        self.assertEqual(request.method != 'GET',
+                         self.limits.write.stats()['in_flight'] == 1)
+        return {'content': '[]', 'status_code': 200}
+
+    def test_reads_and_writes(self):
+        with httmock.HTTMock(self.wapi_mock):
+            self.session.get('record:host')
+            self.session.get('record:host')
+            self.session.post('record:host', {'name': 'a.bar.net'})
+            self.session.delete('record:host/a')
+        stats = self.limits.stats()
+        self.assertEqual(2, stats['read']['requests'])
+        self.assertEqual(2, stats['write']['requests'])
+        self.assertEqual(0, stats['write']['in_flight'])
+
+    def test_default_is_unlimited(self):
+        obj = session.Session('127.0.0.1')
+        self.assertIsNone(obj.limits.read.bucket)
+        self.assertIsNone(obj.limits.write.semaphore)